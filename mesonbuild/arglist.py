@@ -100,12 +100,27 @@ class CompilerArgs(T.MutableSequence[str]):
         self._container: T.List[str] = list(iterable) if iterable is not None else []
         self.pre: T.Deque[str] = collections.deque()
         self.post: T.Deque[str] = collections.deque()
+        # All arguments in _container, pre and post, built on first use to
+        # find UNIQUE arguments without scanning the lists. OVERRIDDEN
+        # arguments are deduplicated by flush_pre_post() in a single pass.
+        # Any removal invalidates it; flushing never changes the set of
+        # arguments.
+        self._index: T.Optional[T.Set[str]] = None
+
+    def _get_index(self) -> T.Set[str]:
+        if self._index is None:
+            self._index = set(self._container)
+            self._index.update(self.pre)
+            self._index.update(self.post)
+        return self._index
 
     # Flush the saved pre and post list into the _container list
     #
     # This correctly deduplicates the entries after _can_dedup definition
     # Note: This function is designed to work without delete operations, as deletions are worsening the performance a lot.
     def flush_pre_post(self) -> None:
+        if not self.pre and not self.post:
+            return
         new: T.List[str] = []
         pre_flush_set: T.Set[str] = set()
         post_flush: T.Deque[str] = collections.deque()
@@ -166,10 +181,12 @@ class CompilerArgs(T.MutableSequence[str]):
     def __setitem__(self, index: T.Union[int, slice], value: T.Union[str, T.Iterable[str]]) -> None:  # noqa: F811
         self.flush_pre_post()
         self._container[index] = value  # type: ignore  # TODO: fix 'Invalid index type' and 'Incompatible types in assignment' errors
+        self._index = None
 
     def __delitem__(self, index: T.Union[int, slice]) -> None:
         self.flush_pre_post()
         del self._container[index]
+        self._index = None
 
     def __len__(self) -> int:
         return len(self._container) + len(self.pre) + len(self.post)
@@ -177,6 +194,8 @@ class CompilerArgs(T.MutableSequence[str]):
     def insert(self, index: int, value: str) -> None:
         self.flush_pre_post()
         self._container.insert(index, value)
+        if self._index is not None:
+            self._index.add(value)
 
     def copy(self) -> 'CompilerArgs':
         self.flush_pre_post()
@@ -226,10 +245,10 @@ class CompilerArgs(T.MutableSequence[str]):
         # shared libraries.
         self.flush_pre_post()
         if copy:
-            new = self.copy()
+            new = self._container.copy()
         else:
-            new = self
-        return self.compiler.unix_args_to_native(new._container)
+            new = self._container
+        return self.compiler.unix_args_to_native(new)
 
     def append_direct(self, arg: str) -> None:
         '''
@@ -242,6 +261,8 @@ class CompilerArgs(T.MutableSequence[str]):
             self.append(arg)
         else:
             self._container.append(arg)
+            if self._index is not None:
+                self._index.add(arg)
 
     def extend_direct(self, iterable: T.Iterable[str]) -> None:
         '''
@@ -285,13 +306,17 @@ class CompilerArgs(T.MutableSequence[str]):
             dedup = self._can_dedup(arg)
             if dedup is Dedup.UNIQUE:
                 # Argument already exists and adding a new instance is useless
-                if arg in self._container or arg in self.pre or arg in self.post:
+                if arg in self._get_index():
                     continue
             if self._should_prepend(arg):
                 tmp_pre.appendleft(arg)
             else:
                 self.post.append(arg)
+                if self._index is not None:
+                    self._index.add(arg)
         self.pre.extendleft(tmp_pre)
+        if self._index is not None:
+            self._index.update(tmp_pre)
         #pre and post is going to be merged later before a iter call
         return self
 
@@ -18,6 +18,8 @@ import shlex
 import shutil
 import typing as T
 import hashlib
+import heapq
+import math
 
 from .. import build
 from .. import dependencies
@@ -57,6 +59,10 @@ if T.TYPE_CHECKING:
 # Assembly files cannot be unitified and neither can LLVM IR files
 LANGS_CANT_UNITY = ('d', 'fortran', 'vala')
 
+# Estimated cost of an #include, in bytes of source code, when grouping
+# unity sources by cost without a build history
+UNITY_INCLUDE_COST = 4096
+
 @dataclass(eq=False)
 class RegenInfo:
     source_dir: str
@@ -437,27 +443,128 @@ class Backend:
 
         # For each language, generate unity source files and return the list
         for comp, srcs in compsrcs.items():
-            files_in_current = unity_size + 1
-            unity_file_number = 0
-            # TODO: this could be simplified with an algorithm that pre-sorts
-            # the sources into the size of chunks we want
-            ofile = None
-            for src in srcs:
-                if files_in_current >= unity_size:
-                    if ofile:
-                        ofile.close()
-                    ofile = init_language_file(comp.get_default_suffix(), unity_file_number)
-                    unity_file_number += 1
-                    files_in_current = 0
-                ofile.write(f'#include<{src}>\n')
-                files_in_current += 1
-            if ofile:
-                ofile.close()
+            suffix = comp.get_default_suffix()
+            if target.get_option(OptionKey('unity_grouping')) == 'cost':
+                chunks = self.group_unity_sources_by_cost(target, suffix, srcs, unity_size)
+            else:
+                chunks = [srcs[i:i + unity_size] for i in range(0, len(srcs), unity_size)]
+            for unity_file_number, chunk in enumerate(chunks):
+                with init_language_file(suffix, unity_file_number) as ofile:
+                    for src in chunk:
+                        ofile.write(f'#include<{src}>\n')
 
         for x in abs_files:
             mesonlib.replace_if_different(x, x + '.tmp')
         return result
 
+    def get_build_history(self) -> T.Mapping[str, float]:
+        '''How long each output took to build the last time it was built, in
+        seconds, by path relative to the build directory with / separators.
+
+        Empty if the backend does not know.
+        '''
+        return {}
+
+    @staticmethod
+    def estimate_compile_cost(src: str) -> T.Optional[float]:
+        '''Guess how expensive a source is to compile from its size and the
+        number of files it includes, None if it cannot be read.'''
+        try:
+            with open(src, 'rb') as f:
+                data = f.read()
+        except OSError:
+            # Generated sources may not have been generated yet
+            return None
+        return max(len(data) + UNITY_INCLUDE_COST * (data.count(b'#include') + data.count(b'#import')), 1)
+
+    def get_unity_source_costs(self, target: build.BuildTarget, suffix: str,
+                               srcs: T.List[mesonlib.FileOrString]) -> T.Dict[mesonlib.FileOrString, float]:
+        '''Estimated compile time of each source of a unity build.
+
+        The build history, when there is one, tells how long the unity files
+        of the previous build took, which is split between the sources they
+        included in proportion to their estimated cost. It can also tell how
+        long the sources took on their own if the target was built without
+        unity. Sources missing from the history are estimated from their
+        contents, scaled to the sources that are in it.
+        '''
+        build_dir = self.environment.get_build_dir()
+        source_dir = self.environment.get_source_dir()
+
+        def abspath(src: mesonlib.FileOrString) -> str:
+            if isinstance(src, mesonlib.File):
+                return src.absolute_path(source_dir, build_dir)
+            return src
+
+        estimates = {src: self.estimate_compile_cost(abspath(src)) for src in srcs}
+        known = [c for c in estimates.values() if c is not None]
+        default = sum(known) / len(known) if known else 1.0
+        heuristic = {src: default if c is None else c for src, c in estimates.items()}
+
+        history = self.get_build_history()
+        measured: T.Dict[mesonlib.FileOrString, float] = {}
+        if history:
+            # Sources as they are written to the unity files
+            by_name = {str(src): src for src in srcs}
+            targetdir = self.get_target_private_dir(target)
+            number = 0
+            while True:
+                unity_src = self.get_unity_source_file(target, suffix, number)
+                obj = self.object_filename_from_source(target, unity_src, targetdir).replace('\\', '/')
+                if obj not in history:
+                    break
+                try:
+                    with open(unity_src.absolute_path(source_dir, build_dir), encoding='utf-8') as f:
+                        names = [l[len('#include<'):-len('>\n')] for l in f if l.startswith('#include<')]
+                except OSError:
+                    break
+                included = [by_name[name] for name in names if name in by_name]
+                total = sum(heuristic[src] for src in included)
+                for src in included:
+                    measured[src] = history[obj] * heuristic[src] / total
+                number += 1
+            for src in srcs:
+                if src in measured:
+                    continue
+                if isinstance(src, mesonlib.File):
+                    srcfile = src
+                elif src.startswith(build_dir + os.sep):
+                    srcfile = mesonlib.File.from_built_relative(os.path.relpath(src, build_dir))
+                elif src.startswith(source_dir + os.sep):
+                    srcfile = mesonlib.File.from_source_file(source_dir, *os.path.split(os.path.relpath(src, source_dir)))
+                else:
+                    srcfile = mesonlib.File.from_absolute_file(src)
+                obj = self.object_filename_from_source(target, srcfile, targetdir).replace('\\', '/')
+                if obj in history:
+                    measured[src] = history[obj]
+
+        if not measured:
+            return heuristic
+        scale = sum(measured.values()) / sum(heuristic[src] for src in measured)
+        return {src: measured.get(src, heuristic[src] * scale) for src in srcs}
+
+    def group_unity_sources_by_cost(self, target: build.BuildTarget, suffix: str,
+                                    srcs: T.List[mesonlib.FileOrString], unity_size: int
+                                    ) -> T.List[T.List[mesonlib.FileOrString]]:
+        '''Split srcs in as many unity files as unity_size would, so that
+        they take about as long to compile as each other.'''
+        costs = self.get_unity_source_costs(target, suffix, srcs)
+        # Only a change of a factor of about two in the cost of a source moves
+        # it, so that timing noise does not change the unity files, which
+        # would then all be rebuilt.
+        quantized = [2 ** round(math.log2(max(costs[src], 1e-6))) for src in srcs]
+        count = (len(srcs) + unity_size - 1) // unity_size
+        # Longest processing time first: the most expensive source goes to
+        # the unity file with the lowest total so far
+        totals = [(0.0, i) for i in range(count)]
+        chunks: T.List[T.List[int]] = [[] for _ in range(count)]
+        for index in sorted(range(len(srcs)), key=lambda i: (-quantized[i], i)):
+            total, number = heapq.heappop(totals)
+            chunks[number].append(index)
+            heapq.heappush(totals, (total + quantized[index], number))
+        # Sources keep their order in the unity files
+        return [[srcs[i] for i in sorted(chunk)] for chunk in chunks]
+
     @staticmethod
     def relpath(todir: str, fromdir: str) -> str:
         return os.path.relpath(os.path.join('dummyprefixdir', todir),
@@ -0,0 +1,375 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 The Meson development team
+
+"""Analysis of the last build of a Ninja build directory.
+
+The timings that Ninja records in .ninja_log are joined with the graph of
+Meson targets to find the chain of build steps that bounded the duration of
+the build, how many steps ran in parallel over time, and the targets and
+sources that took the most time to build.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import typing as T
+from dataclasses import dataclass, field
+
+from .. import build, mlog
+from ..mesonlib import MesonException
+from .ninjabackend import NinjaBackend
+from .ninjalog import NINJA_LOG_HEADER_PAT
+
+if T.TYPE_CHECKING:
+    from typing_extensions import TypedDict
+
+    BuildTargetTypes = T.Union[build.BuildTarget, build.CustomTarget]
+
+    class TargetTime(TypedDict):
+        id: str
+        name: str
+        time: float
+        steps: int
+
+    class SourceTime(TypedDict):
+        source: str
+        target: str
+        time: float
+
+# Number of targets and sources listed in the text report
+TOP_COUNT = 10
+# Number of intervals the parallelism of the build is reported for
+PARALLELISM_INTERVALS = 20
+
+
+@dataclass
+class Step:
+
+    """A build statement that ran in the last build.
+
+    :param outputs: The outputs of the statement.
+    :param start: When it started, in seconds since the build started.
+    :param end: When it finished, in seconds since the build started.
+    :param kind: What it does: compile, link, custom or other.
+    :param target: The Meson target it belongs to, if any.
+    :param source: The source it compiles, if it compiles one.
+    """
+
+    outputs: T.List[str]
+    start: float
+    end: float
+    kind: str = 'other'
+    target: T.Optional[BuildTargetTypes] = None
+    source: T.Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+    def to_json(self) -> T.Dict[str, T.Any]:
+        return {
+            'outputs': self.outputs,
+            'start': self.start,
+            'end': self.end,
+            'duration': round(self.duration, 3),
+            'kind': self.kind,
+            'target': self.target.get_id() if self.target is not None else None,
+            'source': self.source,
+        }
+
+
+@dataclass
+class TargetSteps:
+
+    """The steps of the last build that belong to a Meson target."""
+
+    # Steps that generate sources in the private directory of the target
+    generate: T.List[Step] = field(default_factory=list)
+    compile: T.List[Step] = field(default_factory=list)
+    link: T.List[Step] = field(default_factory=list)
+
+    def all(self) -> T.List[Step]:
+        return self.generate + self.compile + self.link
+
+
+def read_last_build(build_dir: str) -> T.List[Step]:
+    '''The steps of the last build recorded in .ninja_log, in the order they
+    finished.
+
+    The log does not record where builds start, so this is a heuristic.
+    Ninja appends the steps of every build in the order they finish, with
+    times relative to the start of that build, and a build runs each
+    statement at most once. A step that finished earlier than the one before
+    it, or that has an output already built since the last such boundary,
+    therefore starts a new build. Once ninja recompacts the log, the steps
+    of the builds before it are no longer in order, and if nothing was
+    rebuilt since then the steps found are not those of a single build.'''
+    logfile = os.path.join(build_dir, '.ninja_log')
+    steps: T.List[Step] = []
+    built: T.Set[str] = set()
+    last_hash = None
+    try:
+        with open(logfile, encoding='utf-8', errors='surrogateescape', newline='\n') as f:
+            if not NINJA_LOG_HEADER_PAT.fullmatch(f.readline()):
+                raise MesonException(f'{logfile} is not in a format that can be analyzed.')
+            for line in f:
+                fields = line.rstrip('\n').split('\t')
+                if len(fields) != 5:
+                    continue
+                start, end = int(fields[0]) / 1000, int(fields[1]) / 1000
+                output = fields[3]
+                if steps and (start, end, fields[4]) == (steps[-1].start, steps[-1].end, last_hash):
+                    # Statements with several outputs have a line for each
+                    steps[-1].outputs.append(output)
+                else:
+                    if steps and (end < steps[-1].end or output in built):
+                        steps = []
+                        built = set()
+                    steps.append(Step([output], start, end))
+                built.add(output)
+                last_hash = fields[4]
+    except FileNotFoundError:
+        raise MesonException(f'{logfile} does not exist, nothing has been built yet.')
+    return steps
+
+
+def read_compiled_sources(build_dir: str, source_dir: str) -> T.Dict[str, str]:
+    '''The source compiled into each object file, from compile_commands.json.'''
+    try:
+        with open(os.path.join(build_dir, 'compile_commands.json'), encoding='utf-8') as f:
+            entries = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    sources: T.Dict[str, str] = {}
+    for e in entries:
+        if 'output' not in e:
+            continue
+        src = os.path.normpath(os.path.join(e['directory'], e['file']))
+        if src.startswith(source_dir + os.sep):
+            src = os.path.relpath(src, source_dir)
+        sources[e['output']] = src
+    return sources
+
+
+class BuildAnalysis:
+
+    """The critical path, parallelism and most expensive targets and
+    sources of the last build of a build directory.
+
+    The critical path is computed on the graph of Meson targets rather than
+    on the complete graph of build statements: the sources of a target are
+    compiled once the targets that generate sources for it are built, and a
+    target is linked once its sources are compiled and the targets it links
+    with are linked.
+    """
+
+    def __init__(self, b: build.Build):
+        self.build = b
+        self.build_dir = b.environment.get_build_dir()
+        self.backend = NinjaBackend(b, None)
+        self.steps = read_last_build(self.build_dir)
+        if not self.steps:
+            raise MesonException('Nothing was built by the last build.')
+        self.target_steps: T.Dict[str, TargetSteps] = {}
+        self.assign_steps()
+        self.finish_times: T.Dict[str, T.Tuple[float, T.List[Step]]] = {}
+
+    def assign_steps(self) -> None:
+        compiled = read_compiled_sources(self.build_dir, self.build.environment.get_source_dir())
+        by_output = {o: s for s in self.steps for o in s.outputs}
+        by_private_dir: T.Dict[str, T.List[Step]] = {}
+        for s in self.steps:
+            o = s.outputs[0]
+            i = o.find('.p' + os.sep)
+            if i != -1:
+                by_private_dir.setdefault(o[:i + 2], []).append(s)
+
+        for t in self.build.get_targets().values():
+            steps = self.target_steps[t.get_id()] = TargetSteps()
+            if isinstance(t, build.BuildTarget):
+                link = by_output.get(self.backend.get_target_filename(t))
+                if link is not None:
+                    link.kind = 'link'
+                    link.target = t
+                    steps.link.append(link)
+                for s in by_private_dir.get(self.backend.get_target_private_dir(t), []):
+                    s.target = t
+                    if s.outputs[0] in compiled:
+                        s.kind = 'compile'
+                        s.source = compiled[s.outputs[0]]
+                        steps.compile.append(s)
+                    elif s.outputs[0].endswith('.symbols'):
+                        # Symbols are extracted from the linked target
+                        s.kind = 'link'
+                        steps.link.append(s)
+                    else:
+                        s.kind = 'custom'
+                        steps.generate.append(s)
+            elif isinstance(t, build.CustomTarget):
+                outdir = self.backend.get_target_dir(t)
+                for o in t.get_outputs():
+                    s = by_output.get(os.path.join(outdir, o))
+                    if s is not None and s.target is None:
+                        s.kind = 'custom'
+                        s.target = t
+                        steps.link.append(s)
+
+    @staticmethod
+    def get_target(t: T.Any) -> T.Optional[BuildTargetTypes]:
+        if isinstance(t, build.CustomTargetIndex):
+            return t.target
+        if isinstance(t, (build.BuildTarget, build.CustomTarget)):
+            return t
+        return None
+
+    def get_source_dependencies(self, t: BuildTargetTypes) -> T.List[BuildTargetTypes]:
+        '''The targets that must be built before a target can compile.'''
+        deps: T.List[T.Any] = []
+        if isinstance(t, build.BuildTarget):
+            deps += t.get_generated_sources()
+        else:
+            deps += t.get_target_dependencies()
+        return [d for d in (self.get_target(d) for d in deps) if d is not None]
+
+    def get_link_dependencies(self, t: BuildTargetTypes) -> T.List[BuildTargetTypes]:
+        '''The targets that must be built before a target can be linked.'''
+        if isinstance(t, build.BuildTarget):
+            return [d for d in (self.get_target(d) for d in t.get_dependencies()) if d is not None]
+        return []
+
+    def get_finish_time(self, t: BuildTargetTypes) -> T.Tuple[float, T.List[Step]]:
+        '''When a target would be built with unlimited parallelism, in
+        seconds, and the steps that this time is the sum of.'''
+        key = t.get_id()
+        if key in self.finish_times:
+            return self.finish_times[key]
+        # Break cycles, which should not exist
+        self.finish_times[key] = (0.0, [])
+
+        def latest(deps: T.List[BuildTargetTypes]) -> T.Tuple[float, T.List[Step]]:
+            return max((self.get_finish_time(d) for d in deps), key=lambda x: x[0], default=(0.0, []))
+
+        steps = self.target_steps[key]
+        time, path = latest(self.get_source_dependencies(t))
+        for phase in [steps.generate, steps.compile]:
+            if phase:
+                longest = max(phase, key=lambda s: s.duration)
+                time, path = time + longest.duration, path + [longest]
+        link_time, link_path = latest(self.get_link_dependencies(t))
+        if link_time > time:
+            time, path = link_time, link_path
+        for s in steps.link:
+            time, path = time + s.duration, path + [s]
+        self.finish_times[key] = (time, path)
+        return time, path
+
+    def get_critical_path(self) -> T.Tuple[float, T.List[Step]]:
+        critical = max((self.get_finish_time(t) for t in self.build.get_targets().values()
+                        if isinstance(t, (build.BuildTarget, build.CustomTarget))),
+                       key=lambda x: x[0], default=(0.0, []))
+        # Steps outside of targets, like regenerating build.ninja
+        longest = max(self.steps, key=lambda s: s.duration)
+        if longest.target is None and longest.duration > critical[0]:
+            return longest.duration, [longest]
+        return critical
+
+    def get_parallelism(self) -> T.List[T.Tuple[float, float, float]]:
+        '''The average number of steps running in each part of the build.'''
+        start = min(s.start for s in self.steps)
+        end = max(s.end for s in self.steps)
+        length = (end - start) / PARALLELISM_INTERVALS
+        if length <= 0:
+            return []
+        intervals = []
+        for i in range(PARALLELISM_INTERVALS):
+            lo, hi = start + i * length, start + (i + 1) * length
+            busy = sum(max(0.0, min(hi, s.end) - max(lo, s.start)) for s in self.steps)
+            intervals.append((lo, hi, busy / length))
+        return intervals
+
+    def to_json(self) -> T.Dict[str, T.Any]:
+        wall_time = max(s.end for s in self.steps) - min(s.start for s in self.steps)
+        cpu_time = sum(s.duration for s in self.steps)
+        critical_time, critical_path = self.get_critical_path()
+
+        targets: T.List[TargetTime] = []
+        for t in self.build.get_targets().values():
+            steps = self.target_steps[t.get_id()].all()
+            if steps:
+                targets.append({
+                    'id': t.get_id(),
+                    'name': t.get_basename(),
+                    'time': round(sum(s.duration for s in steps), 3),
+                    'steps': len(steps),
+                })
+        targets.sort(key=lambda x: x['time'], reverse=True)
+        sources: T.List[SourceTime] = [{'source': s.source, 'target': s.target.get_id(), 'time': round(s.duration, 3)}
+                                       for s in self.steps if s.source is not None and s.target is not None]
+        sources.sort(key=lambda x: x['time'], reverse=True)
+        return {
+            'wall_time': round(wall_time, 3),
+            'cpu_time': round(cpu_time, 3),
+            'steps': len(self.steps),
+            'average_parallelism': round(cpu_time / wall_time, 2) if wall_time > 0 else 0.0,
+            'critical_path': {
+                'time': round(critical_time, 3),
+                'steps': [s.to_json() for s in critical_path],
+            },
+            'parallelism': [{'start': round(lo, 3), 'end': round(hi, 3), 'running': round(running, 2)}
+                            for lo, hi, running in self.get_parallelism()],
+            'targets': targets,
+            'sources': sources,
+        }
+
+
+def print_report(data: T.Dict[str, T.Any], targets: T.Dict[str, BuildTargetTypes]) -> None:
+    def target_name(target_id: T.Optional[str]) -> str:
+        return targets[target_id].get_basename() if target_id in targets else '-'
+
+    wall_time = data['wall_time']
+    mlog.log('The last build is told apart from the previous ones in .ninja_log heuristically,',
+             'from the order of the steps and the outputs they rebuild.')
+    mlog.log(f'Last build ran {data["steps"]} steps in {wall_time:.2f}s, using {data["cpu_time"]:.2f}s of CPU time,',
+             f'{data["average_parallelism"]:.1f} in parallel on average ({os.cpu_count() or 1} CPUs).')
+
+    critical = data['critical_path']
+    share = f', {100 * critical["time"] / wall_time:.0f}% of the build' if wall_time > 0 else ''
+    mlog.log()
+    mlog.log(mlog.bold('Critical path'), f'({critical["time"]:.2f}s{share}):')
+    for s in critical['steps']:
+        what = s['source'] or s['outputs'][0]
+        mlog.log(f'  {s["duration"]:8.2f}s  {s["kind"]:<8} {what} ({target_name(s["target"])})')
+
+    if data['parallelism']:
+        mlog.log()
+        mlog.log(mlog.bold('Parallelism'), '(steps running at the same time):')
+        peak = max(i['running'] for i in data['parallelism']) or 1
+        for i in data['parallelism']:
+            histogram = '#' * round(40 * i['running'] / peak)
+            mlog.log(f'  {i["start"]:8.2f}s - {i["end"]:8.2f}s {i["running"]:6.1f} {histogram}')
+
+    mlog.log()
+    mlog.log(mlog.bold('Most expensive targets:'))
+    for t in data['targets'][:TOP_COUNT]:
+        mlog.log(f'  {t["time"]:8.2f}s  {t["name"]} ({t["steps"]} steps)')
+
+    if data['sources']:
+        mlog.log()
+        mlog.log(mlog.bold('Most expensive sources:'))
+        for s in data['sources'][:TOP_COUNT]:
+            mlog.log(f'  {s["time"]:8.2f}s  {s["source"]} ({target_name(s["target"])})')
+
+
+def analyze(b: build.Build) -> T.Dict[str, T.Any]:
+    '''Print a report of the last build, and write its data as JSON to
+    meson-logs/build-analysis.json.'''
+    data = BuildAnalysis(b).to_json()
+    logfile = os.path.join(b.environment.get_log_dir(), 'build-analysis.json')
+    with open(logfile, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    mlog.log()
+    print_report(data, {t.get_id(): t for t in b.get_targets().values()})
+    mlog.log()
+    mlog.log('Full analysis written to', mlog.bold(logfile))
+    return data
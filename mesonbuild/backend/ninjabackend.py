@@ -4,18 +4,24 @@
 
 from __future__ import annotations
 
-from collections import OrderedDict
-from dataclasses import dataclass
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
 from enum import Enum, unique
 from functools import lru_cache
 from pathlib import PurePath, Path
 from textwrap import dedent
+import contextlib
 import itertools
 import json
 import os
 import pickle
+import posixpath
 import re
+import shutil
 import subprocess
+import sys
+import tempfile
+import time
 import typing as T
 
 from . import backends
@@ -33,6 +39,7 @@ from ..mesonlib import (
 )
 from ..mesonlib import get_compiler_for_source, has_path_sep, OptionKey
 from .backends import CleanTrees
+from .ninjalog import CLEANDEAD_STAMP, read_ninja_log, record_ninja_log_mtime, restat_ninja_log
 from ..build import GeneratedList, InvalidArguments
 
 if T.TYPE_CHECKING:
@@ -54,6 +61,11 @@ FORTRAN_MODULE_PAT = r"^\s*\bmodule\b\s+(\w+)\s*(?:!+.*)*$"
 FORTRAN_SUBMOD_PAT = r"^\s*\bsubmodule\b\s*\((\w+:?\w+)\)\s*(\w+)"
 FORTRAN_USE_PAT = r"^\s*use,?\s*(?:non_intrinsic)?\s*(?:::)?\s*(\w+)"
 
+FORTRAN_INCLUDE_RE = re.compile(FORTRAN_INCLUDE_PAT, re.IGNORECASE)
+FORTRAN_MODULE_RE = re.compile(FORTRAN_MODULE_PAT, re.IGNORECASE)
+FORTRAN_SUBMOD_RE = re.compile(FORTRAN_SUBMOD_PAT, re.IGNORECASE)
+FORTRAN_USE_RE = re.compile(FORTRAN_USE_PAT, re.IGNORECASE)
+
 def cmd_quote(arg: str) -> str:
     # see: https://docs.microsoft.com/en-us/windows/desktop/api/shellapi/nf-shellapi-commandlinetoargvw#remarks
 
@@ -136,6 +148,29 @@ Please report this error with a test case to the Meson bug tracker.'''
         raise MesonException(errmsg)
     return quote_re.sub(r'$\g<0>', text)
 
+NINJA_EXPAND_PAT = re.compile(r'\$(?:\{([a-zA-Z0-9_.-]+)\}|([a-zA-Z0-9_-]+)|(.))', re.DOTALL)
+NINJA_SHELL_SAFE_PAT = re.compile(r'[a-zA-Z0-9_+./-]*')
+
+def ninja_expand(text: str, variables: T.Mapping[str, str]) -> str:
+    '''Evaluate a string of a ninja file, in the same way ninja does.'''
+    def repl(m: T.Match[str]) -> str:
+        if m.group(3) is not None:
+            # $$, "$ ", $: or a line continuation
+            return '' if m.group(3) == '\n' else m.group(3)
+        return variables.get(m.group(1) or m.group(2), '')
+    return NINJA_EXPAND_PAT.sub(repl, text)
+
+def ninja_shell_escape(path: str) -> str:
+    '''Quote a path the way ninja does when it expands $in and $out.'''
+    if mesonlib.is_windows():
+        if not any(c in path for c in ' \t"'):
+            return path
+        # Backslashes are only special in front of a double quote
+        return '"' + re.sub(r'(\\*)("|$)', lambda m: m.group(1) * 2 + ('\\"' if m.group(2) else ''), path) + '"'
+    if NINJA_SHELL_SAFE_PAT.fullmatch(path):
+        return path
+    return "'" + path.replace("'", "'\\''") + "'"
+
 
 @dataclass
 class TargetDependencyScannerInfo:
@@ -184,6 +219,37 @@ class NinjaComment:
             outfile.write('\n')
         outfile.write('\n')
 
+@dataclass(eq=False)
+class NinjaSharedArgs:
+
+    """Arguments shared by several build statements.
+
+    They are written once as a toplevel variable, which the build statements
+    refer to instead of repeating the arguments.
+    """
+
+    name: str
+    args: T.Tuple[str, ...]
+    quoted: T.Dict[T.Callable[[str], str], T.Tuple[str, ...]] = field(default_factory=dict)
+    length: int = field(init=False, default=0)
+
+    def __post_init__(self) -> None:
+        self.length = joined_length(self.args)
+
+    def get_quoted(self, qf: T.Callable[[str], str]) -> T.Tuple[str, ...]:
+        if qf not in self.quoted:
+            self.quoted[qf] = tuple(qf(i) for i in self.args)
+        return self.quoted[qf]
+
+    def get_variable(self, qf: T.Callable[[str], str]) -> str:
+        # Response files may be quoted differently than command lines
+        return self.name if qf is quote_func else self.name + '_RSP'
+
+    def write(self, outfile: T.TextIO, qf: T.Callable[[str], str]) -> None:
+        outfile.write(f'{self.get_variable(qf)} = ')
+        outfile.write(' '.join([ninja_quote(i) for i in self.get_quoted(qf)]))
+        outfile.write('\n\n')
+
 class NinjaRule:
     def __init__(self, rule: str, command: CommandArgOrStr, args: CommandArgOrStr,
                  description: str, rspable: bool = False, deps: T.Optional[str] = None,
@@ -225,6 +291,7 @@ class NinjaRule:
         self.refcount = 0
         self.rsprefcount = 0
         self.rspfile_quote_style = rspfile_quote_style
+        self.length_template: T.Optional[T.Tuple[int, T.List[str]]] = None
 
         if self.depfile == '$DEPFILE':
             self.depfile += '_UNQUOTED'
@@ -239,7 +306,12 @@ class NinjaRule:
             return ninja_quote(x.s)
         return ninja_quote(qf(str(x)))
 
-    def write(self, outfile: T.TextIO) -> None:
+    def get_command(self, rsp: bool) -> str:
+        if rsp:
+            return '{} @$out.rsp'.format(' '.join([self._quoter(x) for x in self.command]))
+        return ' '.join([self._quoter(x) for x in self.command + self.args])
+
+    def get_rspfile_content(self) -> str:
         rspfile_args = self.args
         rspfile_quote_func: T.Callable[[str], str]
         if self.rspfile_quote_style is RSPFileSyntax.MSVC:
@@ -247,7 +319,9 @@ class NinjaRule:
             rspfile_args = [NinjaCommandArg('$in_newline', arg.quoting) if arg.s == '$in' else arg for arg in rspfile_args]
         else:
             rspfile_quote_func = gcc_rsp_quote
+        return ' '.join([self._quoter(x, rspfile_quote_func) for x in rspfile_args])
 
+    def write(self, outfile: T.TextIO) -> None:
         def rule_iter() -> T.Iterable[str]:
             if self.refcount:
                 yield ''
@@ -256,12 +330,10 @@ class NinjaRule:
 
         for rsp in rule_iter():
             outfile.write(f'rule {self.name}{rsp}\n')
+            outfile.write(f' command = {self.get_command(bool(rsp))}\n')
             if rsp == '_RSP':
-                outfile.write(' command = {} @$out.rsp\n'.format(' '.join([self._quoter(x) for x in self.command])))
                 outfile.write(' rspfile = $out.rsp\n')
-                outfile.write(' rspfile_content = {}\n'.format(' '.join([self._quoter(x, rspfile_quote_func) for x in rspfile_args])))
-            else:
-                outfile.write(' command = {}\n'.format(' '.join([self._quoter(x) for x in self.command + self.args])))
+                outfile.write(f' rspfile_content = {self.get_rspfile_content()}\n')
             if self.deps:
                 outfile.write(f' deps = {self.deps}\n')
             if self.depfile:
@@ -274,66 +346,104 @@ class NinjaRule:
                     outfile.write('\n')
             outfile.write('\n')
 
-    def length_estimate(self, infiles: str, outfiles: str,
-                        elems: T.List[T.Tuple[str, T.List[str]]]) -> int:
+    def get_length_template(self) -> T.Tuple[int, T.List[str]]:
+        '''Length of the command without its variables, and the names of
+        the variables it uses.'''
+        if self.length_template is None:
+            command = ' '.join([self._quoter(x) for x in self.command + self.args])
+            length = len(command)
+            names: T.List[str] = []
+            for m in re.finditer(r'(\${\w+}|\$\w+)?[^$]*', command):
+                if m.start(1) != -1:
+                    length -= m.end(1) - m.start(1)
+                    chunk = m.group(1)
+                    if chunk[1] == '{':
+                        names.append(chunk[2:-1])
+                    else:
+                        names.append(chunk[1:])
+            self.length_template = (length, names)
+        return self.length_template
+
+    def length_estimate(self, infiles_length: int, outfiles_length: int,
+                        elem_lengths: T.Mapping[str, int]) -> int:
+        '''Estimate the length of the command, given the length of each
+        variable of the build statement once joined.'''
         # determine variables
         # this order of actions only approximates ninja's scoping rules, as
         # documented at: https://ninja-build.org/manual.html#ref_scope
-        ninja_vars = dict(elems)
+        ninja_vars = dict(elem_lengths)
         if self.deps is not None:
-            ninja_vars['deps'] = [self.deps]
+            ninja_vars['deps'] = len(self.deps)
         if self.depfile is not None:
-            ninja_vars['depfile'] = [self.depfile]
-        ninja_vars['in'] = [infiles]
-        ninja_vars['out'] = [outfiles]
+            ninja_vars['depfile'] = len(self.depfile)
+        ninja_vars['in'] = infiles_length
+        ninja_vars['out'] = outfiles_length
 
         # expand variables in command
-        command = ' '.join([self._quoter(x) for x in self.command + self.args])
-        estimate = len(command)
-        for m in re.finditer(r'(\${\w+}|\$\w+)?[^$]*', command):
-            if m.start(1) != -1:
-                estimate -= m.end(1) - m.start(1)
-                chunk = m.group(1)
-                if chunk[1] == '{':
-                    chunk = chunk[2:-1]
-                else:
-                    chunk = chunk[1:]
-                chunk = ninja_vars.get(chunk, []) # undefined ninja variables are empty
-                estimate += len(' '.join(chunk))
+        estimate, names = self.get_length_template()
+        for name in names:
+            estimate += ninja_vars.get(name, 0) # undefined ninja variables are empty
 
         # determine command length
         return estimate
 
+def joined_length(args: T.Sequence[str]) -> int:
+    '''Length of ' '.join(args), without joining them.'''
+    return sum(len(a) for a in args) + len(args) - 1 if args else 0
+
+def intern_str(s: T.Any) -> T.Any:
+    # Only exact strings can be interned, File objects and str subclasses
+    # are kept as they are
+    return sys.intern(s) if type(s) is str else s
+
 class NinjaBuildElement:
+
+    # Large projects have tens of thousands of build statements, and the
+    # same paths and rule names appear in many of them. Keep each one small
+    # and let them share strings.
+    __slots__ = ('all_outputs', 'deps', 'elem_lengths', 'elems', 'implicit_outfilenames', 'infilenames',
+                 'orderdeps', 'outfilenames', 'output_errors', 'rule', 'rulename', 'shared_args',
+                 'use_rspfile')
+
     def __init__(self, all_outputs: T.Set[str], outfilenames, rulename, infilenames, implicit_outs=None):
-        self.implicit_outfilenames = implicit_outs or []
+        self.implicit_outfilenames = implicit_outs or ()
         if isinstance(outfilenames, str):
             self.outfilenames = [outfilenames]
         else:
             self.outfilenames = outfilenames
         assert isinstance(rulename, str)
-        self.rulename = rulename
+        self.rulename = intern_str(rulename)
         if isinstance(infilenames, str):
-            self.infilenames = [infilenames]
+            self.infilenames = [intern_str(infilenames)]
         else:
-            self.infilenames = infilenames
-        self.deps = OrderedSet()
-        self.orderdeps = OrderedSet()
-        self.elems = []
+            self.infilenames = [intern_str(i) for i in infilenames]
+        # Most build statements have no dependencies of one kind or the other
+        self.deps: T.Optional[OrderedSet[str]] = None
+        self.orderdeps: T.Optional[OrderedSet[str]] = None
+        self.elems: T.List[T.Tuple[str, T.Sequence[str]]] = []
+        # Length of each variable once joined, kept up to date as they are
+        # added so that deciding on a response file does not join them
+        self.elem_lengths: T.Dict[str, int] = {}
+        self.use_rspfile: T.Optional[bool] = None
+        self.shared_args: T.Optional[T.Tuple[str, NinjaSharedArgs]] = None
         self.all_outputs = all_outputs
         self.output_errors = ''
 
     def add_dep(self, dep: T.Union[str, T.List[str]]) -> None:
+        if self.deps is None:
+            self.deps = OrderedSet()
         if isinstance(dep, list):
-            self.deps.update(dep)
+            self.deps.update([intern_str(d) for d in dep])
         else:
-            self.deps.add(dep)
+            self.deps.add(intern_str(dep))
 
     def add_orderdep(self, dep):
+        if self.orderdeps is None:
+            self.orderdeps = OrderedSet()
         if isinstance(dep, list):
-            self.orderdeps.update(dep)
+            self.orderdeps.update([intern_str(d) for d in dep])
         else:
-            self.orderdeps.add(dep)
+            self.orderdeps.add(intern_str(dep))
 
     def add_item(self, name: str, elems: T.Union[str, T.List[str, CompilerArgs]]) -> None:
         # Always convert from GCC-style argument naming to the naming used by the
@@ -343,11 +453,31 @@ class NinjaBuildElement:
         if isinstance(elems, str):
             elems = [elems]
         self.elems.append((name, elems))
+        self.elem_lengths[name] = joined_length(elems)
+        self.use_rspfile = None
 
         if name == 'DEPFILE':
             self.elems.append((name + '_UNQUOTED', elems))
-
-    def _should_use_rspfile(self):
+            self.elem_lengths[name + '_UNQUOTED'] = self.elem_lengths[name]
+
+    def add_shared_item(self, name: str, shared: NinjaSharedArgs, elems: T.List[str]) -> None:
+        '''Set a variable to the shared arguments followed by elems.'''
+        # The common case of no extra arguments shares the tuple itself
+        self.elems.append((name, shared.args + tuple(elems) if elems else shared.args))
+        self.elem_lengths[name] = shared.length + 1 + joined_length(elems) if elems else shared.length
+        self.use_rspfile = None
+        # Declared before the first statement that uses it, whether or not
+        # others do, so that build.ninja does not depend on target order
+        self.shared_args = (name, shared)
+
+    def _should_use_rspfile(self) -> bool:
+        # Asked several times per build statement, and expensive for the
+        # ones with many inputs
+        if self.use_rspfile is None:
+            self.use_rspfile = self._estimate_use_rspfile()
+        return self.use_rspfile
+
+    def _estimate_use_rspfile(self) -> bool:
         # 'phony' is a rule built-in to ninja
         if self.rulename == 'phony':
             return False
@@ -355,12 +485,12 @@ class NinjaBuildElement:
         if not self.rule.rspable:
             return False
 
-        infilenames = ' '.join([ninja_quote(i, True) for i in self.infilenames])
-        outfilenames = ' '.join([ninja_quote(i, True) for i in self.outfilenames])
+        infilenames = joined_length([ninja_quote(i, True) for i in self.infilenames])
+        outfilenames = joined_length([ninja_quote(i, True) for i in self.outfilenames])
 
         return self.rule.length_estimate(infilenames,
                                          outfilenames,
-                                         self.elems) >= rsp_threshold
+                                         self.elem_lengths) >= rsp_threshold
 
     def count_rule_references(self):
         if self.rulename != 'phony':
@@ -384,9 +514,9 @@ class NinjaBuildElement:
         else:
             rulename = self.rulename
         line = f'build {outs}{implicit_outs}: {rulename} {ins}'
-        if len(self.deps) > 0:
+        if self.deps:
             line += ' | ' + ' '.join([ninja_quote(x, True) for x in sorted(self.deps)])
-        if len(self.orderdeps) > 0:
+        if self.orderdeps:
             orderdeps = [str(x) for x in self.orderdeps]
             line += ' || ' + ' '.join([ninja_quote(x, True) for x in sorted(orderdeps)])
         line += '\n'
@@ -405,28 +535,74 @@ class NinjaBuildElement:
             )
         outfile.write(line)
 
+        for name, value in self._get_variables(use_rspfile):
+            outfile.write(f' {name} = ')
+            if self.shared_args is not None and name == self.shared_args[0]:
+                shared = self.shared_args[1]
+                outfile.write('$' + shared.get_variable(self.get_quote_func(use_rspfile)))
+                value = value[len(shared.args):]
+                if value:
+                    outfile.write(' ')
+            outfile.write(' '.join([ninja_quote(i) for i in value]))
+            outfile.write('\n')
+        outfile.write('\n')
+
+    def get_quote_func(self, use_rspfile: bool) -> T.Callable[[str], str]:
         if use_rspfile:
             if self.rule.rspfile_quote_style is RSPFileSyntax.MSVC:
-                qf = cmd_quote
-            else:
-                qf = gcc_rsp_quote
-        else:
-            qf = quote_func
+                return cmd_quote
+            return gcc_rsp_quote
+        return quote_func
 
-        for e in self.elems:
-            (name, elems) = e
+    def _get_variables(self, use_rspfile: bool) -> T.Iterator[T.Tuple[str, T.List[str]]]:
+        qf = self.get_quote_func(use_rspfile)
+
+        for name, elems in self.elems:
+            if self.shared_args is not None and name == self.shared_args[0]:
+                shared = self.shared_args[1]
+                yield name, [*shared.get_quoted(qf), *[qf(i) for i in elems[len(shared.args):]]]
+                continue
             should_quote = name not in raw_names
-            line = f' {name} = '
             newelems = []
             for i in elems:
                 if not should_quote or i == '&&': # Hackety hack hack
-                    newelems.append(ninja_quote(i))
+                    newelems.append(i)
                 else:
-                    newelems.append(ninja_quote(qf(i)))
-            line += ' '.join(newelems)
-            line += '\n'
-            outfile.write(line)
-        outfile.write('\n')
+                    newelems.append(qf(i))
+            yield name, newelems
+
+    @staticmethod
+    def _get_ninja_path(path: str) -> str:
+        # The path as ninja sees it after reading it from the build line
+        path = path.replace('\\', '/')
+        if mesonlib.is_windows() and path.startswith('//'):
+            return '\\\\' + path[2:]
+        return posixpath.normpath(path)
+
+    def get_compdb_entry(self, directory: str) -> T.Dict[str, str]:
+        '''Entry of compile_commands.json for this build statement, as
+        written by `ninja -t compdb -x`.'''
+        use_rspfile = self._should_use_rspfile()
+        infiles = [self._get_ninja_path(i) for i in self.infilenames]
+        outfiles = [self._get_ninja_path(i) for i in self.outfilenames]
+        variables = {name: ' '.join(value) for name, value in self._get_variables(use_rspfile)}
+        variables['in'] = ' '.join([ninja_shell_escape(i) for i in infiles])
+        variables['in_newline'] = '\n'.join([ninja_shell_escape(i) for i in infiles])
+        variables['out'] = ' '.join([ninja_shell_escape(i) for i in outfiles])
+        command = ninja_expand(self.rule.get_command(use_rspfile), variables)
+        if use_rspfile:
+            # Replace @file with the content of the response file
+            rspfile = ' '.join(outfiles) + '.rsp'
+            index = command.find(rspfile)
+            if index > 0 and command[index - 1] == '@':
+                content = ninja_expand(self.rule.get_rspfile_content(), variables).replace('\n', ' ')
+                command = command[:index - 1] + content + command[index + len(rspfile):]
+        return {
+            'directory': directory,
+            'command': command,
+            'file': infiles[0],
+            'output': outfiles[0],
+        }
 
     def check_outputs(self):
         for n in self.outfilenames:
@@ -434,6 +610,122 @@ class NinjaBuildElement:
                 self.output_errors = f'Multiple producers for Ninja target "{n}". Please rename your targets.'
             self.all_outputs.add(n)
 
+# Rough memory use of a link, plus that of each object it links, used to size
+# the link pools when backend_max_links is auto. With link-time optimization
+# the code of the whole program is generated by the linker.
+LINK_BASE_MEMORY = 256 * 1024 * 1024
+LINK_OBJECT_MEMORY = 2 * 1024 * 1024
+LTO_LINK_MEMORY_FACTOR = 4
+
+# Pools that Meson defines itself, along with the builtin console pool
+RESERVED_POOLS = {'console', 'link_pool', 'lto_link_pool'}
+
+def get_physical_memory() -> T.Optional[int]:
+    '''Memory of the machine in bytes, or None if it is not known.
+
+    The total memory is used rather than the memory available right now, so
+    that build.ninja does not change every time it is regenerated.
+    '''
+    memory: T.Optional[int] = None
+    if sys.platform == 'win32':
+        import ctypes
+
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [('dwLength', ctypes.c_ulong),
+                        ('dwMemoryLoad', ctypes.c_ulong),
+                        ('ullTotalPhys', ctypes.c_ulonglong),
+                        ('ullAvailPhys', ctypes.c_ulonglong),
+                        ('ullTotalPageFile', ctypes.c_ulonglong),
+                        ('ullAvailPageFile', ctypes.c_ulonglong),
+                        ('ullTotalVirtual', ctypes.c_ulonglong),
+                        ('ullAvailVirtual', ctypes.c_ulonglong),
+                        ('ullAvailExtendedVirtual', ctypes.c_ulonglong)]
+
+        status = MEMORYSTATUSEX()
+        status.dwLength = ctypes.sizeof(status)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            memory = status.ullTotalPhys
+    else:
+        try:
+            memory = os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+        except (AttributeError, ValueError, OSError):
+            pass
+    # Containers may be given less memory than the machine has
+    try:
+        with open('/sys/fs/cgroup/memory.max', encoding='ascii') as f:
+            limit = f.read().strip()
+        if limit != 'max':
+            memory = min(memory, int(limit)) if memory else int(limit)
+    except (OSError, ValueError):
+        pass
+    return memory if memory and memory > 0 else None
+
+# A target only gets an automatic precompiled header for a language if it has
+# that many sources of it, and a header is only precompiled if at least that
+# share of the sources included it directly.
+AUTO_PCH_MIN_SOURCES = 4
+AUTO_PCH_MIN_SHARE = 0.5
+
+PREPROCESSOR_DIRECTIVE_RE = re.compile(
+    r'^[ \t]*#[ \t]*(include|ifdef|ifndef|if|endif|define)\b(?:[ \t]*[<"]([^>"\n]+)[>"])?',
+    re.MULTILINE)
+
+def scan_top_level_includes(fname: str) -> T.Optional[T.List[str]]:
+    '''The headers that a source file includes outside of any #if, in order.
+
+    None if the file cannot be read, or if it defines a macro before its first
+    include, which a header included ahead of it would not see.
+    '''
+    try:
+        with open(fname, encoding='utf-8', errors='replace') as f:
+            text = f.read()
+    except OSError:
+        return None
+    includes: T.List[str] = []
+    depth = 0
+    for m in PREPROCESSOR_DIRECTIVE_RE.finditer(text):
+        directive, header = m.groups()
+        if directive.startswith('if'):
+            depth += 1
+        elif directive == 'endif':
+            depth = max(depth - 1, 0)
+        elif directive == 'define':
+            if not includes:
+                return None
+        elif depth == 0 and header:
+            includes.append(header)
+    return includes
+
+def read_ninja_deps(build_dir: str, ninja_command: T.List[str]) -> T.Tuple[T.Dict[str, T.List[str]], T.Set[str]]:
+    '''The dependencies that ninja recorded from depfiles, by output, and
+    the outputs that changed since their dependencies were recorded, for
+    which ninja would ignore them.'''
+    if not os.path.exists(os.path.join(build_dir, '.ninja_deps')):
+        return {}, set()
+    try:
+        p = subprocess.run(ninja_command + ['-t', 'deps'], cwd=build_dir,
+                           stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                           encoding='utf-8', errors='surrogateescape')
+    except OSError:
+        return {}, set()
+    if p.returncode != 0:
+        return {}, set()
+    deps: T.Dict[str, T.List[str]] = {}
+    stale: T.Set[str] = set()
+    current: T.List[str] = []
+    # output: #deps 2, deps mtime 123 (VALID)
+    #     dependency
+    for line in p.stdout.splitlines():
+        if line.startswith('    '):
+            current.append(line[4:])
+        elif line:
+            output = line.rsplit(': #deps ', 1)[0]
+            current = deps[output] = []
+            if not line.endswith('(VALID)'):
+                stale.add(output)
+    return deps, stale
+
+
 @dataclass
 class RustDep:
 
@@ -491,12 +783,24 @@ class NinjaBackend(backends.Backend):
         self.name = 'ninja'
         self.ninja_filename = 'build.ninja'
         self.fortran_deps = {}
+        self.fortran_scan_cache: T.Optional[FortranScanCache] = None
+        # Precompiled headers selected by backend_auto_pch, by target and language
+        self.auto_pch: T.Dict[str, T.Dict[str, str]] = {}
+        # Dependencies recorded by the previous build, for backend_narrow_header_deps
+        self.recorded_deps: T.Optional[T.Dict[str, T.List[str]]] = None
+        # Estimated memory use of the links in each pool, for backend_max_links=auto
+        self.link_memory_estimates: T.Dict[str, T.List[int]] = {'link_pool': [], 'lto_link_pool': []}
+        # Pools used by custom targets and generators
+        self.custom_pools: T.Set[str] = set()
         self.all_outputs: T.Set[str] = set()
         self.introspection_data = {}
         self.created_llvm_ir_rule = PerMachine(False, False)
         self.rust_crates: T.Dict[str, RustCrate] = {}
         self.implicit_meson_outs = []
         self._uses_dyndeps = False
+        self.shared_compile_args: T.Dict[T.Tuple[str, str], T.Dict[T.Tuple[T.Tuple[str, ...], ...], NinjaSharedArgs]] = {}
+        # Like the working directory of ninja, which is what it reports
+        self.compdb_directory = os.path.realpath(self.environment.get_build_dir()) if self.environment else ''
         # nvcc chokes on thin archives:
         #   nvlink fatal   : Could not open input file 'libfoo.a.p'
         #   nvlink fatal   : elfLink internal error
@@ -624,17 +928,29 @@ class NinjaBackend(backends.Backend):
             outfile.write('# Do not edit by hand.\n\n')
             outfile.write('ninja_required_version = 1.8.2\n\n')
 
-            num_pools = self.environment.coredata.optstore.get_value('backend_max_links')
-            if num_pools > 0:
-                outfile.write(f'''pool link_pool
-  depth = {num_pools}
-
-''')
-
-        with self.detect_vs_dep_prefix(tempfilename) as outfile:
+        with self.detect_vs_dep_prefix(tempfilename) as outfile, \
+                tempfile.TemporaryFile('w+b') as compdb_spool, \
+                contextlib.ExitStack() as stack:
             self.generate_rules()
 
-            self.build_elements = []
+            # Build statements are written after the rules, once it is known
+            # which rules are used. To use less memory, they can be written
+            # out to a temporary file as soon as they are added instead of
+            # being kept until then.
+            self.build_elements: T.List[T.Union[NinjaBuildElement, NinjaComment]] = []
+            self.build_spool: T.Optional[T.TextIO] = None
+            if self.environment.coredata.optstore.get_value('backend_low_memory'):
+                self.build_spool = stack.enter_context(
+                    tempfile.TemporaryFile('w+', encoding='utf-8', newline=''))
+            self.compdb_rules = self.get_compdb_rules()
+            # The commands of compile_commands.json of a large project take
+            # more memory than anything else the backend keeps
+            self.compdb_spool = compdb_spool
+            self.compdb_size = 0
+            self.compdb_fragments: T.Optional[T.Dict[str, T.List[T.Tuple[int, int]]]] = None
+            if self.environment.coredata.optstore.get_value('backend_compdb_fragments'):
+                self.compdb_fragments = {}
+            self.written_shared_args: T.Set[str] = set()
             self.generate_phony()
             self.add_build_comment(NinjaComment('Build rules for targets'))
 
@@ -645,8 +961,21 @@ class NinjaBackend(backends.Backend):
                     if isinstance(target, build.BuildTarget):
                         captured_compile_args_per_target[target.get_id()] = self.generate_common_compile_args_per_src_type(target)
 
+            self.prescan_fortran_sources()
+            auto_pch = self.environment.coredata.optstore.get_value('backend_auto_pch')
+            narrow_header_deps = self.environment.coredata.optstore.get_value('backend_narrow_header_deps')
+            if auto_pch or narrow_header_deps:
+                # Both use the dependencies of the previous build, which
+                # ninja has to load its whole deps log to print
+                deps, stale = read_ninja_deps(self.environment.get_build_dir(), self.ninja_command)
+                if auto_pch:
+                    self.select_auto_pch(deps)
+                if narrow_header_deps:
+                    self.recorded_deps = {k: v for k, v in deps.items() if k not in stale}
             for t in ProgressBar(self.build.get_targets().values(), desc='Generating targets'):
                 self.generate_target(t)
+            if self.fortran_scan_cache is not None:
+                self.fortran_scan_cache.save()
             mlog.log_timestamp("Targets generated")
             self.add_build_comment(NinjaComment('Test rules'))
             self.generate_tests()
@@ -674,21 +1003,40 @@ class NinjaBackend(backends.Backend):
             mlog.log_timestamp("Utils generated")
             self.generate_ending()
 
+            # Pools come last as their depth may depend on the targets
+            self.write_pools(outfile)
             self.write_rules(outfile)
             self.write_builds(outfile)
 
             default = 'default all\n\n'
             outfile.write(default)
+            self.generate_compdb()
         # Only overwrite the old build file after the new one has been
-        # fully created.
-        os.replace(tempfilename, outfilename)
+        # fully created. An unchanged one is kept: the regeneration rule is
+        # restat, so Ninja then does not load the same manifest again.
+        unchanged = not mesonlib.replace_if_different(outfilename, tempfilename)
+        regenerated_at = time.time_ns()
+        recorded = False
         mlog.cmd_ci_include(outfilename)  # For CI debugging
         # Refresh Ninja's caches. https://github.com/ninja-build/ninja/pull/1685
         # Cannot use when running with dyndeps: https://github.com/ninja-build/ninja/issues/1952
         if mesonlib.version_compare(self.ninja_version, '>=1.10.0') and os.path.exists(os.path.join(self.environment.build_dir, '.ninja_log')) and not self._uses_dyndeps:
-            subprocess.call(self.ninja_command + ['-t', 'restat'], cwd=self.environment.build_dir)
-            subprocess.call(self.ninja_command + ['-t', 'cleandead'], cwd=self.environment.build_dir)
-        self.generate_compdb()
+            if self.environment.coredata.optstore.get_value('backend_deferred_cleanup'):
+                # Restat without starting ninja, and leave cleandead to the
+                # next `meson compile`
+                if not restat_ninja_log(self.environment.build_dir):
+                    subprocess.call(self.ninja_command + ['-t', 'restat'], cwd=self.environment.build_dir)
+                Path(self.environment.build_dir, CLEANDEAD_STAMP).touch()
+            else:
+                subprocess.call(self.ninja_command + ['-t', 'restat'], cwd=self.environment.build_dir)
+                subprocess.call(self.ninja_command + ['-t', 'cleandead'], cwd=self.environment.build_dir)
+            if unchanged:
+                # The kept build.ninja is older than the inputs it was just
+                # regenerated from, record it as up to date like Ninja does
+                recorded = record_ninja_log_mtime(self.environment.build_dir, 'build.ninja', regenerated_at)
+        if unchanged and not recorded:
+            # Without a record Ninja goes by the mtime of the file
+            os.utime(outfilename)
         self.generate_rust_project_json()
 
         if capture:
@@ -708,26 +1056,77 @@ class NinjaBackend(backends.Backend):
                 },
                 f, indent=4)
 
-    # http://clang.llvm.org/docs/JSONCompilationDatabase.html
-    def generate_compdb(self):
-        rules = []
+    @lru_cache(maxsize=None)
+    def get_build_history(self) -> T.Mapping[str, float]:
+        log = read_ninja_log(self.environment.get_build_dir())
+        if log is None:
+            return {}
+        history: T.Dict[str, float] = {}
+        for output, fields in log[1].items():
+            try:
+                # Start and end times are in milliseconds
+                history[output] = (int(fields[1]) - int(fields[0])) / 1000
+            except ValueError:
+                return {}
+        return history
+
+    def get_compdb_rules(self) -> T.Set[str]:
+        rules: T.Set[str] = set()
         # TODO: Rather than an explicit list here, rules could be marked in the
         # rule store as being wanted in compdb
         for for_machine in MachineChoice:
             for compiler in self.environment.coredata.compilers[for_machine].values():
-                rules += [f"{rule}{ext}" for rule in [self.compiler_to_rule_name(compiler)]
-                          for ext in ['', '_RSP']]
-                rules += [f"{rule}{ext}" for rule in [self.compiler_to_pch_rule_name(compiler)]
-                          for ext in ['', '_RSP']]
-        compdb_options = ['-x'] if mesonlib.version_compare(self.ninja_version, '>=1.9') else []
-        ninja_compdb = self.ninja_command + ['-t', 'compdb'] + compdb_options + rules
+                rules.add(self.compiler_to_rule_name(compiler))
+                rules.add(self.compiler_to_pch_rule_name(compiler))
+        return rules
+
+    def add_compdb_entry(self, entry: T.Dict[str, str]) -> None:
+        # Formatted like json.dump(entries, f, indent=2) would, each entry
+        # is preceded by its separator from the previous one
+        data = (',\n  ' + json.dumps(entry, indent=2, ensure_ascii=False).replace('\n', '\n  ')).encode('utf-8')
+        if self.compdb_fragments is not None:
+            parts = PurePath(entry['output']).parts
+            for i, p in enumerate(parts[:-1]):
+                if p.endswith('.p'):
+                    self.compdb_fragments.setdefault(os.path.join(*parts[:i + 1]), []).append((self.compdb_size, len(data)))
+                    break
+        self.compdb_spool.write(data)
+        self.compdb_size += len(data)
+
+    # http://clang.llvm.org/docs/JSONCompilationDatabase.html
+    def generate_compdb(self) -> None:
+        # The entries are written to the spool as build statements are added,
+        # with the commands expanded like `ninja -t compdb -x` would do.
         builddir = self.environment.get_build_dir()
-        try:
-            jsondb = subprocess.check_output(ninja_compdb, cwd=builddir)
-            with open(os.path.join(builddir, 'compile_commands.json'), 'wb') as f:
-                f.write(jsondb)
-        except Exception:
-            mlog.warning('Could not create compilation database.', fatal=False)
+        self.write_compdb(os.path.join(builddir, 'compile_commands.json'), [(0, self.compdb_size)])
+        if self.compdb_fragments is not None:
+            # One database per target, in its private directory
+            for privdir, entries in self.compdb_fragments.items():
+                self.write_compdb(os.path.join(builddir, privdir, 'compile_commands.json'), entries)
+
+    def write_compdb(self, fname: str, entries: T.List[T.Tuple[int, int]]) -> None:
+        '''Write the entries at the given offsets and lengths of the spool.'''
+        # Leave the file untouched when nothing changed, tools watching it
+        # would reindex the whole project otherwise.
+        with open(fname + '~', 'wb') as f:
+            if self.compdb_size == 0:
+                f.write(b'[]\n')
+            else:
+                # Without the separator in front of the first entry
+                f.write(b'[')
+                skip = 1
+                for offset, size in entries:
+                    self.compdb_spool.seek(offset + skip)
+                    size -= skip
+                    skip = 0
+                    while size > 0:
+                        chunk = self.compdb_spool.read(min(size, 1024 * 1024))
+                        if not chunk:
+                            break
+                        f.write(chunk)
+                        size -= len(chunk)
+                f.write(b'\n]\n')
+        mesonlib.replace_if_different(fname, fname + '~')
 
     # Get all generated headers. Any source file might need them so
     # we need to add an order dependency to them.
@@ -821,6 +1220,8 @@ class NinjaBackend(backends.Backend):
             # Convert parameters
             if isinstance(parameters, CompilerArgs):
                 parameters = parameters.to_native(copy=True)
+            else:
+                parameters = list(parameters)
             parameters = comp.compute_parameters_with_absolute_paths(parameters, self.build_dir)
             # The new entry
             src_block = {
@@ -988,7 +1389,8 @@ class NinjaBackend(backends.Backend):
             if self.environment.is_llvm_ir(src):
                 o, s = self.generate_llvm_ir_compile(target, src)
             else:
-                o, s = self.generate_single_compile(target, src, True, order_deps=header_deps)
+                o, s = self.generate_single_compile(target, src, True,
+                                                    order_deps=self.narrow_header_deps(target, src, header_deps))
             compiled_sources.append(s)
             source2object[s] = o
             obj_list.append(o)
@@ -996,7 +1398,7 @@ class NinjaBackend(backends.Backend):
                 d_generated_deps.append(o)
 
         use_pch = self.target_uses_pch(target)
-        if use_pch and target.has_pch():
+        if use_pch and (target.has_pch() or target.get_id() in self.auto_pch):
             pch_objects = self.generate_pch(target, header_deps=header_deps)
         else:
             pch_objects = []
@@ -1032,7 +1434,7 @@ class NinjaBackend(backends.Backend):
             else:
                 transpiled_source_files.append(raw_src)
         for src in transpiled_source_files:
-            o, s = self.generate_single_compile(target, src, True, [], header_deps)
+            o, s = self.generate_single_compile(target, src, True, [], self.narrow_header_deps(target, src, header_deps))
             obj_list.append(o)
 
         # Generate compile targets for all the preexisting sources for this target
@@ -1047,7 +1449,8 @@ class NinjaBackend(backends.Backend):
                     unity_src.append(abs_src)
                 else:
                     o, s = self.generate_single_compile(target, src, False, [],
-                                                        header_deps + d_generated_deps + fortran_order_deps,
+                                                        self.narrow_header_deps(target, src, header_deps) +
+                                                        d_generated_deps + fortran_order_deps,
                                                         fortran_inc_args)
                     obj_list.append(o)
                     compiled_sources.append(s)
@@ -1129,11 +1532,13 @@ class NinjaBackend(backends.Backend):
                 pickle.dump(scaninfo, p)
 
         elem = NinjaBuildElement(self.all_outputs, depscan_file, rule_name, pickle_file)
+        # Rescan when a source changes, only the changed ones are read again
+        elem.add_dep([s for s, _ in scan_sources])
         # Add any generated outputs to the order deps of the scan target, so
         # that those sources are present
         for g in generated_source_files:
-            elem.orderdeps.add(g.relative_name())
-        elem.orderdeps.update(object_deps)
+            elem.add_orderdep(g.relative_name())
+        elem.add_orderdep(object_deps)
         self.add_build(elem)
 
     def select_sources_to_scan(self, compiled_sources: T.List[str]
@@ -1205,6 +1610,8 @@ class NinjaBackend(backends.Backend):
             elem.add_item('DEPFILE', rel_dfile)
         if target.console:
             elem.add_item('pool', 'console')
+        elif target.pool is not None:
+            elem.add_item('pool', self.use_custom_pool(target.pool))
         full_name = Path(target.subdir, target.name).as_posix()
         elem.add_item('COMMAND', cmd)
         elem.add_item('description', target.description.format(full_name) + cmd_type)
@@ -1362,13 +1769,13 @@ class NinjaBackend(backends.Backend):
         self.add_rule(NinjaRule('REGENERATE_BUILD',
                                 c, [],
                                 'Regenerating build files.',
-                                extra='generator = 1'))
+                                extra='generator = 1\nrestat = 1'))
 
     def add_rule_comment(self, comment: NinjaComment) -> None:
         self.rules.append(comment)
 
     def add_build_comment(self, comment: NinjaComment) -> None:
-        self.build_elements.append(comment)
+        self.add_build_element(comment)
 
     def add_rule(self, rule: NinjaRule) -> None:
         if rule.name in self.ruledict:
@@ -1378,7 +1785,6 @@ class NinjaBackend(backends.Backend):
 
     def add_build(self, build: NinjaBuildElement) -> None:
         build.check_outputs()
-        self.build_elements.append(build)
 
         if build.rulename != 'phony':
             # reference rule
@@ -1386,18 +1792,103 @@ class NinjaBackend(backends.Backend):
                 build.rule = self.ruledict[build.rulename]
             else:
                 mlog.warning(f"build statement for {build.outfilenames} references nonexistent rule {build.rulename}")
+        build.count_rule_references()
+        if build.rulename in self.compdb_rules:
+            self.add_compdb_entry(build.get_compdb_entry(self.compdb_directory))
+        self.add_build_element(build)
+
+    def add_build_element(self, elem: T.Union[NinjaBuildElement, NinjaComment]) -> None:
+        if self.build_spool is not None:
+            self.write_build(elem, self.build_spool)
+        else:
+            self.build_elements.append(elem)
+
+    def write_build(self, elem: T.Union[NinjaBuildElement, NinjaComment], outfile: T.TextIO) -> None:
+        if isinstance(elem, NinjaBuildElement) and elem.shared_args is not None:
+            # Variables must be defined before they are used
+            shared = elem.shared_args[1]
+            qf = elem.get_quote_func(elem._should_use_rspfile())
+            variable = shared.get_variable(qf)
+            if variable not in self.written_shared_args:
+                self.written_shared_args.add(variable)
+                shared.write(outfile, qf)
+        elem.write(outfile)
+
+    def use_custom_pool(self, name: str) -> str:
+        if name in RESERVED_POOLS:
+            raise MesonException(f'Pool name {name!r} is reserved by Meson.')
+        self.custom_pools.add(name)
+        return name
+
+    def get_custom_pool_depths(self) -> T.Dict[str, int]:
+        depths: T.Dict[str, int] = {}
+        for value in self.environment.coredata.optstore.get_value('backend_pools'):
+            name, sep, depth = value.partition('=')
+            if not sep or not re.fullmatch(r'[\w.-]+', name, re.ASCII) or not depth.isdigit() or int(depth) < 1:
+                raise MesonException(f'Invalid backend_pools value {value!r}, '
+                                     'it must be a pool name and a positive depth like "name=2".')
+            if name in RESERVED_POOLS:
+                raise MesonException(f'Pool name {name!r} is reserved by Meson.')
+            depths[name] = int(depth)
+        return depths
+
+    def estimate_link_memory(self, target: build.BuildTarget, obj_list: T.List[str]) -> T.Tuple[str, int]:
+        '''Pick the pool of the link of a target and estimate the memory it
+        needs, for backend_max_links=auto.'''
+        memory = LINK_BASE_MEMORY + len(obj_list) * LINK_OBJECT_MEMORY
+        try:
+            lto = target.get_option(OptionKey('b_lto'))
+        except KeyError:
+            lto = False
+        if lto:
+            return 'lto_link_pool', memory * LTO_LINK_MEMORY_FACTOR
+        return 'link_pool', memory
+
+    def get_pools(self) -> T.Dict[str, int]:
+        pools: T.Dict[str, int] = {}
+        max_links = self.environment.coredata.optstore.get_value('backend_max_links')
+        if max_links == 'auto':
+            memory = get_physical_memory()
+            if memory is None:
+                mlog.debug('Could not determine the memory of the machine, '
+                           'using one link process per CPU')
+            cpus = os.cpu_count() or 1
+            # Both pools link at the same time, so the memory is split between
+            # them in proportion to what all their links need
+            total = sum(sum(estimates) for estimates in self.link_memory_estimates.values())
+            for name, estimates in self.link_memory_estimates.items():
+                if name == 'link_pool' or estimates:
+                    if memory is None:
+                        depth = cpus
+                    else:
+                        budget = memory * sum(estimates) // total if total else memory
+                        depth = min(budget // max(estimates, default=LINK_BASE_MEMORY), cpus)
+                    pools[name] = max(1, depth)
+        elif max_links > 0:
+            pools['link_pool'] = max_links
+        depths = self.get_custom_pool_depths()
+        for name in sorted(self.custom_pools - depths.keys()):
+            # Custom commands are put in a pool because they are expensive,
+            # so undeclared pools only run one at a time
+            depths[name] = 1
+        pools.update(depths)
+        return pools
+
+    def write_pools(self, outfile: T.TextIO) -> None:
+        for name, depth in self.get_pools().items():
+            outfile.write(f'pool {name}\n  depth = {depth}\n\n')
 
     def write_rules(self, outfile: T.TextIO) -> None:
-        for b in self.build_elements:
-            if isinstance(b, NinjaBuildElement):
-                b.count_rule_references()
-
         for r in self.rules:
             r.write(outfile)
 
     def write_builds(self, outfile: T.TextIO) -> None:
-        for b in ProgressBar(self.build_elements, desc='Writing build.ninja'):
-            b.write(outfile)
+        if self.build_spool is not None:
+            self.build_spool.seek(0)
+            shutil.copyfileobj(self.build_spool, outfile)
+        else:
+            for b in ProgressBar(self.build_elements, desc='Writing build.ninja'):
+                self.write_build(b, outfile)
         mlog.log_timestamp("build.ninja generated")
 
     def generate_phony(self) -> None:
@@ -1973,11 +2464,17 @@ class NinjaBackend(backends.Backend):
             args.extend(rustc.get_linker_always_args())
 
         args += self.generate_basic_compiler_args(target, rustc)
-        # Rustc replaces - with _. spaces or dots are not allowed, so we replace them with underscores
-        args += ['--crate-name', target.name.replace('-', '_').replace(' ', '_').replace('.', '_')]
+        args += ['--crate-name', self.get_rust_crate_name(target)]
         depfile = os.path.join(target.subdir, target.name + '.d')
-        args += ['--emit', f'dep-info={depfile}', '--emit', f'link={target_name}']
-        args += ['--out-dir', self.get_target_private_dir(target)]
+        # With pipelining, rlibs are compiled twice, once stopping as soon as
+        # the metadata is written. Both need to emit the same outputs for the
+        # metadata to match the rlib, but not in the same place.
+        pipelined = self.has_rust_metadata(target)
+        # Compiling an rlib only needs the metadata of the crates it uses
+        metadata_only = cratetype == 'rlib' and self.use_rust_pipelining(rustc)
+        if not pipelined:
+            args += ['--emit', f'dep-info={depfile}', '--emit', f'link={target_name}']
+            args += ['--out-dir', self.get_target_private_dir(target)]
         args += ['-C', 'metadata=' + target.get_id()]
         args += target.get_extra_args('rust')
 
@@ -2009,11 +2506,18 @@ class NinjaBackend(backends.Backend):
             args.append(f'-l{type_}={libname}')
 
         linkdirs = mesonlib.OrderedSet()
+        metadata_dirs: mesonlib.OrderedSet[str] = mesonlib.OrderedSet()
         external_deps = target.external_deps.copy()
         target_deps = target.get_dependencies()
         for d in target_deps:
             linkdirs.add(d.subdir)
-            deps.append(self.get_dependency_filename(d))
+            d_metadata = None
+            if metadata_only and self.has_rust_metadata(d):
+                d_metadata = self.get_rust_metadata_filename(d)
+                metadata_dirs.add(os.path.dirname(d_metadata))
+                deps.append(d_metadata)
+            else:
+                deps.append(self.get_dependency_filename(d))
             if isinstance(d, build.StaticLibrary):
                 external_deps.extend(d.external_deps)
             if d.uses_rust_abi():
@@ -2024,7 +2528,7 @@ class NinjaBackend(backends.Backend):
                 # dependency, so that collisions with libraries in rustc's
                 # sysroot don't cause ambiguity
                 d_name = self._get_rust_dependency_name(target, d)
-                args += ['--extern', '{}={}'.format(d_name, os.path.join(d.subdir, d.filename))]
+                args += ['--extern', '{}={}'.format(d_name, d_metadata or os.path.join(d.subdir, d.filename))]
                 project_deps.append(RustDep(d_name, self.rust_crates[d.name].order))
                 continue
 
@@ -2074,6 +2578,8 @@ class NinjaBackend(backends.Backend):
         for d in linkdirs:
             d = d or '.'
             args.append(f'-L{d}')
+        for d in metadata_dirs:
+            args.append(f'-Ldependency={d}')
 
         # Because of the way rustc links, this must come after any potential
         # library need to link with their stdlibs (C++ and Fortran, for example)
@@ -2126,7 +2632,36 @@ class NinjaBackend(backends.Backend):
                                      proc_macro_dylib_path,
                                      project_deps)
 
-        compiler_name = self.compiler_to_rule_name(rustc)
+        if pipelined:
+            privdir = self.get_target_private_dir(target)
+            metadata = self.get_rust_metadata_filename(target)
+            # Where the outputs that are not used go
+            pipelined_dir = os.path.join(privdir, 'pipelined')
+            os.makedirs(os.path.join(self.environment.get_build_dir(), pipelined_dir), exist_ok=True)
+            metadata_depfile = os.path.join(pipelined_dir, target.name + '.d')
+            metadata_args = args + ['--emit', f'dep-info={metadata_depfile}',
+                                    '--emit', f'metadata={metadata}',
+                                    '--emit', 'link=' + os.path.join(pipelined_dir, target.get_filename()),
+                                    '--out-dir', pipelined_dir]
+            args += ['--emit', f'dep-info={depfile}',
+                     '--emit', 'metadata=' + os.path.join(pipelined_dir, os.path.basename(metadata)),
+                     '--emit', f'link={target_name}',
+                     '--out-dir', privdir]
+
+            rule = self.get_compiler_rule_name('rust', rustc.for_machine, 'METADATA')
+            element = NinjaBuildElement(self.all_outputs, metadata, rule, main_rust_file)
+            if orderdeps:
+                element.add_orderdep(orderdeps)
+            if deps:
+                element.add_dep(deps)
+            element.add_item('ARGS', metadata_args)
+            element.add_item('targetdep', metadata_depfile)
+            element.add_item('cratetype', cratetype)
+            self.add_build(element)
+
+            compiler_name = self.get_compiler_rule_name('rust', rustc.for_machine, 'PIPELINED')
+        else:
+            compiler_name = self.compiler_to_rule_name(rustc)
         element = NinjaBuildElement(self.all_outputs, target_name, compiler_name, main_rust_file)
         if orderdeps:
             element.add_orderdep(orderdeps)
@@ -2332,7 +2867,7 @@ class NinjaBackend(backends.Backend):
                     ranlib = ['ranlib']
                 cmdlist.extend(['&&'] + ranlib + ['-c', '$out'])
             description = 'Linking static target $out'
-            if num_pools > 0:
+            if num_pools != 0:
                 pool = 'pool = link_pool'
             else:
                 pool = None
@@ -2351,7 +2886,7 @@ class NinjaBackend(backends.Backend):
                 command = compiler.get_linker_exelist()
                 args = ['$ARGS'] + NinjaCommandArg.list(compiler.get_linker_output_args('$out'), Quoting.none) + ['$in', '$LINK_ARGS']
                 description = 'Linking target $out'
-                if num_pools > 0:
+                if num_pools != 0:
                     pool = 'pool = link_pool'
                 else:
                     pool = None
@@ -2423,6 +2958,37 @@ class NinjaBackend(backends.Backend):
         depstyle = 'gcc'
         self.add_rule(NinjaRule(rule, command, [], description, deps=depstyle,
                                 depfile=depfile))
+        if self.use_rust_pipelining(compiler):
+            wrapper = self.environment.get_build_command() + ['--internal', 'rustc_pipelined']
+            rule = self.get_compiler_rule_name('rust', compiler.for_machine, 'PIPELINED')
+            self.add_rule(NinjaRule(rule, wrapper + command, [], description, deps=depstyle,
+                                    depfile=depfile))
+            rule = self.get_compiler_rule_name('rust', compiler.for_machine, 'METADATA')
+            description = 'Checking Rust source $in'
+            self.add_rule(NinjaRule(rule, wrapper + ['--metadata-only'] + command, [], description,
+                                    deps=depstyle, depfile=depfile))
+
+    def use_rust_pipelining(self, rustc: Compiler) -> bool:
+        '''Whether rlibs get their metadata written by a separate build
+        statement, which crates depending on them wait for instead of the
+        rlib. rustc supports --json=artifacts since 1.38.'''
+        return (self.environment.coredata.optstore.get_value('backend_rust_pipelining') and
+                mesonlib.version_compare(rustc.version, '>= 1.38.0'))
+
+    def has_rust_metadata(self, target: build.Target) -> bool:
+        return (isinstance(target, build.StaticLibrary) and target.uses_rust()
+                and target.rust_crate_type == 'rlib'
+                and self.use_rust_pipelining(target.compilers['rust']))
+
+    @staticmethod
+    def get_rust_crate_name(target: build.BuildTarget) -> str:
+        # Rustc replaces - with _. spaces or dots are not allowed, so we replace them with underscores
+        return target.name.replace('-', '_').replace(' ', '_').replace('.', '_')
+
+    def get_rust_metadata_filename(self, target: build.BuildTarget) -> str:
+        # Named like rustc would, so that it is found when looking for the
+        # crates that the dependencies of a crate depend on
+        return os.path.join(self.get_target_private_dir(target), f'lib{self.get_rust_crate_name(target)}.rmeta')
 
     def generate_swift_compile_rules(self, compiler):
         rule = self.compiler_to_rule_name(compiler)
@@ -2596,6 +3162,9 @@ https://gcc.gnu.org/bugzilla/show_bug.cgi?id=47485'''))
         infilelist = genlist.get_inputs()
         outfilelist = genlist.get_outputs()
         extra_dependencies = self.get_target_depend_files(genlist)
+        if generator.batch_size > 1:
+            self.generate_genlist_batches(genlist, target, extra_dependencies)
+            return
         for i, curfile in enumerate(infilelist):
             if len(generator.outputs) == 1:
                 sole_output = os.path.join(self.get_target_private_dir(target), outfilelist[i])
@@ -2631,6 +3200,8 @@ https://gcc.gnu.org/bugzilla/show_bug.cgi?id=47485'''))
             elem.add_dep([self.get_target_filename(x) for x in generator.depends])
             if generator.depfile is not None:
                 elem.add_item('DEPFILE', depfile)
+            if generator.pool is not None:
+                elem.add_item('pool', self.use_custom_pool(generator.pool))
             if len(extra_dependencies) > 0:
                 elem.add_dep(extra_dependencies)
 
@@ -2648,6 +3219,59 @@ https://gcc.gnu.org/bugzilla/show_bug.cgi?id=47485'''))
             elem.add_item('COMMAND', cmdlist)
             self.add_build(elem)
 
+    def generate_genlist_batches(self, genlist: build.GeneratedList, target: build.BuildTarget,
+                                 extra_dependencies: T.List[str]) -> None:
+        '''Generate one build statement for every batch_size inputs of a
+        generated list, where @INPUT@ and @OUTPUT@ stand for all the inputs
+        and outputs of the batch, to start the generator fewer times.'''
+        generator = genlist.get_generator()
+        exe = generator.get_exe()
+        privdir = self.get_target_private_dir(target)
+        os.makedirs(os.path.join(self.environment.get_build_dir(), self.get_target_dir(target)), exist_ok=True)
+        infilelist = genlist.get_inputs()
+        for start in range(0, len(infilelist), generator.batch_size):
+            batch = infilelist[start:start + generator.batch_size]
+            infilenames = [f.rel_to_builddir(self.build_to_src, privdir) for f in batch]
+            outfiles = [os.path.join(privdir, o) for f in batch for o in genlist.get_outputs_for(f)]
+            args: T.List[str] = []
+            for a in generator.arglist:
+                if a == '@INPUT@':
+                    args += infilenames
+                elif a == '@OUTPUT@':
+                    args += outfiles
+                else:
+                    args.append(a)
+            if generator.depfile is None:
+                rulename = 'CUSTOM_COMMAND'
+            else:
+                # A single depfile, which may list all the outputs of the batch
+                rulename = 'CUSTOM_COMMAND_DEP'
+                depfile = os.path.join(privdir, generator.get_dep_outname(infilenames[0]))
+                args = [a.replace('@DEPFILE@', depfile) for a in args]
+            args = self.replace_paths(target, args, override_subdir=genlist.subdir)
+            cmdlist, reason = self.as_meson_exe_cmdline(exe,
+                                                        self.replace_extra_args(args, genlist),
+                                                        env=genlist.env)
+
+            elem = NinjaBuildElement(self.all_outputs, outfiles, rulename, infilenames)
+            elem.add_dep([self.get_target_filename(x) for x in generator.depends])
+            if generator.depfile is not None:
+                elem.add_item('DEPFILE', depfile)
+            if generator.pool is not None:
+                elem.add_item('pool', self.use_custom_pool(generator.pool))
+            if extra_dependencies:
+                elem.add_dep(extra_dependencies)
+            if reason:
+                reason = f' (wrapped by meson {reason})'
+            what = f'from {str(batch[0])!r}'
+            if len(batch) > 1:
+                what += f' and {len(batch) - 1} more'
+            elem.add_item('DESC', f'Generating {what}{reason}')
+            if isinstance(exe, build.BuildTarget):
+                elem.add_dep(self.get_target_filename(exe))
+            elem.add_item('COMMAND', cmdlist)
+            self.add_build(elem)
+
     def scan_fortran_module_outputs(self, target):
         """
         Find all module and submodule made available in a Fortran code file.
@@ -2664,8 +3288,6 @@ https://gcc.gnu.org/bugzilla/show_bug.cgi?id=47485'''))
             self.fortran_deps[target.get_basename()] = {}
             return
 
-        modre = re.compile(FORTRAN_MODULE_PAT, re.IGNORECASE)
-        submodre = re.compile(FORTRAN_SUBMOD_PAT, re.IGNORECASE)
         module_files = {}
         submodule_files = {}
         for s in target.get_sources():
@@ -2676,29 +3298,19 @@ https://gcc.gnu.org/bugzilla/show_bug.cgi?id=47485'''))
                 continue
             filename = s.absolute_path(self.environment.get_source_dir(),
                                        self.environment.get_build_dir())
-            # Fortran keywords must be ASCII.
-            with open(filename, encoding='ascii', errors='ignore') as f:
-                for line in f:
-                    modmatch = modre.match(line)
-                    if modmatch is not None:
-                        modname = modmatch.group(1).lower()
-                        if modname in module_files:
-                            raise InvalidArguments(
-                                f'Namespace collision: module {modname} defined in '
-                                f'two files {module_files[modname]} and {s}.')
-                        module_files[modname] = s
-                    else:
-                        submodmatch = submodre.match(line)
-                        if submodmatch is not None:
-                            # '_' is arbitrarily used to distinguish submod from mod.
-                            parents = submodmatch.group(1).lower().split(':')
-                            submodname = parents[0] + '_' + submodmatch.group(2).lower()
-
-                            if submodname in submodule_files:
-                                raise InvalidArguments(
-                                    f'Namespace collision: submodule {submodname} defined in '
-                                    f'two files {submodule_files[submodname]} and {s}.')
-                            submodule_files[submodname] = s
+            scan = self.get_fortran_scan_cache().get(filename)
+            for modname in scan.modules:
+                if modname in module_files:
+                    raise InvalidArguments(
+                        f'Namespace collision: module {modname} defined in '
+                        f'two files {module_files[modname]} and {s}.')
+                module_files[modname] = s
+            for submodname in scan.submodules:
+                if submodname in submodule_files:
+                    raise InvalidArguments(
+                        f'Namespace collision: submodule {submodname} defined in '
+                        f'two files {submodule_files[submodname]} and {s}.')
+                submodule_files[submodname] = s
 
         self.fortran_deps[target.get_basename()] = {**module_files, **submodule_files}
 
@@ -2713,9 +3325,31 @@ https://gcc.gnu.org/bugzilla/show_bug.cgi?id=47485'''))
         tdeps = self.fortran_deps[target.get_basename()]
         srcdir = Path(self.source_dir)
 
-        mod_files = _scan_fortran_file_deps(src, srcdir, dirname, tdeps, compiler)
+        mod_files = _scan_fortran_file_deps(src, srcdir, dirname, tdeps, compiler,
+                                            self.get_fortran_scan_cache())
         return mod_files
 
+    def get_fortran_scan_cache(self) -> FortranScanCache:
+        if self.fortran_scan_cache is None:
+            self.fortran_scan_cache = FortranScanCache(
+                os.path.join(self.environment.get_scratch_dir(), 'fortran_scan.dat'))
+        return self.fortran_scan_cache
+
+    def prescan_fortran_sources(self) -> None:
+        '''Scan the Fortran sources of all targets up front, so that the
+        files that are not in the cache can be scanned in parallel.'''
+        if self.use_dyndeps_for_fortran():
+            return
+        compiler = self.environment.coredata.compilers.host.get('fortran')
+        if compiler is None:
+            return
+        source_dir = self.environment.get_source_dir()
+        build_dir = self.environment.get_build_dir()
+        self.get_fortran_scan_cache().prescan(
+            s.absolute_path(source_dir, build_dir)
+            for t in self.build.get_targets().values() if isinstance(t, build.BuildTarget)
+            for s in t.get_sources() if compiler.can_compile(s))
+
     def get_no_stdlib_link_args(self, target, linker):
         if hasattr(linker, 'language') and linker.language in self.build.stdlibs[target.for_machine]:
             return linker.get_no_stdlib_link_args()
@@ -2920,6 +3554,49 @@ https://gcc.gnu.org/bugzilla/show_bug.cgi?id=47485'''))
         commands += compiler.get_include_args(self.get_target_private_dir(target), False)
         return commands
 
+    @lru_cache(maxsize=None)
+    def _generate_single_compile_source_args(self, target: build.BuildTarget, compiler: Compiler) -> \
+            T.Tuple[ImmutableListProtocol[str], ImmutableListProtocol[str]]:
+        '''Arguments to compile any source of the target with compiler, in
+        GCC style and native form.'''
+        commands = self._generate_single_compile_base_args(target, compiler)
+
+        # Include PCH header as first thing as it must be the first one or it will be
+        # ignored by gcc https://gcc.gnu.org/bugzilla/show_bug.cgi?id=100462
+        use_pch = self.target_uses_pch(target)
+        if use_pch and 'mw' not in compiler.id:
+            commands += self.get_pch_include_args(compiler, target)
+
+        commands += self._generate_single_compile_target_args(target, compiler)
+
+        # Metrowerks compilers require PCH include args to come after intraprocedural analysis args
+        if use_pch and 'mw' in compiler.id:
+            commands += self.get_pch_include_args(compiler, target)
+
+        return list(commands), commands.to_native(copy=True)
+
+    def get_shared_compile_args(self, target: build.BuildTarget, compiler: Compiler,
+                                commands: ImmutableListProtocol[str],
+                                extra_args: T.Tuple[T.Tuple[str, ...], ...]) -> NinjaSharedArgs:
+        '''Compile arguments for the sources of a target, written once to
+        build.ninja for all of them.
+
+        extra_args are added one group after the other after commands.
+        '''
+        all_shared = self.shared_compile_args.setdefault((target.get_id(), compiler.get_language()), {})
+        shared = all_shared.get(extra_args)
+        if shared is None:
+            args = compiler.compiler_args(commands)
+            for group in extra_args:
+                args += group
+            name = re.sub(r'[^a-zA-Z0-9_]', '_', f'ARGS_{compiler.get_language()}_{target.get_id()}')
+            # There are several sets of arguments if they depend on the source
+            if all_shared:
+                name += f'_{len(all_shared)}'
+            shared = NinjaSharedArgs(name, tuple(args.to_native()))
+            all_shared[extra_args] = shared
+        return shared
+
     # Returns a dictionary, mapping from each compiler src type (e.g. 'c', 'cpp', etc.) to a list of compiler arg strings
     # used for that respective src type.
     # Currently used for the purpose of populating VisualStudio intellisense fields but possibly useful in other scenarios.
@@ -2964,27 +3641,13 @@ https://gcc.gnu.org/bugzilla/show_bug.cgi?id=47485'''))
             raise AssertionError(f'BUG: sources should not contain headers {src!r}')
 
         compiler = get_compiler_for_source(target.compilers.values(), src)
-        commands = self._generate_single_compile_base_args(target, compiler)
-
-        # Include PCH header as first thing as it must be the first one or it will be
-        # ignored by gcc https://gcc.gnu.org/bugzilla/show_bug.cgi?id=100462
-        use_pch = self.target_uses_pch(target)
-        if use_pch and 'mw' not in compiler.id:
-            commands += self.get_pch_include_args(compiler, target)
-
-        commands += self._generate_single_compile_target_args(target, compiler)
-
-        # Metrowerks compilers require PCH include args to come after intraprocedural analysis args
-        if use_pch and 'mw' in compiler.id:
-            commands += self.get_pch_include_args(compiler, target)
-
-        commands = commands.compiler.compiler_args(commands)
+        commands, native_commands = self._generate_single_compile_source_args(target, compiler)
 
         # Create introspection information
         if is_generated is False:
-            self.create_target_source_introspection(target, compiler, commands, [src], [], unity_sources)
+            self.create_target_source_introspection(target, compiler, native_commands, [src], [], unity_sources)
         else:
-            self.create_target_source_introspection(target, compiler, commands, [], [src], unity_sources)
+            self.create_target_source_introspection(target, compiler, native_commands, [], [src], unity_sources)
 
         build_dir = self.environment.get_build_dir()
         if isinstance(src, File):
@@ -3004,11 +3667,12 @@ https://gcc.gnu.org/bugzilla/show_bug.cgi?id=47485'''))
         dep_file = compiler.depfile_for_object(rel_obj)
 
         # Add MSVC debug file generation compile flags: /Fd /FS
-        commands += self.get_compile_debugfile_args(compiler, target, rel_obj)
+        debugfile_args = self.get_compile_debugfile_args(compiler, target, rel_obj)
+        module_args: T.List[str] = []
 
         # PCH handling
         if self.target_uses_pch(target):
-            pchlist = target.get_pch(compiler.language)
+            pchlist = self.get_target_pch(target, compiler.language)
         else:
             pchlist = []
         if not pchlist:
@@ -3029,7 +3693,7 @@ https://gcc.gnu.org/bugzilla/show_bug.cgi?id=47485'''))
             # outdir argument instead.
             # https://github.com/mesonbuild/meson/issues/1348
             if not is_generated:
-                abs_src = Path(build_dir) / rel_src
+                abs_src = Path(src.absolute_path(self.environment.get_source_dir(), build_dir))
                 extra_deps += self.get_fortran_deps(compiler, abs_src, target)
             if not self.use_dyndeps_for_fortran():
                 # Dependency hack. Remove once multiple outputs in Ninja is fixed:
@@ -3045,9 +3709,7 @@ https://gcc.gnu.org/bugzilla/show_bug.cgi?id=47485'''))
                                                     'FORTRAN_DEP_HACK' + crstr,
                                                     rel_obj)
                         self.add_build(depelem)
-            commands += compiler.get_module_outdir_args(self.get_target_private_dir(target))
-        if extra_args is not None:
-            commands.extend(extra_args)
+            module_args = compiler.get_module_outdir_args(self.get_target_private_dir(target))
 
         element = NinjaBuildElement(self.all_outputs, rel_obj, compiler_name, rel_src)
         self.add_header_deps(target, element, header_deps)
@@ -3086,7 +3748,18 @@ https://gcc.gnu.org/bugzilla/show_bug.cgi?id=47485'''))
                     result += c
                 return result
             element.add_item('CUDA_ESCAPED_TARGET', quote_make_target(rel_obj))
-        element.add_item('ARGS', commands)
+        if module_args or extra_args:
+            shared = self.get_shared_compile_args(target, compiler, commands,
+                                                  (tuple(debugfile_args), tuple(module_args), tuple(extra_args or ())))
+            element.add_shared_item('ARGS', shared, [])
+        else:
+            # The debug file is usually different for every object. These
+            # arguments only name a file and do not interact with the others,
+            # so they can follow the shared ones.
+            shared = self.get_shared_compile_args(target, compiler, commands, ())
+            if debugfile_args:
+                debugfile_args = compiler.compiler_args(debugfile_args).to_native()
+            element.add_shared_item('ARGS', shared, debugfile_args)
 
         self.add_dependency_scanner_entries_to_element(target, compiler, element, src)
         self.add_build(element)
@@ -3111,6 +3784,33 @@ https://gcc.gnu.org/bugzilla/show_bug.cgi?id=47485'''))
     def get_dep_scan_file_for(self, target: build.BuildTarget) -> str:
         return os.path.join(self.get_target_private_dir(target), 'depscan.dd')
 
+    def narrow_header_deps(self, target: build.BuildTarget, src: mesonlib.File,
+                           header_deps: T.List[mesonlib.FileOrString]) -> T.List[mesonlib.FileOrString]:
+        '''Keep the generated headers that the object of src included in the
+        previous build, and those that do not exist yet.
+
+        Ninja adds the headers it recorded from the depfile to the inputs of
+        the compilation, so it does not need to wait for the others.'''
+        if not self.recorded_deps or not header_deps:
+            return header_deps
+        rel_obj = os.path.join(self.get_target_private_dir(target), self.object_filename_from_source(target, src))
+        if rel_obj not in self.recorded_deps:
+            return header_deps
+        included = set(self.recorded_deps[rel_obj])
+        build_dir = self.environment.get_build_dir()
+        narrowed: T.List[mesonlib.FileOrString] = []
+        for d in header_deps:
+            if isinstance(d, File):
+                path = d.rel_to_builddir(self.build_to_src)
+            elif not self.has_dir_part(d):
+                path = os.path.join(self.get_target_private_dir(target), d)
+            else:
+                path = d
+            path = os.path.normpath(path)
+            if path in included or not os.path.exists(os.path.join(build_dir, path)):
+                narrowed.append(d)
+        return narrowed
+
     def add_header_deps(self, target, ninja_element, header_deps):
         for d in header_deps:
             if isinstance(d, File):
@@ -3219,8 +3919,168 @@ https://gcc.gnu.org/bugzilla/show_bug.cgi?id=47485'''))
             elem.add_item('ARGS', commands)
             elem.add_item('DEPFILE', dep)
             self.add_build(elem)
+        for lang, header in self.auto_pch.get(target.get_id(), {}).items():
+            compiler = target.compilers[lang]
+            (commands, dep, dst, _) = self.generate_gcc_pch_command(target, compiler, header)
+            elem = NinjaBuildElement(self.all_outputs, dst, self.compiler_to_pch_rule_name(compiler), header)
+            self.add_header_deps(target, elem, header_deps)
+            elem.add_item('ARGS', commands)
+            elem.add_item('DEPFILE', dep)
+            self.add_build(elem)
         return pch_objects
 
+    def get_target_pch(self, target: build.BuildTarget, lang: str) -> T.List[str]:
+        '''The precompiled header of a target for a language, which is either
+        its own or the one selected by backend_auto_pch.'''
+        header = self.auto_pch.get(target.get_id(), {}).get(lang)
+        return [header] if header is not None else target.get_pch(lang)
+
+    def get_pch_include_args(self, compiler: Compiler, target: build.BuildTarget) -> T.List[str]:
+        header = self.auto_pch.get(target.get_id(), {}).get(compiler.get_language())
+        if header is None:
+            return super().get_pch_include_args(compiler, target)
+        pchpath = self.get_target_private_dir(target)
+        return compiler.get_include_args(pchpath, False) + compiler.get_pch_use_args(pchpath, header)
+
+    def select_auto_pch(self, deps: T.Dict[str, T.List[str]]) -> None:
+        '''Generate a precompiled header for the C and C++ sources of the
+        targets that do not have one of their own, from the external headers
+        that most of them included directly in the previous build, as
+        recorded in deps.'''
+        build_dir = self.environment.get_build_dir()
+        if not deps:
+            return
+        for target in self.build.get_targets().values():
+            # Unity builds already parse the headers once for many sources
+            if not isinstance(target, build.BuildTarget) or target.is_unity or not self.target_uses_pch(target):
+                continue
+            for lang in ['c', 'cpp']:
+                compiler = target.compilers.get(lang)
+                # Only precompiled headers that are used with -include can be
+                # generated without changing the sources
+                if compiler is None or compiler.get_id() not in {'gcc', 'clang'} or target.get_pch(lang):
+                    continue
+                header = os.path.join(self.get_target_private_dir(target), f'meson_auto_pch-{lang}.h')
+                selected = self.select_auto_pch_headers(target, compiler, header, deps)
+                if selected is None:
+                    continue
+                includes, saving = selected
+                abs_header = os.path.join(build_dir, header)
+                os.makedirs(os.path.dirname(abs_header), exist_ok=True)
+                with open(abs_header + '.tmp', 'w', encoding='utf-8') as f:
+                    f.write('/* Headers included by most sources of this target, generated by Meson */\n')
+                    f.writelines(f'#include <{i}>\n' for i in includes)
+                mesonlib.replace_if_different(abs_header, abs_header + '.tmp')
+                self.auto_pch.setdefault(target.get_id(), {})[lang] = header
+                mlog.log('Precompiling', mlog.bold(str(len(includes))), compiler.get_display_language(),
+                         'headers for target', mlog.bold(target.get_basename()),
+                         f'(estimated to save {saving:.1f}s of compile time)')
+
+    def select_auto_pch_headers(self, target: build.BuildTarget, compiler: Compiler, header: str,
+                                deps: T.Dict[str, T.List[str]]) -> T.Optional[T.Tuple[T.List[str], float]]:
+        '''The external headers that enough of the sources of a target built
+        by a compiler included directly, in the order they were first
+        included, and the compile time in seconds that precompiling them is
+        estimated to save from the previous build.
+
+        The precompiled headers are included ahead of everything else, so a
+        header is only selected if all the sources that include it do so
+        before any header of the project, which may define macros that it
+        depends on.
+
+        None if there are too few of them, or if precompiling them would not
+        save anything.
+        '''
+        source_dir = self.environment.get_source_dir()
+        build_dir = self.environment.get_build_dir()
+        targetdir = self.get_target_private_dir(target)
+        history = self.get_build_history()
+        pch_output = os.path.join(targetdir, compiler.get_pch_name(header))
+        # When the header was precompiled by the previous build, what it
+        # includes may only be listed as a dependency of the precompiled header
+        pch_deps = deps.get(pch_output, [])
+
+        def is_internal(path: str) -> bool:
+            return path.startswith((source_dir + os.sep, build_dir + os.sep))
+
+        sizes: T.Dict[str, int] = {}
+
+        def get_size(path: str) -> int:
+            if path not in sizes:
+                try:
+                    sizes[path] = os.stat(path).st_size
+                except OSError:
+                    sizes[path] = 0
+            return sizes[path]
+
+        objects: T.List[T.Tuple[str, T.List[str], T.List[str]]] = []
+        counts: T.Counter[str] = Counter()
+        # Included after a header of the project by some source
+        late: T.Set[str] = set()
+        for src in target.get_sources():
+            if (self.environment.is_header(src) or not compiler.can_compile(src)
+                    or get_compiler_for_source(target.compilers.values(), src) is not compiler):
+                continue
+            includes = scan_top_level_includes(src.absolute_path(source_dir, build_dir))
+            if includes is None:
+                return None
+            obj = self.object_filename_from_source(target, src, targetdir)
+            if obj not in deps:
+                # Not built yet
+                continue
+            paths = [os.path.normpath(os.path.join(build_dir, d)) for d in deps[obj] + pch_deps]
+            external = [p for p in paths if not is_internal(p)]
+            found: T.Set[str] = set()
+            after_internal = False
+            for i in includes:
+                suffix = os.sep + os.path.normpath(i)
+                if (not any(p.endswith(suffix) for p in external)
+                        or any(p.endswith(suffix) for p in paths if is_internal(p))):
+                    # A header of the project, or one that was not found
+                    after_internal = True
+                    continue
+                if i in found:
+                    continue
+                found.add(i)
+                if after_internal:
+                    late.add(i)
+                else:
+                    # Counters remember the order in which keys were added
+                    counts[i] += 1
+            objects.append((obj, paths, external))
+
+        threshold = AUTO_PCH_MIN_SHARE * len(objects)
+        if len(objects) < AUTO_PCH_MIN_SOURCES:
+            return None
+        selected = [i for i, count in counts.items() if count >= threshold and i not in late]
+        if not selected:
+            return None
+
+        pch_time = history.get(pch_output.replace('\\', '/'))
+        if pch_time is not None:
+            # Every source but one would parse the headers again
+            return selected, pch_time * (len(objects) - 1)
+        # The headers that the selected ones pull in are approximated by the
+        # external headers that enough sources depend on, and the time that
+        # parsing them takes by their share of the size of what each source
+        # depends on.
+        common = {p for p, count in Counter(p for _, _, e in objects for p in set(e)).items()
+                  if count >= threshold}
+        saved = 0.0
+        pch_cost = 0.0
+        for obj, paths, external in objects:
+            total = sum(get_size(p) for p in set(paths))
+            duration = history.get(obj.replace('\\', '/'))
+            if not total or duration is None:
+                continue
+            covered = duration * sum(get_size(p) for p in set(external) if p in common) / total
+            saved += covered
+            pch_cost = max(pch_cost, covered)
+        saving = saved - pch_cost
+        if saving <= 0:
+            return None
+        return selected, saving
+
     def get_target_shsym_filename(self, target):
         # Always name the .symbols file after the primary build output because it always exists
         targetdir = self.get_target_private_dir(target)
@@ -3315,8 +4175,9 @@ https://gcc.gnu.org/bugzilla/show_bug.cgi?id=47485'''))
     def guess_library_absolute_path(self, linker, libname, search_dirs, patterns) -> Path:
         from ..compilers.c import CCompiler
         for d in search_dirs:
+            contents = CCompiler._get_library_dir_contents(d)
             for p in patterns:
-                trial = CCompiler._get_trials_from_pattern(p, d, libname)
+                trial = CCompiler._get_trials_from_pattern(p, d, libname, contents)
                 if not trial:
                     continue
                 trial = CCompiler._get_file_from_list(self.environment, trial)
@@ -3547,6 +4408,12 @@ https://gcc.gnu.org/bugzilla/show_bug.cgi?id=47485'''))
         elem = NinjaBuildElement(self.all_outputs, outname, linker_rule, obj_list, implicit_outs=implicit_outs)
         elem.add_dep(dep_targets + custom_target_libraries)
         elem.add_item('LINK_ARGS', commands)
+        if (self.environment.coredata.optstore.get_value('backend_max_links') == 'auto'
+                and not isinstance(target, build.StaticLibrary)):
+            pool, memory = self.estimate_link_memory(target, obj_list)
+            self.link_memory_estimates[pool].append(memory)
+            if pool != 'link_pool':
+                elem.add_item('pool', pool)
         self.create_target_linker_introspection(target, linker, commands)
         return elem
 
@@ -3657,14 +4524,12 @@ https://gcc.gnu.org/bugzilla/show_bug.cgi?id=47485'''))
         self.generate_clangtool('format', 'check')
 
     def generate_clangtidy(self) -> None:
-        import shutil
         if not shutil.which('clang-tidy'):
             return
         self.generate_clangtool('tidy')
         self.generate_clangtool('tidy', 'fix')
 
     def generate_tags(self, tool: str, target_name: str) -> None:
-        import shutil
         if not shutil.which(tool):
             return
         if target_name in self.all_outputs:
@@ -3765,10 +4630,25 @@ https://gcc.gnu.org/bugzilla/show_bug.cgi?id=47485'''))
         return list(data.values())
 
 
-def _scan_fortran_file_deps(src: Path, srcdir: Path, dirname: Path, tdeps, compiler) -> T.List[str]:
+class FortranStatements(T.NamedTuple):
+
+    """Statements of a Fortran source file that Meson cares about.
+
+    :param modules: Modules defined in the file
+    :param submodules: Submodules defined in the file, as ``ancestor_child``
+    :param statements: ``include``, ``use`` and ``submodule`` statements in
+        the order they appear, as a kind and the lowercased names they refer
+        to (the file name for ``include``)
     """
-    scan a Fortran file for dependencies. Needs to be distinct from target
-    to allow for recursion induced by `include` statements.er
+
+    modules: T.List[str]
+    submodules: T.List[str]
+    statements: T.List[T.Tuple[str, ...]]
+
+
+def read_fortran_statements(fname: str) -> FortranStatements:
+    """
+    Read the statements of a Fortran file relevant to its dependencies.
 
     It makes a number of assumptions, including
 
@@ -3777,75 +4657,181 @@ def _scan_fortran_file_deps(src: Path, srcdir: Path, dirname: Path, tdeps, compi
     Regex
     -----
 
-    * `incre` works for `#include "foo.f90"` and `include "foo.f90"`
-    * `usere` works for legacy and Fortran 2003 `use` statements
-    * `submodre` is for Fortran >= 2008 `submodule`
+    * `FORTRAN_INCLUDE_RE` works for `#include "foo.f90"` and `include "foo.f90"`
+    * `FORTRAN_USE_RE` works for legacy and Fortran 2003 `use` statements
+    * `FORTRAN_SUBMOD_RE` is for Fortran >= 2008 `submodule`
     """
-
-    incre = re.compile(FORTRAN_INCLUDE_PAT, re.IGNORECASE)
-    usere = re.compile(FORTRAN_USE_PAT, re.IGNORECASE)
-    submodre = re.compile(FORTRAN_SUBMOD_PAT, re.IGNORECASE)
-
-    mod_files = []
-    src = Path(src)
-    with src.open(encoding='ascii', errors='ignore') as f:
+    modules: T.List[str] = []
+    submodules: T.List[str] = []
+    statements: T.List[T.Tuple[str, ...]] = []
+    # Fortran keywords must be ASCII.
+    with open(fname, encoding='ascii', errors='ignore') as f:
         for line in f:
-            # included files
-            incmatch = incre.match(line)
+            incmatch = FORTRAN_INCLUDE_RE.match(line)
             if incmatch is not None:
-                incfile = src.parent / incmatch.group(1)
-                # NOTE: src.parent is most general, in particular for CMake subproject with Fortran file
-                # having an `include 'foo.f'` statement.
-                if incfile.suffix.lower()[1:] in compiler.file_suffixes:
-                    mod_files.extend(_scan_fortran_file_deps(incfile, srcdir, dirname, tdeps, compiler))
-            # modules
-            usematch = usere.match(line)
+                statements.append(('include', incmatch.group(1)))
+            usematch = FORTRAN_USE_RE.match(line)
             if usematch is not None:
                 usename = usematch.group(1).lower()
-                if usename == 'intrinsic':  # this keeps the regex simpler
-                    continue
-                if usename not in tdeps:
-                    # The module is not provided by any source file. This
-                    # is due to:
-                    #   a) missing file/typo/etc
-                    #   b) using a module provided by the compiler, such as
-                    #      OpenMP
-                    # There's no easy way to tell which is which (that I
-                    # know of) so just ignore this and go on. Ideally we
-                    # would print a warning message to the user but this is
-                    # a common occurrence, which would lead to lots of
-                    # distracting noise.
-                    continue
-                srcfile = srcdir / tdeps[usename].fname
-                if not srcfile.is_file():
-                    if srcfile.name != src.name:  # generated source file
-                        pass
-                    else:  # subproject
-                        continue
-                elif srcfile.samefile(src):  # self-reference
+                if usename != 'intrinsic':  # this keeps the regex simpler
+                    statements.append(('use', usename))
+                continue
+            modmatch = FORTRAN_MODULE_RE.match(line)
+            if modmatch is not None:
+                modules.append(modmatch.group(1).lower())
+                continue
+            submodmatch = FORTRAN_SUBMOD_RE.match(line)
+            if submodmatch is not None:
+                parents = submodmatch.group(1).lower()
+                submodname = submodmatch.group(2).lower()
+                # '_' is arbitrarily used to distinguish submod from mod.
+                submodules.append(parents.split(':')[0] + '_' + submodname)
+                statements.append(('submodule', parents, submodname))
+    return FortranStatements(modules, submodules, statements)
+
+
+def _read_fortran_statements_of(fnames: T.List[str]) -> T.List[FortranStatements]:
+    return [read_fortran_statements(f) for f in fnames]
+
+
+class FortranScanCache:
+
+    """Results of scanning Fortran sources at configure time.
+
+    They are kept in the private directory, keyed by the modification time
+    and size of each file, so that regenerating only scans the files that
+    changed since the previous time.
+    """
+
+    # Scanning in several processes only pays off when there is a lot to
+    # scan, as for PARALLEL_SCAN_THRESHOLD in the dependency scanner
+    parallel_threshold = 2048
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.previous = self.load()
+        self.current: T.Dict[str, T.Tuple[int, int, FortranStatements]] = {}
+        self.changed = False
+
+    def load(self) -> T.Dict[str, T.Tuple[int, int, FortranStatements]]:
+        try:
+            with open(self.filename, 'rb') as f:
+                cache = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return {}
+        return cache if isinstance(cache, dict) else {}
+
+    def lookup(self, fname: str) -> T.Tuple[os.stat_result, T.Optional[FortranStatements]]:
+        st = os.stat(fname)
+        cached = self.previous.get(fname)
+        if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+            return st, cached[2]
+        return st, None
+
+    def get(self, fname: str) -> FortranStatements:
+        fname = str(fname)
+        cached = self.current.get(fname)
+        if cached is not None:
+            return cached[2]
+        st, result = self.lookup(fname)
+        if result is None:
+            result = read_fortran_statements(fname)
+            self.changed = True
+        self.current[fname] = (st.st_mtime_ns, st.st_size, result)
+        return result
+
+    def prescan(self, fnames: T.Iterable[str]) -> None:
+        '''Scan the files that are not in the cache, in parallel if there are
+        enough of them.'''
+        to_scan: T.List[T.Tuple[str, os.stat_result]] = []
+        for fname in fnames:
+            if fname in self.current:
+                continue
+            st, result = self.lookup(fname)
+            if result is None:
+                to_scan.append((fname, st))
+            else:
+                self.current[fname] = (st.st_mtime_ns, st.st_size, result)
+        if not to_scan:
+            return
+        # Sources shared by several targets are only scanned once
+        to_scan = list(dict(to_scan).items())
+        fnames = [f for f, _ in to_scan]
+        results = mesonlib.map_chunks_in_processes(_read_fortran_statements_of, fnames,
+                                                   os.cpu_count() or 1, self.parallel_threshold)
+        for (fname, st), result in zip(to_scan, results):
+            self.current[fname] = (st.st_mtime_ns, st.st_size, result)
+        self.changed = True
+
+    def save(self) -> None:
+        if not self.changed and self.current.keys() == self.previous.keys():
+            return
+        with open(self.filename + '~', 'wb') as f:
+            pickle.dump(self.current, f)
+        os.replace(self.filename + '~', self.filename)
+
+
+def _scan_fortran_file_deps(src: Path, srcdir: Path, dirname: Path, tdeps, compiler,
+                            scan_cache: FortranScanCache) -> T.List[str]:
+    """
+    Find the module files needed by a Fortran file. Needs to be distinct from
+    target to allow for recursion induced by `include` statements.
+    """
+
+    mod_files = []
+    src = Path(src)
+    for statement in scan_cache.get(str(src)).statements:
+        kind = statement[0]
+        # included files
+        if kind == 'include':
+            incfile = src.parent / statement[1]
+            # NOTE: src.parent is most general, in particular for CMake subproject with Fortran file
+            # having an `include 'foo.f'` statement.
+            if incfile.suffix.lower()[1:] in compiler.file_suffixes:
+                mod_files.extend(_scan_fortran_file_deps(incfile, srcdir, dirname, tdeps, compiler, scan_cache))
+        # modules
+        elif kind == 'use':
+            usename = statement[1]
+            if usename not in tdeps:
+                # The module is not provided by any source file. This
+                # is due to:
+                #   a) missing file/typo/etc
+                #   b) using a module provided by the compiler, such as
+                #      OpenMP
+                # There's no easy way to tell which is which (that I
+                # know of) so just ignore this and go on. Ideally we
+                # would print a warning message to the user but this is
+                # a common occurrence, which would lead to lots of
+                # distracting noise.
+                continue
+            srcfile = srcdir / tdeps[usename].fname
+            if not srcfile.is_file():
+                if srcfile.name != src.name:  # generated source file
+                    pass
+                else:  # subproject
                     continue
+            elif srcfile.samefile(src):  # self-reference
+                continue
 
-                mod_name = compiler.module_name_to_filename(usename)
-                mod_files.append(str(dirname / mod_name))
-            else:  # submodules
-                submodmatch = submodre.match(line)
-                if submodmatch is not None:
-                    parents = submodmatch.group(1).lower().split(':')
-                    assert len(parents) in {1, 2}, (
-                        'submodule ancestry must be specified as'
-                        f' ancestor:parent but Meson found {parents}')
-
-                    ancestor_child = '_'.join(parents)
-                    if ancestor_child not in tdeps:
-                        raise MesonException("submodule {} relies on ancestor module {} that was not found.".format(submodmatch.group(2).lower(), ancestor_child.split('_', maxsplit=1)[0]))
-                    submodsrcfile = srcdir / tdeps[ancestor_child].fname
-                    if not submodsrcfile.is_file():
-                        if submodsrcfile.name != src.name:  # generated source file
-                            pass
-                        else:  # subproject
-                            continue
-                    elif submodsrcfile.samefile(src):  # self-reference
-                        continue
-                    mod_name = compiler.module_name_to_filename(ancestor_child)
-                    mod_files.append(str(dirname / mod_name))
+            mod_name = compiler.module_name_to_filename(usename)
+            mod_files.append(str(dirname / mod_name))
+        else:  # submodules
+            parents = statement[1].split(':')
+            assert len(parents) in {1, 2}, (
+                'submodule ancestry must be specified as'
+                f' ancestor:parent but Meson found {parents}')
+
+            ancestor_child = '_'.join(parents)
+            if ancestor_child not in tdeps:
+                raise MesonException("submodule {} relies on ancestor module {} that was not found.".format(statement[2], ancestor_child.split('_', maxsplit=1)[0]))
+            submodsrcfile = srcdir / tdeps[ancestor_child].fname
+            if not submodsrcfile.is_file():
+                if submodsrcfile.name != src.name:  # generated source file
+                    pass
+                else:  # subproject
+                    continue
+            elif submodsrcfile.samefile(src):  # self-reference
+                continue
+            mod_name = compiler.module_name_to_filename(ancestor_child)
+            mod_files.append(str(dirname / mod_name))
     return mod_files
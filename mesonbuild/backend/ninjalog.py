@@ -0,0 +1,109 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 The Meson development team
+
+"""Helpers for the files Ninja keeps in a build directory.
+
+This module is kept light, so that `meson compile` can use it without
+importing the Ninja backend.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import subprocess
+import typing as T
+
+from .. import mesonlib
+
+# Written when the `ninja -t cleandead` that follows a regeneration has been
+# deferred to the next `meson compile`.
+CLEANDEAD_STAMP = os.path.join('meson-private', 'cleandead-pending')
+NINJA_LOG_HEADER_PAT = re.compile(r'# ninja log v([5-7])\n')
+
+def read_ninja_log(build_dir: str) -> T.Optional[T.Tuple[str, T.Dict[str, T.List[str]]]]:
+    '''Header and entries of .ninja_log, by output.
+
+    Returns None if there is no log or it is not in a format we know.
+    '''
+    logfile = os.path.join(build_dir, '.ninja_log')
+    entries: T.Dict[str, T.List[str]] = {}
+    try:
+        with open(logfile, encoding='utf-8', errors='surrogateescape', newline='\n') as f:
+            header = f.readline()
+            if not NINJA_LOG_HEADER_PAT.fullmatch(header):
+                return None
+            for line in f:
+                fields = line.split('\t')
+                if len(fields) != 5:
+                    return None
+                # The last entry of an output wins, as in ninja
+                entries[fields[3]] = fields
+    except FileNotFoundError:
+        return None
+    # Ninja ignores a truncated last line
+    if entries and not fields[4].endswith('\n'):
+        return None
+    return header, entries
+
+def restat_ninja_log(build_dir: str) -> bool:
+    '''Refresh the mtimes recorded in .ninja_log, like `ninja -t restat`.
+
+    Returns False if the log is not in a format we know, in which case it is
+    left untouched.
+    '''
+    # Ninja only records mtimes in nanoseconds since the epoch on POSIX.
+    if mesonlib.is_windows():
+        return False
+    log = read_ninja_log(build_dir)
+    if log is None:
+        return False
+    header, entries = log
+    dir_fd = os.open(build_dir, os.O_RDONLY)
+    try:
+        for path, fields in entries.items():
+            try:
+                # Ninja reserves 0 for missing files
+                fields[2] = str(os.stat(path, dir_fd=dir_fd).st_mtime_ns or 1)
+            except FileNotFoundError:
+                fields[2] = '0'
+            except OSError:
+                return False
+    finally:
+        os.close(dir_fd)
+    _write_ninja_log(build_dir, header, entries)
+    return True
+
+def record_ninja_log_mtime(build_dir: str, output: str, mtime: int) -> bool:
+    '''Record @mtime for @output in .ninja_log.
+
+    This is what Ninja records for an output of a restat rule that was left
+    untouched, so that it is not considered older than its inputs. Returns
+    False if the output has no entry or the log is not in a format we know.
+    '''
+    if mesonlib.is_windows():
+        return False
+    log = read_ninja_log(build_dir)
+    if log is None:
+        return False
+    header, entries = log
+    if output not in entries:
+        return False
+    entries[output][2] = str(mtime)
+    _write_ninja_log(build_dir, header, entries)
+    return True
+
+def _write_ninja_log(build_dir: str, header: str, entries: T.Dict[str, T.List[str]]) -> None:
+    logfile = os.path.join(build_dir, '.ninja_log')
+    tmpfile = logfile + '.restat'
+    with open(tmpfile, 'w', encoding='utf-8', errors='surrogateescape', newline='\n') as f:
+        f.write(header)
+        f.writelines('\t'.join(fields) for fields in entries.values())
+    os.replace(tmpfile, logfile)
+
+def run_deferred_cleandead(build_dir: str, ninja_command: T.List[str]) -> None:
+    '''Run the `ninja -t cleandead` left over from the last regeneration.'''
+    stamp = os.path.join(build_dir, CLEANDEAD_STAMP)
+    if os.path.exists(stamp):
+        subprocess.call(ninja_command + ['-t', 'cleandead'], cwd=build_dir)
+        os.unlink(stamp)
@@ -1762,10 +1762,14 @@ class Generator(HoldableObject):
                  depfile: T.Optional[str] = None,
                  capture: bool = False,
                  depends: T.Optional[T.List[T.Union[BuildTarget, 'CustomTarget', 'CustomTargetIndex']]] = None,
+                 pool: T.Optional[str] = None,
+                 batch_size: int = 1,
                  name: str = 'Generator'):
         self.exe = exe
         self.depfile = depfile
         self.capture = capture
+        self.pool = pool
+        self.batch_size = batch_size
         self.depends: T.List[T.Union[BuildTarget, 'CustomTarget', 'CustomTargetIndex']] = depends or []
         self.arglist = arguments
         self.outputs = output
@@ -2569,6 +2573,7 @@ class CustomTarget(Target, CustomTargetBase, CommandBase):
                  install_mode: T.Optional[FileMode] = None,
                  install_tag: T.Optional[T.List[T.Optional[str]]] = None,
                  absolute_paths: bool = False,
+                 pool: T.Optional[str] = None,
                  backend: T.Optional['Backend'] = None,
                  description: str = 'Generating {} with a custom command',
                  ):
@@ -2596,6 +2601,7 @@ class CustomTarget(Target, CustomTargetBase, CommandBase):
         self.install_tag = _process_install_tag(install_tag, len(self.outputs))
         self.name = name if name else self.outputs[0]
         self.description = description
+        self.pool = pool
 
         # Whether to use absolute paths for all files on the commandline
         self.absolute_paths = absolute_paths
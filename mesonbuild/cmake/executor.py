@@ -4,7 +4,7 @@
 from __future__ import annotations
 
 import subprocess as S
-from threading import Thread
+from threading import RLock, Thread
 import typing as T
 import re
 import os
@@ -29,6 +29,9 @@ class CMakeExecutor:
     class_cmakebin: PerMachine[T.Optional[ExternalProgram]] = PerMachine(None, None)
     class_cmakevers: PerMachine[T.Optional[str]] = PerMachine(None, None)
     class_cmake_cache: T.Dict[T.Any, TYPE_result] = {}
+    # Dependency lookups can run concurrently, CMake is only detected once
+    # and each cached call is only made once
+    class_lock = RLock()
 
     def __init__(self, environment: 'Environment', version: str, for_machine: MachineChoice, silent: bool = False):
         self.min_version = version
@@ -56,39 +59,40 @@ class CMakeExecutor:
             self.extra_cmake_args += ['-DCMAKE_PREFIX_PATH={}'.format(';'.join(self.prefix_paths))]
 
     def find_cmake_binary(self, environment: 'Environment', silent: bool = False) -> T.Tuple[T.Optional['ExternalProgram'], T.Optional[str]]:
-        # Only search for CMake the first time and store the result in the class
-        # definition
-        if isinstance(CMakeExecutor.class_cmakebin[self.for_machine], NonExistingExternalProgram):
-            mlog.debug(f'CMake binary for {self.for_machine} is cached as not found')
-            return None, None
-        elif CMakeExecutor.class_cmakebin[self.for_machine] is not None:
-            mlog.debug(f'CMake binary for {self.for_machine} is cached.')
-        else:
-            assert CMakeExecutor.class_cmakebin[self.for_machine] is None
-
-            mlog.debug(f'CMake binary for {self.for_machine} is not cached')
-            for potential_cmakebin in find_external_program(
-                    environment, self.for_machine, 'cmake', 'CMake',
-                    environment.default_cmake, allow_default_for_cross=False):
-                version_if_ok = self.check_cmake(potential_cmakebin)
-                if not version_if_ok:
-                    continue
-                if not silent:
-                    mlog.log('Found CMake:', mlog.bold(potential_cmakebin.get_path()),
-                             f'({version_if_ok})')
-                CMakeExecutor.class_cmakebin[self.for_machine] = potential_cmakebin
-                CMakeExecutor.class_cmakevers[self.for_machine] = version_if_ok
-                break
-            else:
-                if not silent:
-                    mlog.log('Found CMake:', mlog.red('NO'))
-                # Set to False instead of None to signify that we've already
-                # searched for it and not found it
-                CMakeExecutor.class_cmakebin[self.for_machine] = NonExistingExternalProgram()
-                CMakeExecutor.class_cmakevers[self.for_machine] = None
+        with CMakeExecutor.class_lock:
+            # Only search for CMake the first time and store the result in the class
+            # definition
+            if isinstance(CMakeExecutor.class_cmakebin[self.for_machine], NonExistingExternalProgram):
+                mlog.debug(f'CMake binary for {self.for_machine} is cached as not found')
                 return None, None
+            elif CMakeExecutor.class_cmakebin[self.for_machine] is not None:
+                mlog.debug(f'CMake binary for {self.for_machine} is cached.')
+            else:
+                assert CMakeExecutor.class_cmakebin[self.for_machine] is None
+
+                mlog.debug(f'CMake binary for {self.for_machine} is not cached')
+                for potential_cmakebin in find_external_program(
+                        environment, self.for_machine, 'cmake', 'CMake',
+                        environment.default_cmake, allow_default_for_cross=False):
+                    version_if_ok = self.check_cmake(potential_cmakebin)
+                    if not version_if_ok:
+                        continue
+                    if not silent:
+                        mlog.log('Found CMake:', mlog.bold(potential_cmakebin.get_path()),
+                                 f'({version_if_ok})')
+                    CMakeExecutor.class_cmakebin[self.for_machine] = potential_cmakebin
+                    CMakeExecutor.class_cmakevers[self.for_machine] = version_if_ok
+                    break
+                else:
+                    if not silent:
+                        mlog.log('Found CMake:', mlog.red('NO'))
+                    # Set to False instead of None to signify that we've already
+                    # searched for it and not found it
+                    CMakeExecutor.class_cmakebin[self.for_machine] = NonExistingExternalProgram()
+                    CMakeExecutor.class_cmakevers[self.for_machine] = None
+                    return None, None
 
-        return CMakeExecutor.class_cmakebin[self.for_machine], CMakeExecutor.class_cmakevers[self.for_machine]
+            return CMakeExecutor.class_cmakebin[self.for_machine], CMakeExecutor.class_cmakevers[self.for_machine]
 
     def check_cmake(self, cmakebin: 'ExternalProgram') -> T.Optional[str]:
         if not cmakebin.found():
@@ -218,9 +222,10 @@ class CMakeExecutor:
         # First check if cached, if not call the real cmake function
         cache = CMakeExecutor.class_cmake_cache
         key = self._cache_key(args, build_dir, env)
-        if key not in cache:
-            cache[key] = self._call_impl(args, build_dir, env)
-        return cache[key]
+        with CMakeExecutor.class_lock:
+            if key not in cache:
+                cache[key] = self._call_impl(args, build_dir, env)
+            return cache[key]
 
     def found(self) -> bool:
         return self.cmakebin is not None
@@ -319,6 +319,11 @@ def get_base_compile_args(options: 'KeyedOptionDictType', compiler: 'Compiler',
         args += compiler.get_assert_args(are_asserts_disabled(options), env)
     except (KeyError, AttributeError):
         pass
+    try:
+        if options.get_value(OptionKey('fast_link')) and options.get_value(OptionKey('debug')):
+            args += compiler.get_split_dwarf_args()
+    except (KeyError, AttributeError):
+        pass
     # This does not need a try...except
     if option_enabled(compiler.base_options, options, OptionKey('b_bitcode')):
         args.append('-fembed-bitcode')
@@ -369,6 +374,13 @@ def get_base_link_args(options: 'KeyedOptionDictType', linker: 'Compiler',
             args += linker.get_coverage_link_args()
     except (KeyError, AttributeError):
         pass
+    try:
+        # The index replaces what gdb would otherwise read from every .dwo
+        if (options.get_value(OptionKey('fast_link')) and options.get_value(OptionKey('debug'))
+                and linker.get_split_dwarf_args()):
+            args += linker.get_gdb_index_link_args()
+    except (KeyError, AttributeError):
+        pass
 
     as_needed = option_enabled(linker.base_options, options, OptionKey('b_asneeded'))
     bitcode = option_enabled(linker.base_options, options, OptionKey('b_bitcode'))
@@ -1062,6 +1074,12 @@ class Compiler(HoldableObject, metaclass=abc.ABCMeta):
     def get_coverage_link_args(self) -> T.List[str]:
         return self.linker.get_coverage_args()
 
+    def get_split_dwarf_args(self) -> T.List[str]:
+        return []
+
+    def get_gdb_index_link_args(self) -> T.List[str]:
+        return self.linker.get_gdb_index_args()
+
     def get_assert_args(self, disable: bool, env: 'Environment') -> T.List[str]:
         """Get arguments to enable or disable assertion.
 
@@ -12,6 +12,7 @@ standalone, they only work through inheritance.
 """
 
 import collections
+import fnmatch
 import functools
 import glob
 import itertools
@@ -47,6 +48,18 @@ GROUP_FLAGS = re.compile(r'''^(?!-Wl,) .*\.so (?:\.[0-9]+)? (?:\.[0-9]+)? (?:\.[
                              ^(?:-Wl,)?-l |
                              \.a$''', re.X)
 
+class LibraryDirContents(T.NamedTuple):
+
+    """The regular files in a library search directory."""
+
+    # In directory order
+    files: T.Tuple[str, ...]
+    # For case-insensitive membership tests, the filesystem decides in the end
+    lowercase: T.FrozenSet[str]
+    # Modification time of the directory when it was listed
+    mtime: T.Optional[int]
+
+
 class CLikeCompilerArgs(arglist.CompilerArgs):
     prepend_prefixes = ('-I', '-L')
     dedup2_prefixes = ('-I', '-isystem', '-L', '-D', '-U')
@@ -66,10 +79,13 @@ class CLikeCompilerArgs(arglist.CompilerArgs):
         # needed by static libraries that are provided by object files or
         # shared libraries.
         self.flush_pre_post()
+        # Work on the list directly, going through the MutableSequence
+        # methods for every element is slow with thousands of arguments
         if copy:
-            new = self.copy()
+            new = self._container.copy()
         else:
-            new = self
+            new = self._container
+            self._index = None
         # This covers all ld.bfd, ld.gold, ld.gold, and xild on Linux, which
         # all act like (or are) gnu ld
         # TODO: this could probably be added to the DynamicLinker instead
@@ -77,7 +93,7 @@ class CLikeCompilerArgs(arglist.CompilerArgs):
             group_start = -1
             group_end = -1
             for i, each in enumerate(new):
-                if not GROUP_FLAGS.search(each):
+                if not self._is_group_flag(each):
                     continue
                 group_end = i
                 if group_start < 0:
@@ -108,7 +124,12 @@ class CLikeCompilerArgs(arglist.CompilerArgs):
                     bad_idx_list += [i]
             for i in reversed(bad_idx_list):
                 new.pop(i)
-        return self.compiler.unix_args_to_native(new._container)
+        return self.compiler.unix_args_to_native(new)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _is_group_flag(arg: str) -> bool:
+        return GROUP_FLAGS.search(arg) is not None
 
     @staticmethod
     @functools.lru_cache(maxsize=None)
@@ -130,6 +151,10 @@ class CLikeCompiler(Compiler):
     # TODO: Replace this manual cache with functools.lru_cache
     find_library_cache: T.Dict[T.Tuple[T.Tuple[str, ...], str, T.Tuple[str, ...], str, LibType], T.Optional[T.List[str]]] = {}
     find_framework_cache: T.Dict[T.Tuple[T.Tuple[str, ...], str, T.Tuple[str, ...], bool], T.Optional[T.List[str]]] = {}
+    # Shared by all compilers, so that every library directory is listed and
+    # every library file's ELF header is read again only when they change
+    library_dir_cache: T.Dict[str, LibraryDirContents] = {}
+    library_elf_class_cache: T.Dict[str, T.Tuple[T.Optional[T.Tuple[int, int, int, int]], int]] = {}
     internal_libs = arglist.UNIXY_COMPILER_INTERNAL_LIBS
 
     def __init__(self) -> None:
@@ -207,31 +232,74 @@ class CLikeCompiler(Compiler):
         # the compiler knows what it's doing, and accept the directory anyway.
         retval: T.List[str] = []
         for d in dirs:
-            files = [f for f in os.listdir(d) if f.endswith('.so') and os.path.isfile(os.path.join(d, f))]
+            files = [f for f in self._get_library_dir_contents(d).files if f.endswith('.so')]
             # if no files, accept directory and move on
             if not files:
                 retval.append(d)
                 continue
 
             for f in files:
-                file_to_check = os.path.join(d, f)
                 try:
-                    with open(file_to_check, 'rb') as fd:
-                        header = fd.read(5)
-                        # if file is not an ELF file, it's weird, but accept dir
-                        # if it is elf, and the class matches, accept dir
-                        if header[1:4] != b'ELF' or int(header[4]) == elf_class:
-                            retval.append(d)
-                        # at this point, it's an ELF file which doesn't match the
-                        # appropriate elf_class, so skip this one
-                    # stop scanning after the first successful read
-                    break
+                    file_elf_class = self._get_elf_class(os.path.join(d, f))
                 except OSError:
                     # Skip the file if we can't read it
-                    pass
+                    continue
+                # if file is not an ELF file, it's weird, but accept dir
+                # if it is elf, and the class matches, accept dir
+                if file_elf_class in {0, elf_class}:
+                    retval.append(d)
+                # at this point, it's an ELF file which doesn't match the
+                # appropriate elf_class, so skip this one
+                # stop scanning after the first successful read
+                break
 
         return retval
 
+    @classmethod
+    def _get_library_dir_contents(cls, directory: str) -> LibraryDirContents:
+        '''
+        List the regular files in a library search directory, so that library
+        naming patterns can be matched without probing the filesystem for
+        each of them. The directory is listed again if its modification time
+        changed.
+        '''
+        try:
+            mtime: T.Optional[int] = os.stat(directory).st_mtime_ns
+        except OSError:
+            mtime = None
+        contents = cls.library_dir_cache.get(directory)
+        if contents is None or contents.mtime != mtime:
+            files: T.List[str] = []
+            if mtime is not None:
+                try:
+                    with os.scandir(directory) as it:
+                        for entry in it:
+                            try:
+                                if entry.is_file():
+                                    files.append(entry.name)
+                            except OSError:
+                                pass
+                except OSError:
+                    pass
+            contents = LibraryDirContents(tuple(files), frozenset(f.lower() for f in files), mtime)
+            cls.library_dir_cache[directory] = contents
+        return contents
+
+    @classmethod
+    def _get_elf_class(cls, path: str) -> int:
+        '''
+        Returns the ELF class of a file, or 0 if it isn't an ELF file.
+        '''
+        key = mesonlib.file_stat_key(path)
+        cached = cls.library_elf_class_cache.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        with open(path, 'rb') as fd:
+            header = fd.read(5)
+        elf_class = int(header[4]) if len(header) == 5 and header[1:4] == b'ELF' else 0
+        cls.library_elf_class_cache[path] = (key, elf_class)
+        return elf_class
+
     def get_library_dirs(self, env: 'Environment',
                          elf_class: T.Optional[int] = None) -> T.List[str]:
         """Wrap the lru_cache so that we return a new copy and don't allow
@@ -1074,13 +1142,24 @@ class CLikeCompiler(Compiler):
         return sorted(filtered, key=tuple_key, reverse=True)
 
     @classmethod
-    def _get_trials_from_pattern(cls, pattern: str, directory: str, libname: str) -> T.List[Path]:
-        f = Path(directory) / pattern.format(libname)
+    def _get_trials_from_pattern(cls, pattern: str, directory: str, libname: str,
+                                 contents: T.Optional[LibraryDirContents] = None) -> T.List[Path]:
+        fname = pattern.format(libname)
+        f = Path(directory) / fname
+        if os.path.dirname(fname):
+            # Not a plain file name, the directory index can't help
+            if '*' in pattern:
+                # NOTE: globbing matches directories and broken symlinks
+                # so we have to do an isfile test on it later
+                return [Path(x) for x in cls._sort_shlibs_openbsd(glob.glob(str(f)))]
+            return [f]
+        if contents is None:
+            contents = cls._get_library_dir_contents(directory)
         # Globbing for OpenBSD
         if '*' in pattern:
-            # NOTE: globbing matches directories and broken symlinks
-            # so we have to do an isfile test on it later
-            return [Path(x) for x in cls._sort_shlibs_openbsd(glob.glob(str(f)))]
+            return [Path(directory, x) for x in cls._sort_shlibs_openbsd(fnmatch.filter(contents.files, fname))]
+        if fname.lower() not in contents.lowercase:
+            return []
         return [f]
 
     @staticmethod
@@ -1144,8 +1223,10 @@ class CLikeCompiler(Compiler):
             elf_class = 0
         # Search in the specified dirs, and then in the system libraries
         for d in itertools.chain(extra_dirs, self.get_library_dirs(env, elf_class)):
+            # Check the directory once for all the patterns
+            contents = self._get_library_dir_contents(d)
             for p in patterns:
-                trials = self._get_trials_from_pattern(p, d, libname)
+                trials = self._get_trials_from_pattern(p, d, libname, contents)
                 if not trials:
                     continue
                 trial = self._get_file_from_list(env, trials)
@@ -388,6 +388,16 @@ class GnuLikeCompiler(Compiler, metaclass=abc.ABCMeta):
     def get_debug_args(self, is_debug: bool) -> T.List[str]:
         return clike_debug_args[is_debug]
 
+    def get_split_dwarf_args(self) -> T.List[str]:
+        # Split DWARF is only supported for ELF
+        if self.info.is_windows() or self.info.is_cygwin() or self.info.is_darwin():
+            return []
+        # Only split it with a linker that indexes it, so that debuggers
+        # do not have to read every .dwo file
+        if self.linker is None or not self.linker.get_gdb_index_args():
+            return []
+        return ['-gsplit-dwarf']
+
     @abc.abstractmethod
     def get_pch_suffix(self) -> str:
         pass
@@ -107,6 +107,9 @@ class IntelGnuLikeCompiler(GnuLikeCompiler):
     def get_debug_args(self, is_debug: bool) -> T.List[str]:
         return self.DEBUG_ARGS[is_debug]
 
+    def get_split_dwarf_args(self) -> T.List[str]:
+        return []
+
     def get_optimization_args(self, optimization_level: str) -> T.List[str]:
         return self.OPTIM_ARGS[optimization_level]
 
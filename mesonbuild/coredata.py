@@ -23,6 +23,7 @@ from .mesonlib import (
 )
 
 from .machinefile import CmdLineFileParser
+from .programs import PathDirIndex
 
 import ast
 import argparse
@@ -37,6 +38,7 @@ if T.TYPE_CHECKING:
     from . import dependencies
     from .compilers.compilers import Compiler, CompileResult, RunResult, CompileCheckMode
     from .dependencies.detect import TV_DepID
+    from .dependencies.python import PythonIntrospectionDict
     from .environment import Environment
     from .mesonlib import FileOrString
     from .cmake.traceparser import CMakeCacheEntry
@@ -64,6 +66,15 @@ if T.TYPE_CHECKING:
     CompilerCheckCacheKey = T.Tuple[T.Tuple[str, ...], str, FileOrString, T.Tuple[str, ...], CompileCheckMode]
     # code, args
     RunCheckCacheKey = T.Tuple[str, T.Tuple[str, ...]]
+    # command, identity of the files in the command, args, environment
+    ConfigToolCacheKey = T.Tuple[T.Tuple[str, ...], T.Tuple[T.Optional[T.Tuple[int, int, int, int]], ...], T.Tuple[str, ...],
+                                 T.Tuple[T.Tuple[str, str], ...]]
+    # returncode, stdout, stderr
+    ConfigToolCacheValue = T.Tuple[int, str, str]
+    # command, identity of the files in the command, version argument
+    ProgramVersionCacheKey = T.Tuple[T.Tuple[str, ...], T.Tuple[T.Optional[T.Tuple[int, int, int, int]], ...], str]
+    # command, identity of the files in the command, relevant environment variables
+    PythonIntrospectionCacheKey = T.Tuple[T.Tuple[str, ...], T.Tuple[T.Optional[T.Tuple[int, int, int, int]], ...], T.Tuple[T.Optional[str], ...]]
 
     # typeshed
     StrOrBytesPath = T.Union[str, bytes, os.PathLike[str], os.PathLike[bytes]]
@@ -280,6 +291,19 @@ class CoreData:
         self.compiler_check_cache: T.Dict['CompilerCheckCacheKey', 'CompileResult'] = OrderedDict()
         self.run_check_cache: T.Dict['RunCheckCacheKey', 'RunResult'] = OrderedDict()
 
+        # Output of config tools (llvm-config, wx-config, ...), shared by all
+        # config-tool dependencies and persisted across reconfigures unless
+        # the config_tool_cache option is disabled.
+        self.config_tool_cache: T.Dict['ConfigToolCacheKey', 'ConfigToolCacheValue'] = OrderedDict()
+
+        # Contents of the directories searched for programs, and the versions
+        # of the programs found there.
+        self.program_path_index = PathDirIndex()
+        self.program_version_cache: T.Dict['ProgramVersionCacheKey', str] = OrderedDict()
+
+        # Output of python_info.py for each Python interpreter that was looked up
+        self.python_introspection_cache: T.Dict['PythonIntrospectionCacheKey', 'PythonIntrospectionDict'] = OrderedDict()
+
         # CMake cache
         self.cmake_cache: PerMachine[CMakeStateCache] = PerMachine(CMakeStateCache(), CMakeStateCache())
 
@@ -424,11 +448,45 @@ class CoreData:
 
     def init_backend_options(self, backend_name: str) -> None:
         if backend_name == 'ninja':
-            self.optstore.add_system_option('backend_max_links', options.UserIntegerOption(
+            self.optstore.add_system_option('backend_max_links', options.UserIntegerOrAutoOption(
                 'backend_max_links',
-                'Maximum number of linker processes to run or 0 for no '
-                'limit',
+                'Maximum number of linker processes to run, 0 for no '
+                'limit or auto to derive it from the available memory',
                 (0, None, 0)))
+            self.optstore.add_system_option('backend_pools', options.UserArrayOption(
+                'backend_pools',
+                'Depth of the pools used by custom targets and generators, '
+                'as name=depth',
+                []))
+            self.optstore.add_system_option('backend_low_memory', options.UserBooleanOption(
+                'backend_low_memory',
+                'Write build statements to a temporary file as they are '
+                'generated, to use less memory',
+                False))
+            self.optstore.add_system_option('backend_compdb_fragments', options.UserBooleanOption(
+                'backend_compdb_fragments',
+                'Write a compile_commands.json for each target',
+                False))
+            self.optstore.add_system_option('backend_rust_pipelining', options.UserBooleanOption(
+                'backend_rust_pipelining',
+                'Compile Rust crates as soon as the metadata of the crates '
+                'they use is available',
+                False))
+            self.optstore.add_system_option('backend_auto_pch', options.UserBooleanOption(
+                'backend_auto_pch',
+                'Precompile the external headers that most sources of a '
+                'target included in the previous build',
+                False))
+            self.optstore.add_system_option('backend_narrow_header_deps', options.UserBooleanOption(
+                'backend_narrow_header_deps',
+                'Only compile sources after the generated headers they '
+                'included in the previous build',
+                False))
+            self.optstore.add_system_option('backend_deferred_cleanup', options.UserBooleanOption(
+                'backend_deferred_cleanup',
+                'Defer removing stale outputs after a regeneration to the '
+                'next meson compile',
+                False))
         elif backend_name.startswith('vs'):
             self.optstore.add_system_option('backend_startup_project', options.UserStringOption(
                 'backend_startup_project',
@@ -509,6 +567,10 @@ class CoreData:
         self.deps.build.clear()
         self.compiler_check_cache.clear()
         self.run_check_cache.clear()
+        self.config_tool_cache.clear()
+        self.program_path_index.clear()
+        self.program_version_cache.clear()
+        self.python_introspection_cache.clear()
 
     def get_nondefault_buildtype_args(self) -> T.List[T.Union[T.Tuple[str, str, str], T.Tuple[str, bool, bool]]]:
         result: T.List[T.Union[T.Tuple[str, str, str], T.Tuple[str, bool, bool]]] = []
@@ -14,6 +14,7 @@ import re
 import os
 import shutil
 import textwrap
+import threading
 import typing as T
 
 if T.TYPE_CHECKING:
@@ -36,7 +37,11 @@ class CMakeDependency(ExternalDependency):
     class_cmake_version = '>=3.4'
     # CMake generators to try (empty for no generator)
     class_cmake_generators = ['', 'Ninja', 'Unix Makefiles', 'Visual Studio 10 2010']
+    # Only a hint which generator to try first, races on it are harmless
     class_working_generator: T.Optional[str] = None
+    # Dependency lookups can run concurrently, the system information is only
+    # extracted once
+    class_lock = threading.RLock()
 
     def _gen_exception(self, msg: str) -> DependencyException:
         return DependencyException(f'Dependency {self.name} not found: {msg}')
@@ -118,9 +123,10 @@ class CMakeDependency(ExternalDependency):
 
         cm_args = stringlistify(extract_as_list(kwargs, 'cmake_args'))
         cm_args = check_cmake_args(cm_args)
-        if CMakeDependency.class_cmakeinfo[self.for_machine] is None:
-            CMakeDependency.class_cmakeinfo[self.for_machine] = self._get_cmake_info(cm_args)
-        cmakeinfo = CMakeDependency.class_cmakeinfo[self.for_machine]
+        with CMakeDependency.class_lock:
+            if CMakeDependency.class_cmakeinfo[self.for_machine] is None:
+                CMakeDependency.class_cmakeinfo[self.for_machine] = self._get_cmake_info(cm_args)
+            cmakeinfo = CMakeDependency.class_cmakeinfo[self.for_machine]
         if cmakeinfo is None:
             raise self._gen_exception('Unable to obtain CMake system information')
         self.cmakeinfo = cmakeinfo
@@ -4,18 +4,25 @@
 from __future__ import annotations
 
 from .base import ExternalDependency, DependencyException, DependencyTypeName
-from ..mesonlib import listify, Popen_safe, Popen_safe_logged, split_args, version_compare, version_compare_many
+from ..mesonlib import (OptionKey, listify, file_stat_key, join_args, Popen_safe, Popen_safe_logged, split_args,
+                        version_compare, version_compare_many)
 from ..programs import find_external_program
 from .. import mlog
+import os
 import re
+import threading
 import typing as T
 
 from mesonbuild import mesonlib
 
 if T.TYPE_CHECKING:
+    from ..coredata import ConfigToolCacheKey, ConfigToolCacheValue
     from ..environment import Environment
     from ..interpreter.type_checking import PkgConfigDefineType
 
+# Config-tool dependencies can be looked up concurrently
+_cache_lock = threading.Lock()
+
 class ConfigToolDependency(ExternalDependency):
 
     """Class representing dependencies found using a config tool.
@@ -35,6 +42,11 @@ class ConfigToolDependency(ExternalDependency):
     version_arg = '--version'
     skip_version: T.Optional[str] = None
     allow_default_for_cross = False
+    # Environment variables that can change the output of the tool, in
+    # addition to those starting with the name of the tool, such as
+    # LLVM_CONFIG_... for llvm-config
+    cache_env_vars = ['PATH']
+    cache_env_prefixes = ['PKG_CONFIG_']
     __strip_version = re.compile(r'^[0-9][0-9.]+')
 
     def __init__(self, name: str, environment: 'Environment', kwargs: T.Dict[str, T.Any], language: T.Optional[str] = None):
@@ -82,14 +94,14 @@ class ConfigToolDependency(ExternalDependency):
                 continue
             tool = potential_bin.get_command()
             try:
-                p, out = Popen_safe(tool + [self.version_arg])[:2]
+                rc, out = self._run_config_tool(tool, [self.version_arg])[:2]
             except (FileNotFoundError, PermissionError):
                 continue
-            if p.returncode != returncode:
+            if rc != returncode:
                 if self.skip_version:
                     # maybe the executable is valid even if it doesn't support --version
-                    p = Popen_safe(tool + [self.skip_version])[0]
-                    if p.returncode != returncode:
+                    rc = self._run_config_tool(tool, [self.skip_version])[0]
+                    if rc != returncode:
                         continue
                 else:
                     continue
@@ -133,9 +145,45 @@ class ConfigToolDependency(ExternalDependency):
 
         return self.config is not None
 
+    def _run_config_tool(self, tool: T.List[str], args: T.List[str],
+                         logged: bool = False) -> ConfigToolCacheValue:
+        """Run a config tool, or reuse the result of an identical earlier run.
+
+        The results are shared by all config-tool dependencies and stored in
+        coredata, so they survive reconfigures unless the config_tool_cache
+        option is disabled. The identity of the tool files and the environment
+        variables that may affect the tool are part of the key, so an upgraded
+        tool or a changed environment runs the tool again.
+        """
+        prefixes = tuple(self.cache_env_prefixes + [os.path.basename(self.tool_name).split('-', 1)[0].upper() + '_'])
+        env = tuple(sorted((k, v) for k, v in os.environ.items()
+                           if k in self.cache_env_vars or k.startswith(prefixes)))
+        key: ConfigToolCacheKey = (
+            tuple(tool),
+            tuple(file_stat_key(t) if os.path.isabs(t) else None for t in tool),
+            tuple(args),
+            env)
+        if self.env.coredata.get_option(OptionKey('config_tool_cache')):
+            cache = self.env.coredata.config_tool_cache
+        else:
+            cache = self.env.config_tool_cache
+        with _cache_lock:
+            cached = cache.get(key)
+        if cached is not None:
+            mlog.debug(f'Using cached config-tool result: `{join_args(tool + args)}` -> {cached[0]}')
+            return cached
+        if logged:
+            p, out, err = Popen_safe_logged(tool + args)
+        else:
+            p, out, err = Popen_safe(tool + args)
+        result = (p.returncode, out, err)
+        with _cache_lock:
+            cache[key] = result
+        return result
+
     def get_config_value(self, args: T.List[str], stage: str) -> T.List[str]:
-        p, out, err = Popen_safe_logged(self.config + args)
-        if p.returncode != 0:
+        rc, out, err = self._run_config_tool(self.config, args, logged=True)
+        if rc != 0:
             if self.required:
                 raise DependencyException(f'Could not generate {stage} for {self.name}.\n{err}')
             return []
@@ -153,8 +201,8 @@ class ConfigToolDependency(ExternalDependency):
                      default_value: T.Optional[str] = None,
                      pkgconfig_define: PkgConfigDefineType = None) -> str:
         if configtool:
-            p, out, _ = Popen_safe(self.config + self.get_variable_args(configtool))
-            if p.returncode == 0:
+            rc, out, _ = self._run_config_tool(self.config, self.get_variable_args(configtool))
+            if rc == 0:
                 variable = out.strip()
                 mlog.debug(f'Got config-tool variable {configtool} : {variable}')
                 return variable
@@ -3,7 +3,7 @@
 
 from __future__ import annotations
 
-import collections, functools, importlib
+import collections, contextlib, functools, importlib
 import typing as T
 
 from .base import ExternalDependency, DependencyException, DependencyMethods, NotFoundDependency
@@ -18,6 +18,8 @@ if T.TYPE_CHECKING:
     TV_DepIDEntry = T.Union[str, bool, int, T.Tuple[str, ...]]
     TV_DepID = T.Tuple[T.Tuple[str, TV_DepIDEntry], ...]
     PackageTypes = T.Union[T.Type[ExternalDependency], DependencyFactory, WrappedFactoryFunc]
+    # dependency or exception, log records
+    CandidateResult = T.Tuple[T.Optional[ExternalDependency], T.Optional[Exception], T.List[mlog.TV_LogRecord]]
 
 class DependencyPackages(collections.UserDict):
     data: T.Dict[str, PackageTypes]
@@ -104,44 +106,53 @@ def find_external_dependency(name: str, env: 'Environment', kwargs: T.Dict[str,
     if candidates is None:
         candidates = _build_external_dependency_list(name, env, for_machine, kwargs)
 
+    results: T.Generator[CandidateResult, None, None]
+    if len(candidates) > 1 and env.coredata.optstore.get_value('dependency_lookup') == 'speculative':
+        results = _run_candidates_concurrently(candidates)
+    else:
+        results = (_run_candidate(c) for c in candidates)
+
     pkg_exc: T.List[DependencyException] = []
     pkgdep:  T.List[ExternalDependency] = []
     details = ''
 
-    for c in candidates:
-        # try this dependency method
-        try:
-            d = c()
-            d._check_version()
-            pkgdep.append(d)
-        except DependencyException as e:
-            assert isinstance(c, functools.partial), 'for mypy'
-            bettermsg = f'Dependency lookup for {name} with method {c.func.log_tried()!r} failed: {e}'
-            mlog.debug(bettermsg)
-            e.args = (bettermsg,)
-            pkg_exc.append(e)
-        else:
-            pkg_exc.append(None)
-            details = d.log_details()
-            if details:
-                details = '(' + details + ') '
-            if 'language' in kwargs:
-                details += 'for ' + d.language + ' '
-
-            # if the dependency was found
-            if d.found():
-
-                info: mlog.TV_LoggableList = []
-                if d.version:
-                    info.append(mlog.normal_cyan(d.version))
-
-                log_info = d.log_info()
-                if log_info:
-                    info.append('(' + log_info + ')')
-
-                mlog.log(type_text, mlog.bold(display_name), details + 'found:', mlog.green('YES'), *info)
-
-                return d
+    # results of the dependency methods, in order of preference
+    with contextlib.closing(results):
+        for c, (d, exc, records) in zip(candidates, results):
+            mlog.replay(records)
+            if exc is not None and not isinstance(exc, DependencyException):
+                raise exc
+            if exc is not None:
+                e = exc
+                assert isinstance(c, functools.partial), 'for mypy'
+                bettermsg = f'Dependency lookup for {name} with method {c.func.log_tried()!r} failed: {e}'
+                mlog.debug(bettermsg)
+                e.args = (bettermsg,)
+                pkg_exc.append(e)
+            else:
+                assert d is not None, 'for mypy'
+                pkgdep.append(d)
+                pkg_exc.append(None)
+                details = d.log_details()
+                if details:
+                    details = '(' + details + ') '
+                if 'language' in kwargs:
+                    details += 'for ' + d.language + ' '
+
+                # if the dependency was found
+                if d.found():
+
+                    info: mlog.TV_LoggableList = []
+                    if d.version:
+                        info.append(mlog.normal_cyan(d.version))
+
+                    log_info = d.log_info()
+                    if log_info:
+                        info.append('(' + log_info + ')')
+
+                    mlog.log(type_text, mlog.bold(display_name), details + 'found:', mlog.green('YES'), *info)
+
+                    return d
 
     # otherwise, the dependency could not be found
     tried_methods = [d.log_tried() for d in pkgdep if d.log_tried()]
@@ -168,6 +179,47 @@ def find_external_dependency(name: str, env: 'Environment', kwargs: T.Dict[str,
     return NotFoundDependency(name, env)
 
 
+def _run_candidate(c: 'DependencyGenerator', capture: bool = False) -> CandidateResult:
+    """Try a single dependency method.
+
+    Exceptions are returned rather than raised so that the caller can handle
+    them in priority order. With @capture everything logged by the method is
+    returned instead of being written.
+    """
+    d: T.Optional[ExternalDependency] = None
+    exc: T.Optional[Exception] = None
+    with contextlib.ExitStack() as stack:
+        records = stack.enter_context(mlog.capture()) if capture else []
+        try:
+            d = c()
+            d._check_version()
+        except Exception as e:
+            exc = e
+    return d, exc, records
+
+
+def _run_candidates_concurrently(candidates: T.List['DependencyGenerator']) -> T.Generator[CandidateResult, None, None]:
+    """Try all dependency methods at once, yielding the results in priority order.
+
+    The log output of each method is buffered so that the caller can write it
+    in the same order as a sequential lookup would. All methods are waited
+    for, so that no lookup is still running in the background once a result
+    has been picked. The output of the methods that a sequential lookup would
+    not have tried is only written to the log file.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=len(candidates)) as executor:
+        futures = [executor.submit(_run_candidate, c, True) for c in candidates]
+        consumed = 0
+        try:
+            for f in futures:
+                yield f.result()
+                consumed += 1
+        finally:
+            for f in futures[consumed + 1:]:
+                mlog.debug_records(f.result()[2])
+
+
 def _build_external_dependency_list(name: str, env: 'Environment', for_machine: MachineChoice,
                                     kwargs: T.Dict[str, T.Any]) -> T.List['DependencyGenerator']:
     # First check if the method is valid
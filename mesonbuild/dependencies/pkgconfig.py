@@ -14,6 +14,7 @@ from functools import lru_cache
 import re
 import os
 import shlex
+import threading
 import typing as T
 
 if T.TYPE_CHECKING:
@@ -29,19 +30,22 @@ class PkgConfigInterface:
 
     class_impl: PerMachine[T.Union[Literal[False], T.Optional[PkgConfigInterface]]] = PerMachine(False, False)
     class_cli_impl: PerMachine[T.Union[Literal[False], T.Optional[PkgConfigCLI]]] = PerMachine(False, False)
+    # Dependency lookups can run concurrently, pkg-config is only detected once
+    class_lock = threading.RLock()
 
     @staticmethod
     def instance(env: Environment, for_machine: MachineChoice, silent: bool) -> T.Optional[PkgConfigInterface]:
         '''Return a pkg-config implementation singleton'''
         for_machine = for_machine if env.is_cross_build() else MachineChoice.HOST
-        impl = PkgConfigInterface.class_impl[for_machine]
-        if impl is False:
-            impl = PkgConfigCLI(env, for_machine, silent)
-            if not impl.found():
-                impl = None
-            if not impl and not silent:
-                mlog.log('Found pkg-config:', mlog.red('NO'))
-            PkgConfigInterface.class_impl[for_machine] = impl
+        with PkgConfigInterface.class_lock:
+            impl = PkgConfigInterface.class_impl[for_machine]
+            if impl is False:
+                impl = PkgConfigCLI(env, for_machine, silent)
+                if not impl.found():
+                    impl = None
+                if not impl and not silent:
+                    mlog.log('Found pkg-config:', mlog.red('NO'))
+                PkgConfigInterface.class_impl[for_machine] = impl
         return impl
 
     @staticmethod
@@ -54,12 +58,13 @@ class PkgConfigInterface:
         impl: T.Union[Literal[False], T.Optional[PkgConfigInterface]] # Help confused mypy
         impl = PkgConfigInterface.instance(env, for_machine, silent)
         if impl and not isinstance(impl, PkgConfigCLI):
-            impl = PkgConfigInterface.class_cli_impl[for_machine]
-            if impl is False:
-                impl = PkgConfigCLI(env, for_machine, silent)
-                if not impl.found():
-                    impl = None
-                PkgConfigInterface.class_cli_impl[for_machine] = impl
+            with PkgConfigInterface.class_lock:
+                impl = PkgConfigInterface.class_cli_impl[for_machine]
+                if impl is False:
+                    impl = PkgConfigCLI(env, for_machine, silent)
+                    if not impl.found():
+                        impl = None
+                    PkgConfigInterface.class_cli_impl[for_machine] = impl
         return T.cast('T.Optional[PkgConfigCLI]', impl) # Trust me, mypy
 
     @staticmethod
@@ -121,6 +126,8 @@ class PkgConfigCLI(PkgConfigInterface):
     def found(self) -> bool:
         return bool(self.pkgbin)
 
+    # The lru_cache wrappers below are thread-safe: concurrent lookups may
+    # both call pkg-config for the same key, but the cache stays consistent.
     @lru_cache(maxsize=None)
     def version(self, name: str) -> T.Optional[str]:
         mlog.debug(f'Determining dependency {name!r} with pkg-config executable {self.pkgbin.get_path()!r}')
@@ -73,6 +73,22 @@ class NumPyConfigToolDependency(ConfigToolDependency):
         self.compile_args = self.get_config_value(['--cflags'], 'compile_args')
 
 
+# Environment variables that change what an interpreter reports about itself,
+# and thus are part of the key of the introspection cache.
+_INTROSPECTION_ENV_VARS = (
+    'DEB_PYTHON_INSTALL_LAYOUT',
+    'PYTHONHOME',
+    'PYTHONNOUSERSITE',
+    'PYTHONPATH',
+    'PYTHONPLATLIBDIR',
+    'PYTHONUSERBASE',
+    'VIRTUAL_ENV',
+    '_PYTHON_HOST_PLATFORM',
+    '_PYTHON_PROJECT_BASE',
+    '_PYTHON_SYSCONFIGDATA_NAME',
+)
+
+
 class BasicPythonExternalProgram(ExternalProgram):
     def __init__(self, name: str, command: T.Optional[T.List[str]] = None,
                  ext_prog: T.Optional[ExternalProgram] = None):
@@ -112,9 +128,32 @@ class BasicPythonExternalProgram(ExternalProgram):
             return mesonlib.version_compare(version, '>= 3.0')
         return True
 
-    def sanity(self) -> bool:
+    def sanity(self, environment: T.Optional['Environment'] = None) -> bool:
         # Sanity check, we expect to have something that at least quacks in tune
 
+        command = self.get_command()
+        if environment is not None and command and os.path.isabs(command[0]):
+            key = (tuple(command),
+                   tuple(mesonlib.file_stat_key(c) if os.path.isabs(c) else None for c in command),
+                   tuple(os.environ.get(v) for v in _INTROSPECTION_ENV_VARS))
+            cache = environment.coredata.python_introspection_cache
+            if key in cache:
+                mlog.debug(f'Using cached introspection data of {mesonlib.join_args(command)}')
+                info = cache[key]
+            else:
+                info = self._introspect()
+                if info is not None:
+                    cache[key] = info
+        else:
+            info = self._introspect()
+
+        if info is not None and self._check_version(info['version']):
+            self.info = info
+            return True
+        else:
+            return False
+
+    def _introspect(self) -> T.Optional['PythonIntrospectionDict']:
         import importlib.resources
 
         with importlib.resources.path('mesonbuild.scripts', 'python_info.py') as f:
@@ -124,20 +163,14 @@ class BasicPythonExternalProgram(ExternalProgram):
             p, stdout, stderr = mesonlib.Popen_safe(cmd, env=env)
 
         try:
-            info = json.loads(stdout)
+            return T.cast('PythonIntrospectionDict', json.loads(stdout))
         except json.JSONDecodeError:
-            info = None
             mlog.debug('Could not introspect Python (%s): exit code %d' % (str(p.args), p.returncode))
             mlog.debug('Program stdout:\n')
             mlog.debug(stdout)
             mlog.debug('Program stderr:\n')
             mlog.debug(stderr)
-
-        if info is not None and self._check_version(info['version']):
-            self.info = T.cast('PythonIntrospectionDict', info)
-            return True
-        else:
-            return False
+            return None
 
 
 class _PythonDependencyBase(_Base):
@@ -381,7 +414,7 @@ def python_factory(env: 'Environment', for_machine: 'MachineChoice',
     # When not invoked through the python module, default installation.
     if installation is None:
         installation = BasicPythonExternalProgram('python3', mesonlib.python_command)
-        installation.sanity()
+        installation.sanity(env)
     pkg_version = installation.info['variables'].get('LDVERSION') or installation.info['version']
 
     if DependencyMethods.PKGCONFIG in methods:
@@ -560,6 +560,13 @@ class Environment:
             self.scratch_dir = ''
             self.create_new_coredata(cmd_options)
 
+        # Program lookups use the directory index persisted in coredata
+        ExternalProgram.path_index = self.coredata.program_path_index
+
+        # Output of config tools for this run only, used instead of the one in
+        # coredata when the config_tool_cache option is disabled
+        self.config_tool_cache: T.Dict[coredata.ConfigToolCacheKey, coredata.ConfigToolCacheValue] = {}
+
         ## locally bind some unfrozen configuration
 
         # Stores machine infos, the only *three* machine one because we have a
@@ -80,6 +80,7 @@ from .type_checking import (
     INSTALL_TAG_KW,
     LANGUAGE_KW,
     NATIVE_KW,
+    POOL_KW,
     PRESERVE_PATH_KW,
     REQUIRED_KW,
     SHARED_LIB_KWS,
@@ -1414,6 +1415,18 @@ class Interpreter(InterpreterBase, HoldableObject):
             values.update({str(k): v for k, v in sorted_options})
             if values:
                 self.summary_impl('User defined options', values, {'bool_yn': False, 'list_sep': None})
+        # Add automatic section with the linkers selected by fast_link
+        if self.coredata.get_option(OptionKey('fast_link')):
+            values = collections.OrderedDict()
+            split_dwarf = []
+            for comp in self.coredata.compilers.host.values():
+                if comp.linker is not None:
+                    values[f'{comp.get_display_language()} linker'] = comp.linker.id
+                if comp.get_split_dwarf_args():
+                    split_dwarf.append(comp.get_display_language())
+            if self.coredata.get_option(OptionKey('debug')):
+                values['Split debug info'] = split_dwarf or False
+            self.summary_impl('Fast linking', values, {'bool_yn': True, 'list_sep': ', '})
         # Print all summaries, main project last.
         mlog.log('')  # newline
         main_summary = self.summary.pop('', None)
@@ -2031,6 +2044,7 @@ class Interpreter(InterpreterBase, HoldableObject):
         KwargInfo('feed', bool, default=False, since='0.59.0'),
         KwargInfo('capture', bool, default=False),
         KwargInfo('console', bool, default=False, since='0.48.0'),
+        POOL_KW,
     )
     def func_custom_target(self, node: mparser.FunctionNode, args: T.Tuple[str],
                            kwargs: 'kwtypes.CustomTarget') -> build.CustomTarget:
@@ -2081,6 +2095,8 @@ class Interpreter(InterpreterBase, HoldableObject):
             raise InvalidArguments('custom_target: "capture" keyword argument can only be used with a single output')
         if kwargs['capture'] and kwargs['console']:
             raise InvalidArguments('custom_target: "capture" and "console" keyword arguments are mutually exclusive')
+        if kwargs['console'] and kwargs['pool'] is not None:
+            raise InvalidArguments('custom_target: "console" and "pool" keyword arguments are mutually exclusive')
         for c in command:
             if kwargs['capture'] and isinstance(c, str) and '@OUTPUT@' in c:
                 raise InvalidArguments('custom_target: "capture" keyword argument cannot be used with "@OUTPUT@"')
@@ -2121,6 +2137,7 @@ class Interpreter(InterpreterBase, HoldableObject):
             install_dir=kwargs['install_dir'],
             install_mode=install_mode,
             install_tag=kwargs['install_tag'],
+            pool=kwargs['pool'],
             backend=self.backend)
         self.add_target(tg.name, tg)
         return tg
@@ -2167,6 +2184,9 @@ class Interpreter(InterpreterBase, HoldableObject):
         DEPFILE_KW,
         DEPENDS_KW,
         KwargInfo('capture', bool, default=False, since='0.43.0'),
+        POOL_KW,
+        KwargInfo('batch_size', int, default=1, since='1.6.0',
+                  validator=lambda x: 'must be at least 1' if x < 1 else None),
     )
     def func_generator(self, node: mparser.FunctionNode,
                        args: T.Tuple[T.Union[build.Executable, ExternalProgram]],
@@ -2180,6 +2200,14 @@ class Interpreter(InterpreterBase, HoldableObject):
             for o in kwargs['output']:
                 if '@OUTPUT@' in o:
                     raise InvalidArguments('Tried to use @OUTPUT@ in a rule with more than one output.')
+        if kwargs['batch_size'] > 1:
+            if kwargs['capture']:
+                raise InvalidArguments('"capture" cannot be used together with "batch_size".')
+            for a in kwargs['arguments']:
+                # The arguments are shared by all the inputs of a batch
+                if a not in {'@INPUT@', '@OUTPUT@'} and re.search(r'@(INPUT|OUTPUT\d*|BASENAME|PLAINNAME)@', a):
+                    raise InvalidArguments(f'"arguments" cannot contain {a!r} when "batch_size" is set, '
+                                           '@INPUT@ and @OUTPUT@ can only be used as whole arguments.')
 
         gen = build.Generator(args[0], **kwargs)
         self.generators.append(gen)
@@ -95,6 +95,8 @@ class FuncGenerator(TypedDict):
     depfile: T.Optional[str]
     capture:  bool
     depends: T.List[T.Union[build.BuildTarget, build.CustomTarget]]
+    pool: T.Optional[str]
+    batch_size: int
 
 
 class GeneratorProcess(TypedDict):
@@ -193,6 +195,7 @@ class CustomTarget(TypedDict):
     install_mode: FileMode
     install_tag: T.List[T.Optional[str]]
     output: T.List[str]
+    pool: T.Optional[str]
 
 class AddTestSetup(TypedDict):
 
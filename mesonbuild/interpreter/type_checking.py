@@ -268,6 +268,13 @@ DEPFILE_KW: KwargInfo[T.Optional[str]] = KwargInfo(
     validator=lambda x: 'Depfile must be a plain filename with a subdirectory' if has_path_sep(x) else None
 )
 
+POOL_KW: KwargInfo[T.Optional[str]] = KwargInfo(
+    'pool',
+    (str, type(None)),
+    since='1.6.0',
+    validator=lambda x: 'must only contain letters, digits, "_", "." and "-"' if re.fullmatch(r'[\w.-]+', x, re.ASCII) is None else None,
+)
+
 DEPENDS_KW: KwargInfo[T.List[T.Union[BuildTarget, CustomTarget, CustomTargetIndex]]] = KwargInfo(
     'depends',
     ContainerTypeInfo(list, (BuildTarget, CustomTarget, CustomTargetIndex)),
@@ -5,7 +5,7 @@ from __future__ import annotations
 
 from .. import mlog
 from ..mesonlib import (
-    EnvironmentException,
+    EnvironmentException, MesonException, OptionKey,
     Popen_safe, Popen_safe_logged, join_args, search_version
 )
 
@@ -27,12 +27,32 @@ defaults['cuda_static_linker'] = ['nvlink']
 defaults['gcc_static_linker'] = ['gcc-ar']
 defaults['clang_static_linker'] = ['llvm-ar']
 
+# Linkers tried by the fast_link option, fastest first
+fast_linkers = ['mold', 'lld', 'gold']
+
 def __failed_to_detect_linker(compiler: T.List[str], args: T.List[str], stdout: str, stderr: str) -> 'T.NoReturn':
     msg = 'Unable to detect linker for compiler `{}`\nstdout: {}\nstderr: {}'.format(
         join_args(compiler + args), stdout, stderr)
     raise EnvironmentException(msg)
 
 
+def __select_fast_linker(compiler: T.List[str], comp_class: T.Type['Compiler'],
+                         comp_version: str, check_args: T.List[str]) -> T.List[str]:
+    """Get the arguments to use the first of fast_linkers that works."""
+    for name in fast_linkers:
+        try:
+            override = comp_class.use_linker_args(name, comp_version)
+        except MesonException:
+            continue
+        if not override:
+            # This compiler cannot select its linker
+            return []
+        p, _, _ = Popen_safe_logged(compiler + check_args + override, msg=f'Trying {name} linker via')
+        if p.returncode == 0:
+            return override
+    return []
+
+
 def guess_win_linker(env: 'Environment', compiler: T.List[str], comp_class: T.Type['Compiler'],
                      comp_version: str, for_machine: MachineChoice, *,
                      use_linker_prefix: bool = True, invoked_directly: bool = True,
@@ -135,6 +155,9 @@ def guess_nix_linker(env: 'Environment', compiler: T.List[str], comp_class: T.Ty
     if value is not None:
         override = comp_class.use_linker_args(value[0], comp_version)
         check_args += override
+    elif env.coredata.get_option(OptionKey('fast_link')) and not any(a.startswith('-fuse-ld=') for a in ldflags):
+        override = __select_fast_linker(compiler, comp_class, comp_version, check_args)
+        check_args += override
 
     mlog.debug('-----')
     p, o, e = Popen_safe_logged(compiler + check_args, msg='Detecting linker via')
@@ -213,6 +213,9 @@ class DynamicLinker(metaclass=abc.ABCMeta):
     def get_thinlto_cache_args(self, path: str) -> T.List[str]:
         return []
 
+    def get_gdb_index_args(self) -> T.List[str]:
+        return []
+
     def sanitizer_args(self, value: str) -> T.List[str]:
         return []
 
@@ -860,6 +863,9 @@ class GnuGoldDynamicLinker(GnuDynamicLinker):
     def get_thinlto_cache_args(self, path: str) -> T.List[str]:
         return ['-Wl,-plugin-opt,cache-dir=' + path]
 
+    def get_gdb_index_args(self) -> T.List[str]:
+        return self._apply_prefix('--gdb-index')
+
 
 class GnuBFDDynamicLinker(GnuDynamicLinker):
 
@@ -873,6 +879,9 @@ class MoldDynamicLinker(GnuDynamicLinker):
     def get_thinlto_cache_args(self, path: str) -> T.List[str]:
         return ['-Wl,--thinlto-cache-dir=' + path]
 
+    def get_gdb_index_args(self) -> T.List[str]:
+        return self._apply_prefix('--gdb-index')
+
 
 class LLVMDynamicLinker(GnuLikeDynamicLinkerMixin, PosixDynamicLinkerMixin, DynamicLinker):
 
@@ -923,6 +932,9 @@ class LLVMDynamicLinker(GnuLikeDynamicLinkerMixin, PosixDynamicLinkerMixin, Dyna
     def get_thinlto_cache_args(self, path: str) -> T.List[str]:
         return ['-Wl,--thinlto-cache-dir=' + path]
 
+    def get_gdb_index_args(self) -> T.List[str]:
+        return self._apply_prefix('--gdb-index')
+
     def get_win_subsystem_args(self, value: str) -> T.List[str]:
         # lld does not support a numeric subsystem value
         version = None
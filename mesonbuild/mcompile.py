@@ -19,6 +19,7 @@ from . import mesonlib
 from .mesonlib import MesonException, RealPathAction, join_args, listify_array_value, setup_vsenv
 from mesonbuild.environment import detect_ninja
 from mesonbuild import build
+from mesonbuild.backend import ninjalog
 
 if T.TYPE_CHECKING:
     import argparse
@@ -155,12 +156,8 @@ def generate_target_names_ninja(target: ParsedTargetName, builddir: Path, intros
     else:
         return [str(Path(out_file).relative_to(builddir.resolve())) for out_file in intro_target['filename']]
 
-def get_parsed_args_ninja(options: 'argparse.Namespace', builddir: Path) -> T.Tuple[T.List[str], T.Optional[T.Dict[str, str]]]:
-    runner = detect_ninja()
-    if runner is None:
-        raise MesonException('Cannot find ninja.')
-
-    cmd = runner
+def get_parsed_args_ninja(options: 'argparse.Namespace', builddir: Path, runner: T.List[str]) -> T.Tuple[T.List[str], T.Optional[T.Dict[str, str]]]:
+    cmd = runner.copy()
     if not builddir.samefile('.'):
         cmd.extend(['-C', builddir.as_posix()])
 
@@ -327,6 +324,12 @@ def add_arguments(parser: 'argparse.ArgumentParser') -> None:
         action='store_true',
         help='Show more verbose output.'
     )
+    parser.add_argument(
+        '--analyze',
+        action='store_true',
+        help='Report which build steps bounded the duration of the build, and write the details '
+             'to meson-logs/build-analysis.json (applied only on `ninja` backend).'
+    )
     parser.add_argument(
         '--ninja-args',
         type=array_arg,
@@ -351,6 +354,8 @@ def run(options: 'argparse.Namespace') -> int:
     validate_builddir(bdir)
     if options.targets and options.clean:
         raise MesonException('`TARGET` and `--clean` can\'t be used simultaneously')
+    if options.analyze and options.clean:
+        raise MesonException('`--analyze` and `--clean` can\'t be used simultaneously')
 
     b = build.load(options.wd)
     cdata = b.environment.coredata
@@ -363,9 +368,15 @@ def run(options: 'argparse.Namespace') -> int:
 
     backend = cdata.get_option(mesonlib.OptionKey('backend'))
     assert isinstance(backend, str)
+    if options.analyze and backend != 'ninja':
+        raise MesonException(f'Backend `{backend}` does not support `--analyze`.')
     mlog.log(mlog.green('INFO:'), 'autodetecting backend as', backend)
     if backend == 'ninja':
-        cmd, env = get_parsed_args_ninja(options, bdir)
+        runner = detect_ninja()
+        if runner is None:
+            raise MesonException('Cannot find ninja.')
+        ninjalog.run_deferred_cleandead(str(bdir), runner)
+        cmd, env = get_parsed_args_ninja(options, bdir, runner)
     elif backend.startswith('vs'):
         cmd, env = get_parsed_args_vs(options, bdir)
     elif backend == 'xcode':
@@ -377,4 +388,8 @@ def run(options: 'argparse.Namespace') -> int:
     mlog.log(mlog.green('INFO:'), 'calculating backend command to run:', join_args(cmd))
     p, *_ = mesonlib.Popen_safe(cmd, stdout=sys.stdout.buffer, stderr=sys.stderr.buffer, env=env)
 
+    if options.analyze:
+        from .backend import ninjaanalysis
+        ninjaanalysis.analyze(b)
+
     return p.returncode
@@ -315,7 +315,7 @@ def list_buildoptions(coredata: cdata.CoreData, subprojects: T.Optional[T.List[s
             elif isinstance(opt, options.UserComboOption):
                 optdict['choices'] = opt.choices
                 typestr = 'combo'
-            elif isinstance(opt, options.UserIntegerOption):
+            elif isinstance(opt, (options.UserIntegerOption, options.UserIntegerOrAutoOption)):
                 typestr = 'integer'
             elif isinstance(opt, options.UserArrayOption):
                 typestr = 'array'
@@ -16,6 +16,7 @@ import platform
 import shlex
 import subprocess
 import shutil
+import threading
 import typing as T
 from contextlib import contextmanager
 from dataclasses import dataclass, field
@@ -28,6 +29,8 @@ if T.TYPE_CHECKING:
 
     TV_Loggable = T.Union[str, 'AnsiDecorator', StringProtocol]
     TV_LoggableList = T.List[TV_Loggable]
+    # method name, positional arguments, keyword arguments
+    TV_LogRecord = T.Tuple[str, T.Tuple[T.Any, ...], T.Dict[str, T.Any]]
 
 def is_windows() -> bool:
     platname = platform.system().lower()
@@ -97,6 +100,7 @@ class _Logger:
     logged_once: T.Set[T.Tuple[str, ...]] = field(default_factory=set)
     log_warnings_counter = 0
     log_pager: T.Optional['subprocess.Popen'] = None
+    log_capture: threading.local = field(default_factory=threading.local)
 
     _LOG_FNAME: T.ClassVar[str] = 'meson-log.txt'
 
@@ -117,6 +121,44 @@ class _Logger:
         finally:
             self.log_disable_stdout = restore
 
+    @contextmanager
+    def capture(self) -> T.Iterator[T.List[TV_LogRecord]]:
+        """Buffer everything logged by the calling thread instead of writing it.
+
+        Other threads are unaffected. The buffered records can be written
+        later, in the context of another thread, with replay().
+        """
+        records: T.List[TV_LogRecord] = []
+        self.log_capture.records = records
+        try:
+            yield records
+        finally:
+            self.log_capture.records = None
+
+    def replay(self, records: T.List[TV_LogRecord]) -> None:
+        for method, args, kwargs in records:
+            getattr(self, method)(*args, **kwargs)
+
+    def debug_records(self, records: T.List[TV_LogRecord]) -> None:
+        """Write buffered records to the log file only.
+
+        Warnings and errors among them are not counted and never fatal.
+        """
+        for method, args, _ in records:
+            if method == '_log_error':
+                severity, *rest = args
+                args = (f'{severity.name}:', *rest)
+            elif method not in {'debug', '_log', '_log_once'}:
+                continue
+            self.debug(*args)
+
+    def _captured(self, method: str, args: T.Tuple[T.Any, ...], **kwargs: T.Any) -> bool:
+        records: T.Optional[T.List[TV_LogRecord]] = getattr(self.log_capture, 'records', None)
+        if records is None:
+            return False
+        records.append((method, args, kwargs))
+        return True
+
     def set_quiet(self) -> None:
         self.log_errors_only = True
 
@@ -230,6 +272,8 @@ class _Logger:
 
     def debug(self, *args: TV_Loggable, sep: T.Optional[str] = None,
               end: T.Optional[str] = None, display_timestamp: bool = True) -> None:
+        if self._captured('debug', args, sep=sep, end=end, display_timestamp=display_timestamp):
+            return
         arr = process_markup(args, False, display_timestamp)
         if self.log_file is not None:
             print(*arr, file=self.log_file, sep=sep, end=end)
@@ -238,6 +282,9 @@ class _Logger:
     def _log(self, *args: TV_Loggable, is_error: bool = False,
              nested: bool = True, sep: T.Optional[str] = None,
              end: T.Optional[str] = None, display_timestamp: bool = True) -> None:
+        if self._captured('_log', args, is_error=is_error, nested=nested, sep=sep, end=end,
+                          display_timestamp=display_timestamp):
+            return
         arr = process_markup(args, False, display_timestamp)
         if self.log_file is not None:
             print(*arr, file=self.log_file, sep=sep, end=end)
@@ -278,6 +325,10 @@ class _Logger:
         This considers ansi decorated values by the values they wrap without
         regard for the AnsiDecorator itself.
         """
+        if self._captured('_log_once', args, is_error=is_error, nested=nested, sep=sep, end=end,
+                          display_timestamp=display_timestamp):
+            return
+
         def to_str(x: TV_Loggable) -> str:
             if isinstance(x, str):
                 return x
@@ -298,6 +349,11 @@ class _Logger:
                    is_error: bool = True) -> None:
         from .mesonlib import MesonException, relpath
 
+        # Counted and checked for fatality only once replayed
+        if self._captured('_log_error', (severity, *rargs), once=once, fatal=fatal, location=location,
+                          nested=nested, sep=sep, end=end, is_error=is_error):
+            return
+
         # The typing requirements here are non-obvious. Lists are invariant,
         # therefore T.List[A] and T.List[T.Union[A, B]] are not able to be joined
         if severity is _Severity.NOTICE:
@@ -375,13 +431,27 @@ class _Logger:
         with self.force_logging():
             self.log(*args, is_error=True)
 
+    def _push_depth(self, name: str) -> None:
+        self.log_depth.append(name)
+
+    def _pop_depth(self) -> None:
+        self.log_depth.pop()
+
     @contextmanager
     def nested(self, name: str = '') -> T.Generator[None, None, None]:
-        self.log_depth.append(name)
+        # A capturing thread must not change the nesting of the others, it
+        # is applied when its records are replayed
+        if self._captured('_push_depth', (name,)):
+            try:
+                yield
+            finally:
+                self._captured('_pop_depth', ())
+            return
+        self._push_depth(name)
         try:
             yield
         finally:
-            self.log_depth.pop()
+            self._pop_depth()
 
     def get_log_dir(self) -> str:
         return self.log_dir
@@ -402,8 +472,10 @@ class _Logger:
         return self.log_warnings_counter
 
 _logger = _Logger()
+capture = _logger.capture
 cmd_ci_include = _logger.cmd_ci_include
 debug = _logger.debug
+debug_records = _logger.debug_records
 deprecation = _logger.deprecation
 error = _logger.error
 exception = _logger.exception
@@ -419,6 +491,7 @@ nested_warnings = _logger.nested_warnings
 no_logging = _logger.no_logging
 notice = _logger.notice
 process_markup = _logger.process_markup
+replay = _logger.replay
 set_quiet = _logger.set_quiet
 set_timestamp_start = _logger.set_timestamp_start
 set_verbose = _logger.set_verbose
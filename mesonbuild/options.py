@@ -58,6 +58,9 @@ class UserOption(T.Generic[_T], HoldableObject):
         assert isinstance(self.value, (str, int, bool, list))
         return self.value
 
+    def printable_choices(self) -> T.Optional[T.Union[str, T.List[_T]]]:
+        return self.choices
+
     # Check that the input is a valid value and return the
     # "cleaned" or "native" version. For example the Boolean
     # option could take the string "true" and return True.
@@ -135,6 +138,27 @@ class UserIntegerOption(UserOption[int]):
         except ValueError:
             raise MesonException(f'Value string "{valuestring}" for option "{self.name}" is not convertible to an integer.')
 
+class UserIntegerOrAutoOption(UserOption[T.Union[str, int]]):
+    def __init__(self, name: str, description: str, value: T.Any, yielding: bool = DEFAULT_YIELDING,
+                 deprecated: T.Union[bool, str, T.Dict[str, str], T.List[str]] = False):
+        min_value, max_value, default_value = value
+        # Validates and describes the integer values
+        integer_default = default_value if isinstance(default_value, int) else min_value or max_value or 0
+        self.integer = UserIntegerOption(name, description, (min_value, max_value, integer_default),
+                                         yielding, deprecated)
+        super().__init__(name, description, ['auto'], yielding, deprecated)
+        self.set_value(default_value)
+
+    def printable_choices(self) -> T.Optional[T.Union[str, T.List[T.Union[str, int]]]]:
+        if self.integer.choices:
+            return f'auto, {self.integer.choices}'
+        return 'auto'
+
+    def validate_value(self, value: T.Any) -> T.Union[str, int]:
+        if value == 'auto':
+            return 'auto'
+        return self.integer.validate_value(value)
+
 class OctalInt(int):
     # NinjaBackend.get_user_option_args uses str() to converts it to a command line option
     # UserUmaskOption.toint() uses int(str, 8) to convert it to an integer
@@ -422,10 +446,14 @@ BUILTIN_CORE_OPTIONS: T.Dict['OptionKey', 'BuiltinOption'] = OrderedDict([
      ),
     (OptionKey('buildtype'),       BuiltinOption(UserComboOption, 'Build type to use', 'debug',
                                                  choices=buildtypelist)),
+    (OptionKey('config_tool_cache'), BuiltinOption(UserBooleanOption, 'Keep the output of config tools across reconfigurations', True)),
     (OptionKey('debug'),           BuiltinOption(UserBooleanOption, 'Enable debug symbols and other information', True)),
     (OptionKey('default_library'), BuiltinOption(UserComboOption, 'Default library type', 'shared', choices=['shared', 'static', 'both'],
                                                  yielding=False)),
+    (OptionKey('dependency_lookup'), BuiltinOption(UserComboOption, 'How to try the lookup methods of a dependency', 'sequential',
+                                                   choices=['sequential', 'speculative'])),
     (OptionKey('errorlogs'),       BuiltinOption(UserBooleanOption, "Whether to print the logs from failing tests", True)),
+    (OptionKey('fast_link'),       BuiltinOption(UserBooleanOption, 'Select the fastest linker and split debug info', False)),
     (OptionKey('install_umask'),   BuiltinOption(UserUmaskOption, 'Default umask to apply on permissions of installed files', '022')),
     (OptionKey('layout'),          BuiltinOption(UserComboOption, 'Build directory layout', 'mirror', choices=['mirror', 'flat'])),
     (OptionKey('optimization'),    BuiltinOption(UserComboOption, 'Optimization level', '0', choices=['plain', '0', 'g', '1', '2', '3', 's'])),
@@ -434,6 +462,7 @@ BUILTIN_CORE_OPTIONS: T.Dict['OptionKey', 'BuiltinOption'] = OrderedDict([
     (OptionKey('strip'),           BuiltinOption(UserBooleanOption, 'Strip targets on install', False)),
     (OptionKey('unity'),           BuiltinOption(UserComboOption, 'Unity build', 'off', choices=['on', 'off', 'subprojects'])),
     (OptionKey('unity_size'),      BuiltinOption(UserIntegerOption, 'Unity block size', (2, None, 4))),
+    (OptionKey('unity_grouping'),  BuiltinOption(UserComboOption, 'How sources are grouped in unity files', 'count', choices=['count', 'cost'])),
     (OptionKey('warning_level'),   BuiltinOption(UserComboOption, 'Compiler warning level to use', '1', choices=['0', '1', '2', '3', 'everything'], yielding=False)),
     (OptionKey('werror'),          BuiltinOption(UserBooleanOption, 'Treat warnings as errors', False, yielding=False)),
     (OptionKey('wrap_mode'),       BuiltinOption(UserComboOption, 'Wrap mode', 'default', choices=['default', 'nofallback', 'nodownload', 'forcefallback', 'nopromote'])),
@@ -11,6 +11,7 @@ import shutil
 import stat
 import sys
 import re
+import threading
 import typing as T
 from pathlib import Path
 
@@ -19,16 +20,92 @@ from . import mlog
 from .mesonlib import MachineChoice, OrderedSet
 
 if T.TYPE_CHECKING:
+    from .coredata import ProgramVersionCacheKey
     from .environment import Environment
     from .interpreter import Interpreter
 
 
+class PathDirIndex:
+
+    """Index of the contents of the directories programs are searched in.
+
+    Each directory is listed once, and program lookups are then answered from
+    the listing instead of probing every directory for every name. The index
+    is stored in coredata so that reconfigures only list directories whose
+    modification time has changed. Every directory is checked at most once
+    per run.
+    """
+
+    def __init__(self) -> None:
+        self.dirs: T.Dict[str, T.Tuple[int, T.FrozenSet[str]]] = {}
+        self.checked: T.Set[str] = set()
+        # Programs can be looked up by concurrent dependency lookups
+        self.lock = threading.Lock()
+
+    def __getstate__(self) -> T.Dict[str, T.Any]:
+        state = self.__dict__.copy()
+        del state['checked']
+        del state['lock']
+        return state
+
+    def __setstate__(self, state: T.Dict[str, T.Any]) -> None:
+        self.__dict__.update(state)
+        self.checked = set()
+        self.lock = threading.Lock()
+
+    def clear(self) -> None:
+        with self.lock:
+            self.dirs.clear()
+            self.checked.clear()
+
+    def listdir(self, dirname: str) -> T.Optional[T.FrozenSet[str]]:
+        with self.lock:
+            return self._listdir(dirname)
+
+    def _listdir(self, dirname: str) -> T.Optional[T.FrozenSet[str]]:
+        entry = self.dirs.get(dirname)
+        if dirname not in self.checked:
+            self.checked.add(dirname)
+            try:
+                mtime = os.stat(dirname).st_mtime_ns
+            except OSError:
+                self.dirs.pop(dirname, None)
+                return None
+            if entry is None or entry[0] != mtime:
+                try:
+                    entry = (mtime, frozenset(os.listdir(dirname)))
+                except OSError:
+                    self.dirs.pop(dirname, None)
+                    return None
+                self.dirs[dirname] = entry
+        return entry[1] if entry is not None else None
+
+    def which(self, name: str, path: T.Optional[str]) -> T.Optional[str]:
+        """Equivalent of shutil.which() for UNIX-like platforms."""
+        if path is None or os.path.dirname(name):
+            return shutil.which(name, path=path)
+        for dirname in path.split(os.pathsep):
+            trial = os.path.join(dirname, name)
+            if os.path.isabs(dirname):
+                listing = self.listdir(dirname)
+                if listing is None or name not in listing:
+                    continue
+            elif not os.path.exists(trial):
+                # Relative entries depend on the working directory, don't index them
+                continue
+            if os.access(trial, os.X_OK) and not os.path.isdir(trial):
+                return trial
+        return None
+
+
 class ExternalProgram(mesonlib.HoldableObject):
 
     """A program that is found on the system."""
 
     windows_exts = ('exe', 'msc', 'com', 'bat', 'cmd')
     for_machine = MachineChoice.BUILD
+    # Replaced by the persistent index from coredata when configuring
+    path_index = PathDirIndex()
 
     def __init__(self, name: str, command: T.Optional[T.List[str]] = None,
                  silent: bool = False, search_dir: T.Optional[str] = None,
@@ -94,28 +171,46 @@ class ExternalProgram(mesonlib.HoldableObject):
 
     def get_version(self, interpreter: T.Optional['Interpreter'] = None) -> str:
         if not self.cached_version:
-            raw_cmd = self.get_command() + [self.version_arg]
             if interpreter:
-                res = interpreter.run_command_impl((self, [self.version_arg]),
-                                                   {'capture': True,
-                                                    'check': True,
-                                                    'env': mesonlib.EnvironmentVariables()},
-                                                   True)
-                o, e = res.stdout, res.stderr
+                # The version of an unmodified program is reused across runs
+                key: ProgramVersionCacheKey = (
+                    tuple(self.command),
+                    tuple(mesonlib.file_stat_key(c) if os.path.isabs(c) else None for c in self.command),
+                    self.version_arg)
+                cache = interpreter.coredata.program_version_cache
+                if key in cache:
+                    mlog.debug(f'Using cached version {cache[key]} of {mesonlib.join_args(self.command)}')
+                    # Running the program would have made it a regeneration dependency
+                    interpreter.add_build_def_file(self.get_path())
+                else:
+                    cache[key] = self._detect_version(interpreter)
+                self.cached_version = cache[key]
             else:
-                p, o, e = mesonlib.Popen_safe(raw_cmd)
-                if p.returncode != 0:
-                    cmd_str = mesonlib.join_args(raw_cmd)
-                    raise mesonlib.MesonException(f'Command {cmd_str!r} failed with status {p.returncode}.')
-            output = o.strip()
-            if not output:
-                output = e.strip()
-            match = re.search(r'([0-9][0-9\.]+)', output)
-            if not match:
-                raise mesonlib.MesonException(f'Could not find a version number in output of {raw_cmd!r}')
-            self.cached_version = match.group(1)
+                self.cached_version = self._detect_version()
         return self.cached_version
 
+    def _detect_version(self, interpreter: T.Optional['Interpreter'] = None) -> str:
+        raw_cmd = self.get_command() + [self.version_arg]
+        if interpreter:
+            res = interpreter.run_command_impl((self, [self.version_arg]),
+                                               {'capture': True,
+                                                'check': True,
+                                                'env': mesonlib.EnvironmentVariables()},
+                                               True)
+            o, e = res.stdout, res.stderr
+        else:
+            p, o, e = mesonlib.Popen_safe(raw_cmd)
+            if p.returncode != 0:
+                cmd_str = mesonlib.join_args(raw_cmd)
+                raise mesonlib.MesonException(f'Command {cmd_str!r} failed with status {p.returncode}.')
+        output = o.strip()
+        if not output:
+            output = e.strip()
+        match = re.search(r'([0-9][0-9\.]+)', output)
+        if not match:
+            raise mesonlib.MesonException(f'Could not find a version number in output of {raw_cmd!r}')
+        return match.group(1)
+
     @classmethod
     def from_bin_list(cls, env: 'Environment', for_machine: MachineChoice, name: str) -> 'ExternalProgram':
         # There is a static `for_machine` for this class because the binary
@@ -298,14 +393,14 @@ class ExternalProgram(mesonlib.HoldableObject):
             return [None]
         # Do a standard search in PATH
         path = os.environ.get('PATH', None)
-        if mesonlib.is_windows() and path:
-            path = self._windows_sanitize_path(path)
-        command = shutil.which(name, path=path)
         if mesonlib.is_windows():
+            if path:
+                path = self._windows_sanitize_path(path)
+            command = shutil.which(name, path=path)
             return self._search_windows_special_cases(name, command)
-        # On UNIX-like platforms, shutil.which() is enough to find
+        # On UNIX-like platforms, a which() lookup is enough to find
         # all executables whether in PATH or with an absolute path
-        return [command]
+        return [self.path_index.which(name, path)]
 
     def found(self) -> bool:
         return self.command[0] is not None
@@ -12,6 +12,7 @@ import re
 import typing as T
 
 from ..backend.ninjabackend import ninja_quote
+from ..mesonlib import map_chunks_in_processes
 
 if T.TYPE_CHECKING:
     from typing_extensions import Literal
@@ -29,83 +30,150 @@ FORTRAN_MODULE_RE = re.compile(FORTRAN_MODULE_PAT, re.IGNORECASE)
 FORTRAN_SUBMOD_RE = re.compile(FORTRAN_SUBMOD_PAT, re.IGNORECASE)
 FORTRAN_USE_RE = re.compile(FORTRAN_USE_PAT, re.IGNORECASE)
 
+# Scanning in several processes only pays off when there is a lot to scan:
+# 256 files take about as long to scan as starting the worker processes
+PARALLEL_SCAN_THRESHOLD = 2048
+# Ninja runs other commands, including the scans of other targets, at the
+# same time, so a scan only uses a few processes
+MAX_SCAN_JOBS = 4
+
+class FileScan(T.NamedTuple):
+
+    """Modules used and provided by a source file.
+
+    :param needs: Modules used, in the order they appear.
+    :param exports: Modules provided, in the order they appear, with whether
+        another file may not provide them too.
+    """
+
+    needs: T.List[str]
+    exports: T.List[T.Tuple[str, bool]]
+
+def scan_fortran_file(fname: str) -> FileScan:
+    fpath = pathlib.Path(fname)
+    needs: T.List[str] = []
+    exports: T.List[T.Tuple[str, bool]] = []
+    modules_in_this_file = set()
+    for line in fpath.read_text(encoding='utf-8', errors='ignore').split('\n'):
+        import_match = FORTRAN_USE_RE.match(line)
+        export_match = FORTRAN_MODULE_RE.match(line)
+        submodule_export_match = FORTRAN_SUBMOD_RE.match(line)
+        if import_match:
+            needed = import_match.group(1).lower()
+            # In Fortran you have an using declaration also for the module
+            # you define in the same file. Prevent circular dependencies.
+            if needed not in modules_in_this_file:
+                needs.append(needed)
+        if export_match:
+            exported_module = export_match.group(1).lower()
+            assert exported_module not in modules_in_this_file
+            modules_in_this_file.add(exported_module)
+            exports.append((exported_module, True))
+        if submodule_export_match:
+            # Store submodule "Foo" "Bar" as "foo:bar".
+            # A submodule declaration can be both an import and an export declaration:
+            #
+            # submodule (a1:a2) a3
+            #  - requires a1@a2.smod
+            #  - produces a1@a3.smod
+            parent_module_name_full = submodule_export_match.group(1).lower()
+            parent_module_name = parent_module_name_full.split(':')[0]
+            submodule_name = submodule_export_match.group(2).lower()
+            concat_name = f'{parent_module_name}:{submodule_name}'
+            exports.append((concat_name, False))
+            # Fortran requires that the immediate parent module must be built
+            # before the current one. Thus:
+            #
+            # submodule (parent) parent   <- requires parent.mod (really parent.smod, but they are created at the same time)
+            # submodule (a1:a2) a3        <- requires a1@a2.smod
+            #
+            # a3 does not depend on the a1 parent module directly, only transitively.
+            needs.append(parent_module_name_full)
+    return FileScan(needs, exports)
+
+def scan_cpp_file(fname: str) -> FileScan:
+    fpath = pathlib.Path(fname)
+    needs: T.List[str] = []
+    exports: T.List[T.Tuple[str, bool]] = []
+    for line in fpath.read_text(encoding='utf-8', errors='ignore').split('\n'):
+        import_match = CPP_IMPORT_RE.match(line)
+        export_match = CPP_EXPORT_RE.match(line)
+        if import_match:
+            needs.append(import_match.group(1))
+        if export_match:
+            exports.append((export_match.group(1), True))
+    return FileScan(needs, exports)
+
+def scan_file(fname: str, lang: Literal['cpp', 'fortran']) -> FileScan:
+    if lang == 'fortran':
+        return scan_fortran_file(fname)
+    return scan_cpp_file(fname)
+
+def _scan_files(sources: T.List[T.Tuple[str, Literal['cpp', 'fortran']]]) -> T.List[FileScan]:
+    return [scan_file(fname, lang) for fname, lang in sources]
+
 class DependencyScanner:
     def __init__(self, pickle_file: str, outfile: str):
         with open(pickle_file, 'rb') as pf:
             self.target_data: TargetDependencyScannerInfo = pickle.load(pf)
         self.outfile = outfile
+        # Results of the previous scan, to only rescan the files that changed
+        self.cache_file = outfile + '.cache'
         self.sources = self.target_data.sources
         self.provided_by: T.Dict[str, str] = {}
         self.exports: T.Dict[str, str] = {}
         self.needs: collections.defaultdict[str, T.List[str]] = collections.defaultdict(list)
         self.sources_with_exports: T.List[str] = []
 
-    def scan_file(self, fname: str, lang: Literal['cpp', 'fortran']) -> None:
-        if lang == 'fortran':
-            self.scan_fortran_file(fname)
-        else:
-            self.scan_cpp_file(fname)
-
-    def scan_fortran_file(self, fname: str) -> None:
-        fpath = pathlib.Path(fname)
-        modules_in_this_file = set()
-        for line in fpath.read_text(encoding='utf-8', errors='ignore').split('\n'):
-            import_match = FORTRAN_USE_RE.match(line)
-            export_match = FORTRAN_MODULE_RE.match(line)
-            submodule_export_match = FORTRAN_SUBMOD_RE.match(line)
-            if import_match:
-                needed = import_match.group(1).lower()
-                # In Fortran you have an using declaration also for the module
-                # you define in the same file. Prevent circular dependencies.
-                if needed not in modules_in_this_file:
-                    self.needs[fname].append(needed)
-            if export_match:
-                exported_module = export_match.group(1).lower()
-                assert exported_module not in modules_in_this_file
-                modules_in_this_file.add(exported_module)
-                if exported_module in self.provided_by:
-                    raise RuntimeError(f'Multiple files provide module {exported_module}.')
-                self.sources_with_exports.append(fname)
-                self.provided_by[exported_module] = fname
-                self.exports[fname] = exported_module
-            if submodule_export_match:
-                # Store submodule "Foo" "Bar" as "foo:bar".
-                # A submodule declaration can be both an import and an export declaration:
-                #
-                # submodule (a1:a2) a3
-                #  - requires a1@a2.smod
-                #  - produces a1@a3.smod
-                parent_module_name_full = submodule_export_match.group(1).lower()
-                parent_module_name = parent_module_name_full.split(':')[0]
-                submodule_name = submodule_export_match.group(2).lower()
-                concat_name = f'{parent_module_name}:{submodule_name}'
-                self.sources_with_exports.append(fname)
-                self.provided_by[concat_name] = fname
-                self.exports[fname] = concat_name
-                # Fortran requires that the immediate parent module must be built
-                # before the current one. Thus:
-                #
-                # submodule (parent) parent   <- requires parent.mod (really parent.smod, but they are created at the same time)
-                # submodule (a1:a2) a3        <- requires a1@a2.smod
-                #
-                # a3 does not depend on the a1 parent module directly, only transitively.
-                self.needs[fname].append(parent_module_name_full)
-
-    def scan_cpp_file(self, fname: str) -> None:
-        fpath = pathlib.Path(fname)
-        for line in fpath.read_text(encoding='utf-8', errors='ignore').split('\n'):
-            import_match = CPP_IMPORT_RE.match(line)
-            export_match = CPP_EXPORT_RE.match(line)
-            if import_match:
-                needed = import_match.group(1)
-                self.needs[fname].append(needed)
-            if export_match:
-                exported_module = export_match.group(1)
-                if exported_module in self.provided_by:
-                    raise RuntimeError(f'Multiple files provide module {exported_module}.')
-                self.sources_with_exports.append(fname)
-                self.provided_by[exported_module] = fname
-                self.exports[fname] = exported_module
+    def load_cache(self) -> T.Dict[T.Tuple[str, str], T.Tuple[int, int, FileScan]]:
+        try:
+            with open(self.cache_file, 'rb') as f:
+                cache = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return {}
+        return cache if isinstance(cache, dict) else {}
+
+    def scan_files(self) -> T.Dict[str, FileScan]:
+        '''Scan all the sources, reusing the results of the previous scan for
+        the files whose size and modification time did not change.'''
+        cache = self.load_cache()
+        new_cache: T.Dict[T.Tuple[str, str], T.Tuple[int, int, FileScan]] = {}
+        scans: T.Dict[str, FileScan] = {}
+        to_scan: T.List[T.Tuple[str, Literal['cpp', 'fortran']]] = []
+        for fname, lang in self.sources:
+            st = os.stat(fname)
+            cached = cache.get((fname, lang))
+            if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+                scans[fname] = cached[2]
+                new_cache[(fname, lang)] = cached
+            else:
+                to_scan.append((fname, lang))
+                new_cache[(fname, lang)] = (st.st_mtime_ns, st.st_size, FileScan([], []))
+
+        for (fname, lang), result in zip(to_scan, self.scan_in_parallel(to_scan)):
+            scans[fname] = result
+            new_cache[(fname, lang)] = new_cache[(fname, lang)][:2] + (result,)
+
+        if to_scan or new_cache.keys() != cache.keys():
+            with open(self.cache_file + '~', 'wb') as f:
+                pickle.dump(new_cache, f)
+            os.replace(self.cache_file + '~', self.cache_file)
+        return scans
+
+    @staticmethod
+    def scan_in_parallel(sources: T.List[T.Tuple[str, Literal['cpp', 'fortran']]]) -> T.List[FileScan]:
+        jobs = min(os.cpu_count() or 1, MAX_SCAN_JOBS)
+        return map_chunks_in_processes(_scan_files, sources, jobs, PARALLEL_SCAN_THRESHOLD)
+
+    def add_file_scan(self, fname: str, scan: FileScan) -> None:
+        if scan.needs:
+            self.needs[fname].extend(scan.needs)
+        for module, unique in scan.exports:
+            if unique and module in self.provided_by:
+                raise RuntimeError(f'Multiple files provide module {module}.')
+            self.sources_with_exports.append(fname)
+            self.provided_by[module] = fname
+            self.exports[fname] = module
 
     def module_name_for(self, src: str, lang: Literal['cpp', 'fortran']) -> str:
         if lang == 'fortran':
@@ -121,8 +189,9 @@ class DependencyScanner:
         return '{}.ifc'.format(self.exports[src])
 
     def scan(self) -> int:
-        for s, lang in self.sources:
-            self.scan_file(s, lang)
+        scans = self.scan_files()
+        for s, _ in self.sources:
+            self.add_file_scan(s, scans[s])
         with open(self.outfile, 'w', encoding='utf-8') as ofile:
             ofile.write('ninja_dyndep_version = 1\n')
             for src, lang in self.sources:
@@ -0,0 +1,66 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 The Meson development team
+
+'''Run the rustc command given as arguments with artifact notifications, to
+pipeline the compilation of crates like Cargo does.
+
+With --metadata-only, rustc is stopped as soon as it has written the metadata
+of the crate, which is all that crates depending on it need to be compiled.
+The rest of the compilation is done by another invocation of rustc, which must
+have the same arguments for the metadata to match the rlib: --json is one of
+the options that make up the hash of a crate.'''
+
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+import typing as T
+
+def run(args: T.List[str]) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--metadata-only', action='store_true')
+    parser.add_argument('command', nargs=argparse.REMAINDER)
+    options = parser.parse_args(args)
+
+    # --color cannot be used together with --json
+    command: T.List[str] = []
+    json_args = 'artifacts'
+    args_iter = iter(options.command)
+    for arg in args_iter:
+        if arg == '--color':
+            arg += '=' + next(args_iter)
+        if arg.startswith('--color='):
+            if arg == '--color=always':
+                json_args += ',diagnostic-rendered-ansi'
+            continue
+        command.append(arg)
+    command += ['--error-format=json', f'--json={json_args}']
+
+    p = subprocess.Popen(command, stderr=subprocess.PIPE, encoding='utf-8', errors='replace')
+    assert p.stderr is not None
+    with p:
+        for line in p.stderr:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                sys.stderr.write(line)
+                continue
+            if not isinstance(message, dict):
+                continue
+            if message.get('emit') == 'metadata' and options.metadata_only:
+                # The metadata is written once the crate has been checked,
+                # the code is generated by the full compilation
+                p.kill()
+                return 0
+            level = message.get('level', '')
+            # Warnings are printed by the full compilation only
+            if options.metadata_only and not level.startswith('error'):
+                continue
+            if message.get('rendered'):
+                sys.stderr.write(message['rendered'])
+    return p.returncode
+
+if __name__ == '__main__':
+    sys.exit(run(sys.argv[1:]))
@@ -101,6 +101,7 @@ __all__ = [
     'exe_exists',
     'expand_arguments',
     'extract_as_list',
+    'file_stat_key',
     'first',
     'generate_list',
     'get_compiler_for_source',
@@ -131,6 +132,7 @@ __all__ = [
     'join_args',
     'listify',
     'listify_array_value',
+    'map_chunks_in_processes',
     'partition',
     'path_is_in_root',
     'pickle_load',
@@ -1417,9 +1419,9 @@ def dump_conf_header(ofilename: str, cdata: ConfigurationData,
     replace_if_different(ofilename, ofilename_tmp)
 
 
-def replace_if_different(dst: str, dst_tmp: str) -> None:
+def replace_if_different(dst: str, dst_tmp: str) -> bool:
     # If contents are identical, don't touch the file to prevent
-    # unnecessary rebuilds.
+    # unnecessary rebuilds. Returns whether the file was replaced.
     different = True
     try:
         with open(dst, 'rb') as f1, open(dst_tmp, 'rb') as f2:
@@ -1431,6 +1433,52 @@ def replace_if_different(dst: str, dst_tmp: str) -> None:
         os.replace(dst_tmp, dst)
     else:
         os.unlink(dst_tmp)
+    return different
+
+
+def file_stat_key(fname: StrOrBytesPath) -> T.Optional[T.Tuple[int, int, int, int]]:
+    '''
+    Returns a cheap identity for the file at @fname, suitable for use as part
+    of a cache key: (device, inode, size, mtime in ns). None is returned if the
+    file cannot be stat'ed.
+    '''
+    try:
+        st = os.stat(fname)
+    except OSError:
+        return None
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def map_chunks_in_processes(func: T.Callable[[T.List[_T]], T.List[_U]], items: T.List[_T],
+                            jobs: int, threshold: int) -> T.List[_U]:
+    '''
+    Returns func(items), where func maps a list of items to the list of their
+    results. If there are at least @threshold items, they are split between
+    up to @jobs worker processes, so @func must be picklable. The current
+    process is used if worker processes cannot be started, or if starting
+    them would mean importing Meson again in each of them, which costs more
+    than it saves.
+    '''
+    if len(items) < threshold or jobs <= 1:
+        return func(items)
+    import multiprocessing
+    # Frozen executables would run Meson itself in the workers, and other
+    # start methods than fork import it from scratch
+    if getattr(sys, 'frozen', False) or multiprocessing.get_start_method() != 'fork':
+        return func(items)
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+    chunks = [items[i::jobs] for i in range(jobs)]
+    try:
+        with ProcessPoolExecutor(jobs) as executor:
+            chunk_results = list(executor.map(func, chunks))
+    except (OSError, ImportError, NotImplementedError, BrokenProcessPool) as e:
+        # Sandboxes and some platforms do not allow worker processes, or
+        # the semaphores they need
+        mlog.debug(f'Could not use worker processes, continuing in this one: {e!r}')
+        return func(items)
+    # Undo the round-robin split
+    return [chunk_results[i % jobs][i // jobs] for i in range(len(items))]
 
 
 def listify(item: T.Any, flatten: bool = True) -> T.List[T.Any]:
@@ -2195,9 +2243,12 @@ _BUILTIN_NAMES = {
     'auto_features',
     'backend',
     'buildtype',
+    'config_tool_cache',
     'debug',
     'default_library',
+    'dependency_lookup',
     'errorlogs',
+    'fast_link',
     'genvslite',
     'install_umask',
     'layout',
@@ -2207,6 +2258,7 @@ _BUILTIN_NAMES = {
     'strip',
     'unity',
     'unity_size',
+    'unity_grouping',
     'warning_level',
     'werror',
     'wrap_mode',
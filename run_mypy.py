@@ -30,6 +30,7 @@ modules = [
     'mesonbuild/ast/visitor.py',
     'mesonbuild/arglist.py',
     'mesonbuild/backend/backends.py',
+    'mesonbuild/backend/ninjaanalysis.py',
     'mesonbuild/backend/nonebackend.py',
     # 'mesonbuild/coredata.py',
     'mesonbuild/depfile.py',
@@ -80,6 +81,7 @@ modules = [
 additional = [
     'run_mypy.py',
     'run_project_tests.py',
+    'run_setup_benchmarks.py',
     'run_single_test.py',
     'tools',
     'docs/genrefman.py',
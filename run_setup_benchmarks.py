@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 The Meson development team
+
+"""Benchmark `meson setup` on synthetic projects.
+
+Generates a project of configurable size, configures it with each of the
+requested backends and records the time spent in the interpreter and in the
+backend, the peak RSS of the process and the size of build.dat and of the
+files written by the backend. The results are printed as JSON, so that they
+can be stored and compared between Meson versions:
+
+    ./run_setup_benchmarks.py --subdirs 50 --targets 20 --output results.json
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import typing as T
+from pathlib import Path
+
+from mesonbuild import coredata, mesonmain, mlog
+from mesonbuild.backend import backends
+from mesonbuild.interpreter import interpreter
+
+if T.TYPE_CHECKING:
+    class ArgumentType(argparse.Namespace):
+
+        """Typing information for command line arguments."""
+
+        subdirs: int
+        targets: int
+        sources: int
+        fan_in: int
+        custom_targets: int
+        tests: int
+        backends: T.List[str]
+        repeat: int
+        output: T.Optional[str]
+        measure: T.Optional[T.List[str]]
+
+root = Path(__file__).resolve().parent
+
+# Files written by each backend, relative to the build directory
+BACKEND_FILES = {
+    'ninja': ['**/*.ninja'],
+    'vs': ['**/*.sln', '**/*.vcxproj', '**/*.vcxproj.filters'],
+    'xcode': ['**/*.pbxproj'],
+}
+
+def write_project(srcdir: Path, options: 'ArgumentType') -> None:
+    '''Write a project with options.subdirs subdirectories, each containing
+    options.targets static libraries of options.sources sources.
+
+    Every library links to the options.fan_in libraries defined before it, and
+    every subdirectory has options.custom_targets generated headers and an
+    executable run by options.tests tests.
+    '''
+    (srcdir / 'gen.py').write_text(
+        '#!/usr/bin/env python3\n'
+        'import sys\n'
+        'with open(sys.argv[1], "w") as f:\n'
+        '    f.write("#define GENERATED 1\\n")\n', encoding='utf-8')
+    (srcdir / 'meson.build').write_text('\n'.join([
+        "project('setup-benchmark', 'c')",
+        "gen = find_program('gen.py')",
+        *[f"subdir('dir{d}')" for d in range(options.subdirs)],
+        '',
+    ]), encoding='utf-8')
+
+    libs: T.List[str] = []
+    for d in range(options.subdirs):
+        subdir = srcdir / f'dir{d}'
+        subdir.mkdir()
+        lines = []
+        headers = []
+        for c in range(options.custom_targets):
+            lines.append(f"gen_{d}_{c} = custom_target('dir{d}-gen{c}', output : 'gen{c}.h', command : [gen, '@OUTPUT@'])")
+            headers.append(f'gen_{d}_{c}')
+        for t in range(options.targets):
+            sources = []
+            for s in range(options.sources):
+                name = f'lib{t}_{s}.c'
+                (subdir / name).write_text(f'int func_{d}_{t}_{s}(void) {{ return {s}; }}\n', encoding='utf-8')
+                sources.append(f"'{name}'")
+            link_with = libs[-options.fan_in:] if options.fan_in else []
+            lines.append(f"lib_{d}_{t} = static_library('dir{d}-lib{t}', {', '.join(sources + headers)}, "
+                         f"link_with : [{', '.join(link_with)}])")
+            libs.append(f'lib_{d}_{t}')
+        if options.tests:
+            (subdir / 'main.c').write_text('int main(void) { return 0; }\n', encoding='utf-8')
+            lines.append(f"exe_{d} = executable('dir{d}-test', 'main.c', link_with : [{', '.join(libs[-1:])}])")
+            for t in range(options.tests):
+                lines.append(f"test('dir{d}-test{t}', exe_{d}, args : ['{t}'])")
+        (subdir / 'meson.build').write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+def measure(srcdir: str, builddir: str, backend: str, output: str) -> int:
+    '''Configure srcdir in this process and write the measurements to output.'''
+    results: T.Dict[str, T.Any] = {}
+    run = interpreter.Interpreter.run
+
+    def timed_run(self: interpreter.Interpreter) -> None:
+        # Subprojects have interpreters of their own, only time the main one
+        outermost = 'interpreter_time' not in results
+        results.setdefault('interpreter_time', 0.0)
+        start = time.perf_counter()
+        try:
+            run(self)
+        finally:
+            if outermost:
+                results['interpreter_time'] = time.perf_counter() - start
+
+    get_backend_from_name = backends.get_backend_from_name
+
+    def timed_backend(*args: T.Any, **kwargs: T.Any) -> T.Optional[backends.Backend]:
+        b = get_backend_from_name(*args, **kwargs)
+        if b is not None:
+            generate = b.generate
+
+            def timed_generate(*args: T.Any, **kwargs: T.Any) -> T.Optional[T.Dict]:
+                start = time.perf_counter()
+                try:
+                    return generate(*args, **kwargs)
+                finally:
+                    results['backend_time'] = time.perf_counter() - start
+            b.generate = timed_generate  # type: ignore[method-assign]
+        return b
+
+    interpreter.Interpreter.run = timed_run  # type: ignore[method-assign]
+    backends.get_backend_from_name = timed_backend
+    start = time.perf_counter()
+    with mlog.no_logging():
+        returncode = mesonmain.run(['setup', '--backend', backend, builddir, srcdir], str(root / 'meson.py'))
+    results['setup_time'] = time.perf_counter() - start
+    results['returncode'] = returncode
+    try:
+        import resource
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes everywhere but on macOS
+        results['peak_rss'] = maxrss if sys.platform == 'darwin' else maxrss * 1024
+    except ImportError:
+        results['peak_rss'] = None
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f)
+    return 0
+
+def run_backend(srcdir: Path, workdir: Path, backend: str, repeat: int) -> T.Dict[str, T.Any]:
+    '''The measurements of the run with the shortest setup time.'''
+    fastest: T.Dict[str, T.Any] = {}
+    for i in range(repeat):
+        builddir = workdir / f'build-{backend}-{i}'
+        output = workdir / f'result-{backend}-{i}.json'
+        # A new process for each run, so that the peak RSS is its own
+        subprocess.run([sys.executable, __file__, '--measure', str(srcdir), str(builddir), backend, str(output)],
+                       stdout=subprocess.DEVNULL, check=True)
+        results = json.loads(output.read_text(encoding='utf-8'))
+        if results['returncode'] != 0:
+            # The build directory does not outlive the benchmark
+            log = builddir / 'meson-logs' / 'meson-log.txt'
+            return {'error': log.read_text(encoding='utf-8').splitlines()[-10:] if log.exists() else 'meson setup failed'}
+        if fastest and results['setup_time'] >= fastest['setup_time']:
+            continue
+        fastest = {key: results[key] for key in ('setup_time', 'interpreter_time', 'backend_time', 'peak_rss')
+                   if results[key] is not None}
+        fastest['build_dat_size'] = (builddir / 'meson-private' / 'build.dat').stat().st_size
+        fastest['backend_files_size'] = sum(f.stat().st_size
+                                            for pattern in BACKEND_FILES[backend]
+                                            for f in builddir.glob(pattern))
+    return fastest
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--subdirs', type=int, default=20,
+                        help='Number of subdirectories (default: %(default)s)')
+    parser.add_argument('--targets', type=int, default=20,
+                        help='Number of libraries in each subdirectory (default: %(default)s)')
+    parser.add_argument('--sources', type=int, default=10,
+                        help='Number of sources of each library (default: %(default)s)')
+    parser.add_argument('--fan-in', type=int, default=3,
+                        help='Number of libraries each library links to (default: %(default)s)')
+    parser.add_argument('--custom-targets', type=int, default=2,
+                        help='Number of generated headers in each subdirectory (default: %(default)s)')
+    parser.add_argument('--tests', type=int, default=5,
+                        help='Number of tests in each subdirectory (default: %(default)s)')
+    parser.add_argument('--backend', dest='backends', action='append', choices=sorted(BACKEND_FILES),
+                        help='Backend to benchmark, can be given several times (default: ninja)')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='Number of runs, all the measurements of the one with the shortest '
+                             'setup time are reported (default: %(default)s)')
+    parser.add_argument('--output', help='Write the results to this file instead of stdout')
+    parser.add_argument('--measure', nargs=4, help=argparse.SUPPRESS)
+    options = T.cast('ArgumentType', parser.parse_args())
+
+    if options.measure:
+        return measure(*options.measure)
+
+    parameters = {k: getattr(options, k) for k in ('subdirs', 'targets', 'sources', 'fan_in', 'custom_targets', 'tests')}
+    report: T.Dict[str, T.Any] = {
+        'meson_version': coredata.version,
+        'python_version': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': parameters,
+        'results': {},
+    }
+    with tempfile.TemporaryDirectory() as tmpdir:
+        srcdir = Path(tmpdir, 'src')
+        srcdir.mkdir()
+        write_project(srcdir, options)
+        for backend in options.backends or ['ninja']:
+            print(f'Benchmarking the {backend} backend', file=sys.stderr)
+            report['results'][backend] = run_backend(srcdir, Path(tmpdir), backend, options.repeat)
+
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
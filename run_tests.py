@@ -292,6 +292,8 @@ def run_mtest_inprocess(commandlist: T.List[str]) -> T.Tuple[int, str, str]:
 def clear_meson_configure_class_caches() -> None:
     CCompiler.find_library_cache.clear()
     CCompiler.find_framework_cache.clear()
+    CCompiler.library_dir_cache.clear()
+    CCompiler.library_elf_class_cache.clear()
     PkgConfigInterface.class_impl.assign(False, False)
     mesonlib.project_meson_versions.clear()
 
@@ -0,0 +1 @@
+int func_a(void) { return 0; }
@@ -0,0 +1 @@
+int func_b(void) { return 0; }
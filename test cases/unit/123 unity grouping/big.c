@@ -0,0 +1,11 @@
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+int big(const char *s) {
+    char *copy = strdup(s);
+    int len = (int)strlen(copy);
+    printf("%s\n", copy);
+    free(copy);
+    return len;
+}
@@ -0,0 +1 @@
+int func_c(void) { return 0; }
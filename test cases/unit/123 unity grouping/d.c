@@ -0,0 +1 @@
+int func_d(void) { return 0; }
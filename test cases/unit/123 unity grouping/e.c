@@ -0,0 +1 @@
+int func_e(void) { return 0; }
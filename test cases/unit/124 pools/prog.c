@@ -0,0 +1,5 @@
+int generated(void);
+
+int main(void) {
+    return generated();
+}
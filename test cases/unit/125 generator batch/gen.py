@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+
+# Generates a function returning the value in value.txt for every input
+
+import os
+import sys
+
+depfile, outdir, *inputs = sys.argv[1:]
+value_file = os.path.join(os.path.dirname(__file__), 'value.txt')
+with open(value_file) as f:
+    value = f.read().strip()
+
+outputs = []
+for i in inputs:
+    with open(i) as f:
+        name = f.read().strip()
+    output = os.path.join(outdir, os.path.splitext(os.path.basename(i))[0] + '.c')
+    with open(output, 'w') as f:
+        f.write(f'int {name}(void) {{ return {value}; }}\n')
+    outputs.append(output)
+
+with open(depfile, 'w') as f:
+    f.write('{}: {}\n'.format(' '.join(outputs), value_file.replace(' ', '\\ ')))
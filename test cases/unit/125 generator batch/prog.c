@@ -0,0 +1,7 @@
+int one(void);
+int two(void);
+int three(void);
+
+int main(void) {
+    return one() + two() + three() == 3 ? 0 : 1;
+}
@@ -0,0 +1,10 @@
+#include <map>
+#include <string>
+#include <vector>
+#include "common.h"
+
+int a() {
+    std::map<std::string, std::vector<int>> m;
+    m["a"].push_back(1);
+    return static_cast<int>(m.size()) - 1;
+}
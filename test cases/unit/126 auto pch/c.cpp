@@ -0,0 +1,10 @@
+#include <map>
+#include <string>
+#include <vector>
+#include "common.h"
+
+int c() {
+    std::map<std::string, std::vector<int>> m;
+    m["c"].push_back(1);
+    return static_cast<int>(m.size()) - 1;
+}
@@ -0,0 +1,5 @@
+#pragma once
+
+int a();
+int b();
+int c();
@@ -0,0 +1,3 @@
+#pragma once
+
+#define PROG_NAME "prog"
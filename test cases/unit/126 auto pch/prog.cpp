@@ -0,0 +1,9 @@
+#include <vector>
+#include "config.h"
+#include <string>
+#include "common.h"
+
+int main() {
+    std::vector<std::string> v{PROG_NAME};
+    return a() + b() + c() + static_cast<int>(v.size()) - 1;
+}
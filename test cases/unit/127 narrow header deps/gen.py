@@ -0,0 +1,9 @@
+#!/usr/bin/env python3
+
+# Generates a header defining a macro
+
+import sys
+
+name, value, output = sys.argv[1:]
+with open(output, 'w') as f:
+    f.write(f'#define {name} {value}\n')
@@ -0,0 +1,5 @@
+#include "one.h"
+
+int one(void) {
+    return ONE;
+}
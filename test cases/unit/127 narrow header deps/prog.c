@@ -0,0 +1,8 @@
+#include "two.h"
+
+int one(void);
+int plain(void);
+
+int main(void) {
+    return one() + plain() == TWO ? 0 : 1;
+}
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 The Meson development team
+
+'''Microbenchmarks for CompilerArgs.
+
+Builds compile and link command lines the way the Ninja backend does, with
+argument mixes typical of GCC and MSVC, and prints the time per command
+line. Run it before and after changing mesonbuild/arglist.py:
+
+    ./tools/arglist_benchmark.py --include-dirs 1000
+'''
+
+import argparse
+import sys
+import timeit
+import typing as T
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mesonbuild.compilers.c import GnuCCompiler, VisualStudioCCompiler
+from mesonbuild.envconfig import MachineInfo
+from mesonbuild.linkers import linkers
+from mesonbuild.mesonlib import MachineChoice
+
+if T.TYPE_CHECKING:
+    from mesonbuild.compilers import Compiler
+
+class BenchmarkGnuCCompiler(GnuCCompiler):
+
+    def get_default_include_dirs(self) -> T.List[str]:
+        # Do not run the compiler to find them
+        return ['/usr/include', '/usr/local/include']
+
+def make_gcc() -> 'Compiler':
+    info = MachineInfo('linux', 'x86_64', 'x86_64', 'little', 'linux', None)
+    linker = linkers.GnuBFDDynamicLinker([], MachineChoice.HOST, '-Wl,', [])
+    return BenchmarkGnuCCompiler([], ['gcc'], '14.0.0', MachineChoice.HOST, False, info, linker=linker)
+
+def make_msvc() -> 'Compiler':
+    info = MachineInfo('windows', 'x86_64', 'x86_64', 'little', 'nt', None)
+    linker = linkers.MSVCDynamicLinker(MachineChoice.HOST, [])
+    return VisualStudioCCompiler([], ['cl'], '19.40', MachineChoice.HOST, False, info, 'x64', linker=linker)
+
+def target_args(n: int) -> T.List[str]:
+    '''Include dirs and defines of a target, in the order the backend adds them.'''
+    args = ['-fvisibility=hidden', '-Wall', '-Winvalid-pch', '-O2', '-g']
+    for i in range(n):
+        args += [f'-Isubprojects/dep{i}/include', f'-I../subprojects/dep{i}/include']
+        if i % 4 == 0:
+            args += ['-isystem', f'/opt/dep{i}/include']
+        if i % 2 == 0:
+            args += [f'-DHAVE_DEP{i}=1']
+    # Dependencies share some include dirs and defines
+    args += [f'-I../subprojects/dep{i}/include' for i in range(0, n, 3)]
+    args += ['-D_FILE_OFFSET_BITS=64', '-pthread', '-Ilib.p', '-Ilib', '-I../lib']
+    return args
+
+def compile_command(cc: 'Compiler', base: T.List[str], targs: T.List[str]) -> T.List[str]:
+    # Mirrors NinjaBackend.generate_single_compile
+    commands = cc.compiler_args()
+    commands += base
+    commands += targs
+    commands += ['-DSOURCE_SPECIFIC', '-Ifoo.p']
+    commands = cc.compiler_args(commands)
+    commands += cc.get_compile_only_args()
+    return commands.to_native()
+
+def link_command(cc: 'Compiler', n: int) -> T.List[str]:
+    # Mirrors NinjaBackend.generate_link
+    commands = cc.compiler_args()
+    commands += ['-Wl,--as-needed', '-Wl,--no-undefined', '-O2']
+    for i in range(n):
+        commands += [f'-Lsubprojects/dep{i}', f'subprojects/dep{i}/libdep{i}.a']
+    commands.extend_direct([f'-ldep{i}' for i in range(n)])
+    commands += ['-lm', '-lpthread', '-lm', '-ldl', '-pthread']
+    return commands.to_native(copy=True)
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--include-dirs', type=int, default=200,
+                        help='Number of include directories per target (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Number of timing runs, the best one is reported (default: %(default)s)')
+    parser.add_argument('--number', type=int, default=100,
+                        help='Number of command lines built per timing run (default: %(default)s)')
+    options = parser.parse_args()
+
+    n = options.include_dirs
+    gcc = make_gcc()
+    msvc = make_msvc()
+    targs = target_args(n)
+    benchmarks: T.Dict[str, T.Callable[[], T.List[str]]] = {
+        'gcc compile': lambda: compile_command(gcc, gcc.get_always_args(), targs),
+        'gcc link': lambda: link_command(gcc, n),
+        'msvc compile': lambda: compile_command(msvc, msvc.get_always_args(), targs),
+        'msvc link': lambda: link_command(msvc, n),
+    }
+    for name, func in benchmarks.items():
+        best = min(timeit.repeat(func, repeat=options.repeat, number=options.number))
+        print(f'{name:<16}{best / options.number * 1e6:10.1f} µs/command  ({len(func())} args)')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
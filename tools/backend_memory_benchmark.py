@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 The Meson development team
+
+'''Memory benchmark of the Ninja backend.
+
+Configures a synthetic project in-process and reports how much memory
+NinjaBackend.generate() allocates on top of what the interpreter already
+holds, as seen by tracemalloc. Run it before and after changing
+mesonbuild/backend/ninjabackend.py:
+
+    ./tools/backend_memory_benchmark.py --targets 2000 --sources 10
+
+The peak can only be measured from the start of generation with Python 3.9
+or newer. With older versions it also includes what was allocated while
+interpreting the project, so only compare results of the same Python.
+'''
+
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+import typing as T
+from pathlib import Path
+
+root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root))
+
+from mesonbuild import mesonmain, mlog
+from mesonbuild.backend import ninjabackend
+
+def write_project(srcdir: Path, targets: int, sources: int, include_dirs: int) -> None:
+    for i in range(include_dirs):
+        (srcdir / 'include' / f'dir{i}').mkdir(parents=True)
+    for i in range(sources):
+        (srcdir / f'src{i}.c').write_text(f'int func{i}(void) {{ return {i}; }}\n', encoding='utf-8')
+    (srcdir / 'main.c').write_text('int main(void) { return 0; }\n', encoding='utf-8')
+    (srcdir / 'meson.build').write_text(f'''\
+project('memory-benchmark', 'c')
+incdirs = []
+foreach i : range({include_dirs})
+  incdirs += include_directories('include/dir@0@'.format(i))
+endforeach
+srcs = []
+foreach i : range({sources})
+  srcs += 'src@0@.c'.format(i)
+endforeach
+foreach i : range({targets})
+  lib = static_library('lib@0@'.format(i), srcs,
+                       include_directories : incdirs,
+                       c_args : ['-DTARGET=@0@'.format(i)])
+  executable('exe@0@'.format(i), 'main.c', link_with : lib)
+endforeach
+''', encoding='utf-8')
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--targets', type=int, default=1000,
+                        help='Number of library/executable pairs (default: %(default)s)')
+    parser.add_argument('--sources', type=int, default=10,
+                        help='Number of sources per library (default: %(default)s)')
+    parser.add_argument('--include-dirs', type=int, default=20,
+                        help='Number of include directories per library (default: %(default)s)')
+    parser.add_argument('--top', type=int, default=0,
+                        help='Show the lines that allocated the most memory during generation')
+    options = parser.parse_args()
+
+    results: T.Dict[str, T.Any] = {}
+    generate = ninjabackend.NinjaBackend.generate
+
+    def traced_generate(self: ninjabackend.NinjaBackend, *args: T.Any, **kwargs: T.Any) -> T.Any:
+        before = tracemalloc.get_traced_memory()[0]
+        if sys.version_info >= (3, 9):
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            return generate(self, *args, **kwargs)
+        finally:
+            results['time'] = time.perf_counter() - start
+            results['before'] = before
+            results['peak'] = tracemalloc.get_traced_memory()[1]
+            if options.top:
+                results['snapshot'] = tracemalloc.take_snapshot()
+
+    ninjabackend.NinjaBackend.generate = traced_generate  # type: ignore[method-assign]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        srcdir = Path(tmpdir, 'src')
+        srcdir.mkdir()
+        write_project(srcdir, options.targets, options.sources, options.include_dirs)
+        tracemalloc.start()
+        with mlog.no_logging():
+            returncode = mesonmain.run(['setup', str(Path(tmpdir, 'build')), str(srcdir)], str(root / 'meson.py'))
+        tracemalloc.stop()
+    if returncode != 0 or 'peak' not in results:
+        print('Configuring the benchmark project failed', file=sys.stderr)
+        return 1
+
+    mib = 1024 * 1024
+    print(f'memory before generation  {results["before"] / mib:8.1f} MiB')
+    print(f'peak during generation    {results["peak"] / mib:8.1f} MiB')
+    print(f'allocated by generation   {(results["peak"] - results["before"]) / mib:8.1f} MiB')
+    print(f'generation time (traced)  {results["time"]:8.1f} s')
+    if options.top:
+        for stat in results['snapshot'].statistics('lineno')[:options.top]:
+            print(f'{stat.size / mib:8.1f} MiB {stat.count:9d}  {stat.traceback[0].filename}:{stat.traceback[0].lineno}')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
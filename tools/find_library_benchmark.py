@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2024 The Meson development team
+
+'''Benchmark for the manual library search of find_library().
+
+Creates library search directories with many unrelated files, looks up
+libraries in them the way CLikeCompiler._find_library_real does, and prints
+the number of filesystem calls and the time per lookup. The "probe" mode
+checks every naming pattern with a stat, like Meson did before library
+directories were indexed, and "cached" repeats the lookups once the
+directories are listed:
+
+    ./tools/find_library_benchmark.py --dirs 20 --files 2000
+'''
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import typing as T
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mesonbuild.compilers.c import CCompiler
+
+# As get_library_naming() returns them on Linux for LibType.PREFER_SHARED
+PATTERNS = ('lib{}.so', '{}.so', 'lib{}.a', '{}.a')
+
+def make_dirs(root: str, ndirs: int, nfiles: int) -> T.List[str]:
+    dirs = []
+    for i in range(ndirs):
+        d = os.path.join(root, f'lib{i}')
+        os.mkdir(d)
+        for j in range(nfiles):
+            Path(d, f'libother{j}.so.{j % 7}').touch()
+        dirs.append(d)
+    # The libraries looked up are in the last directory searched
+    for i in range(10):
+        Path(dirs[-1], f'libwanted{i}.so').touch()
+    return dirs
+
+def find_probe(libname: str, dirs: T.List[str]) -> T.Optional[Path]:
+    for d in dirs:
+        for p in PATTERNS:
+            trial = Path(d) / p.format(libname)
+            if trial.is_file():
+                return trial
+    return None
+
+def find_index(libname: str, dirs: T.List[str]) -> T.Optional[Path]:
+    # Mirrors CLikeCompiler._find_library_real
+    for d in dirs:
+        contents = CCompiler._get_library_dir_contents(d)
+        for p in PATTERNS:
+            trials = CCompiler._get_trials_from_pattern(p, d, libname, contents)
+            for trial in trials:
+                if trial.is_file():
+                    return trial
+    return None
+
+def run(func: T.Callable[[str, T.List[str]], T.Optional[Path]], dirs: T.List[str],
+        names: T.List[str]) -> T.Tuple[float, T.Dict[str, int]]:
+    calls = {'stat': 0, 'scandir': 0}
+    real_stat = os.stat
+    real_scandir = os.scandir
+
+    def stat(*args: T.Any, **kwargs: T.Any) -> os.stat_result:
+        calls['stat'] += 1
+        return real_stat(*args, **kwargs)
+
+    def scandir(*args: T.Any, **kwargs: T.Any) -> T.Any:
+        calls['scandir'] += 1
+        return real_scandir(*args, **kwargs)
+
+    with mock.patch.object(os, 'stat', stat), mock.patch.object(os, 'scandir', scandir):
+        start = time.perf_counter()
+        for name in names:
+            assert func(name, dirs) is not None
+        elapsed = time.perf_counter() - start
+    return elapsed, calls
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dirs', type=int, default=20,
+                        help='Number of library search directories (default: %(default)s)')
+    parser.add_argument('--files', type=int, default=2000,
+                        help='Number of unrelated files per directory (default: %(default)s)')
+    parser.add_argument('--lookups', type=int, default=50,
+                        help='Number of find_library() lookups (default: %(default)s)')
+    options = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='meson-find-library-')
+    try:
+        dirs = make_dirs(root, options.dirs, options.files)
+        names = [f'wanted{i % 10}' for i in range(options.lookups)]
+        CCompiler.library_dir_cache.clear()
+        # The second index run reuses the directory listings of the first one
+        for mode, func in (('probe', find_probe), ('index', find_index), ('cached', find_index)):
+            elapsed, calls = run(func, dirs, names)
+            print(f'{mode:<8}{elapsed / options.lookups * 1e6:10.1f} µs/lookup  '
+                  f'{calls["stat"]:6} stat  {calls["scandir"]:4} scandir')
+    finally:
+        shutil.rmtree(root)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -42,7 +42,7 @@ from mesonbuild.compilers.mixins.intel import IntelGnuLikeCompiler
 from mesonbuild.compilers.c import VisualStudioCCompiler, ClangClCCompiler
 from mesonbuild.compilers.cpp import VisualStudioCPPCompiler, ClangClCPPCompiler
 from mesonbuild.compilers import (
-    detect_static_linker, detect_c_compiler, compiler_from_language,
+    detect_static_linker, detect_c_compiler, detect_cpp_compiler, compiler_from_language,
     detect_compiler_for
 )
 from mesonbuild.linkers import linkers
@@ -50,6 +50,7 @@ from mesonbuild.linkers import linkers
 from mesonbuild.dependencies.pkgconfig import PkgConfigDependency
 from mesonbuild.build import Target, ConfigurationData, Executable, SharedLibrary, StaticLibrary
 from mesonbuild import mtest
+from mesonbuild.backend import ninjabackend, ninjalog
 import mesonbuild.modules.pkgconfig
 from mesonbuild.scripts import destdir_join
 
@@ -125,6 +126,295 @@ class AllPlatformTests(BasePlatformTests):
             raise self.fail('Did not find option "prefix"')
         self.assertEqual(prefix, '/absoluteprefix')
 
+    def test_backend_low_memory(self):
+        '''
+        Writing build statements to a temporary file as they are generated
+        must give the same build.ninja as keeping them in memory.
+        '''
+        if self.backend is not Backend.ninja:
+            raise SkipTest(f'{self.backend.name!r} backend does not write build.ninja')
+        testdir = os.path.join(self.common_test_dir, '5 linkstatic')
+        contents = []
+        for low_memory in ('false', 'true'):
+            self.init(testdir, extra_args=[f'-Dbackend_low_memory={low_memory}'])
+            with open(os.path.join(self.builddir, 'build.ninja'), encoding='utf-8') as f:
+                contents.append(f.read())
+            self.wipe()
+        self.assertEqual(contents[0], contents[1])
+
+    def test_deferred_cleanup(self):
+        '''
+        With backend_deferred_cleanup, .ninja_log is restated by Meson and
+        stale outputs are only removed by the next `meson compile`.
+        '''
+        if self.backend is not Backend.ninja:
+            raise SkipTest(f'{self.backend.name!r} backend does not run ninja tools')
+        if is_windows():
+            raise SkipTest('.ninja_log is only restated natively on POSIX')
+        testdir = os.path.join(self.common_test_dir, '1 trivial')
+        self.init(testdir, extra_args=['-Dbackend_deferred_cleanup=true'])
+        self.build()
+        logfile = os.path.join(self.builddir, '.ninja_log')
+        stamp = os.path.join(self.builddir, ninjalog.CLEANDEAD_STAMP)
+        stale = os.path.join(self.builddir, 'stale.txt')
+        Path(stale).touch()
+        with open(logfile, 'a', encoding='utf-8') as f:
+            f.write('0\t1\t1\tstale.txt\t0\n')
+        os.utime(os.path.join(self.builddir, 'trivialprog' + exe_suffix), ns=(0, 10 ** 9))
+
+        def read_mtimes() -> T.Dict[str, str]:
+            with open(logfile, encoding='utf-8') as f:
+                return {l[3]: l[2] for l in (line.split('\t') for line in f.readlines()[1:])}
+
+        shutil.copy(logfile, logfile + '.orig')
+        self.assertTrue(ninjalog.restat_ninja_log(self.builddir))
+        mtimes = read_mtimes()
+        shutil.copy(logfile + '.orig', logfile)
+        subprocess.check_call(self.build_command + ['-t', 'restat'], cwd=self.builddir)
+        self.assertEqual(mtimes, read_mtimes())
+
+        shutil.copy(logfile + '.orig', logfile)
+        self.init(testdir, extra_args=['--reconfigure'])
+        self.assertEqual(mtimes, read_mtimes())
+        self.assertPathExists(stamp)
+        self.assertPathExists(stale)
+        self._run(self.meson_command + ['compile', '-C', self.builddir])
+        self.assertPathDoesNotExist(stamp)
+        self.assertPathDoesNotExist(stale)
+
+    def test_shared_compile_args(self):
+        '''
+        The compile arguments of a target are written to build.ninja once and
+        shared by the build statements of its sources.
+        '''
+        if self.backend is not Backend.ninja:
+            raise SkipTest(f'{self.backend.name!r} backend does not write build.ninja')
+        testdir = os.path.join(self.common_test_dir, '5 linkstatic')
+        self.init(testdir)
+        with open(os.path.join(self.builddir, 'build.ninja'), encoding='utf-8') as f:
+            contents = f.read()
+        variables = re.findall(r'^(ARGS_\w+) = ', contents, re.MULTILINE)
+        # A target with a single source gets a variable too, so that
+        # build.ninja does not depend on the order of the targets
+        self.assertEqual(len(variables), 2)
+        mylib = [v for v in variables if 'mylib' in v]
+        self.assertEqual(len(mylib), 1)
+        self.assertEqual(len(re.findall(rf'^ ARGS = \${mylib[0]}\b', contents, re.MULTILINE)), 4)
+        self.build()
+        self.run_tests()
+
+    def test_compdb(self):
+        '''
+        The compilation database is written by Meson itself, it must match
+        the one of `ninja -t compdb`, with and without response files.
+        '''
+        if self.backend is not Backend.ninja:
+            raise SkipTest(f'{self.backend.name!r} backend does not write a compilation database')
+        testdir = os.path.join(self.common_test_dir, '13 pch')
+        for rsp_threshold in (0, ninjabackend.rsp_threshold):
+            with mock.patch.object(ninjabackend, 'rsp_threshold', rsp_threshold):
+                self.init(testdir, extra_args=['-Dbackend_compdb_fragments=true'], inprocess=True)
+            with open(os.path.join(self.builddir, 'build.ninja'), encoding='utf-8') as f:
+                rules = re.findall(r'^rule (\w+_(?:COMPILER|PCH)\w*)$', f.read(), re.MULTILINE)
+            with open(os.path.join(self.builddir, 'compile_commands.json'), encoding='utf-8') as f:
+                compdb = f.read()
+            ninja_compdb = subprocess.check_output(self.build_command + ['-t', 'compdb', '-x'] + rules,
+                                                   cwd=self.builddir, encoding='utf-8')
+            self.assertEqual(json.loads(compdb), json.loads(ninja_compdb))
+
+            # Each target also has a database of its own
+            fragment = os.path.join(self.builddir, 'c', 'prog.p', 'compile_commands.json')
+            with open(fragment, encoding='utf-8') as f:
+                entries = json.load(f)
+            self.assertEqual({e['output'] for e in entries},
+                             {e['output'] for e in json.loads(compdb) if e['output'].startswith('c/prog.p/')})
+            self.wipe()
+
+    def test_unity_grouping_cost(self):
+        '''
+        Unity files are balanced by the estimated cost of their sources, and
+        by how long they took to build once there is a build history.
+        '''
+        if self.backend is not Backend.ninja:
+            raise SkipTest(f'{self.backend.name!r} backend does not record a build history')
+        testdir = os.path.join(self.unit_test_dir, '123 unity grouping')
+
+        def get_unity_files():
+            with open(os.path.join(self.builddir, 'compile_commands.json'), encoding='utf-8') as f:
+                compdb = json.load(f)
+            unity_files = {}
+            for entry in compdb:
+                with open(os.path.join(entry['directory'], entry['file']), encoding='utf-8') as f:
+                    unity_files[entry['output']] = {os.path.basename(l.strip()[len('#include<'):-1]) for l in f}
+            return unity_files
+
+        self.init(testdir)
+        unity_files = get_unity_files()
+        self.assertEqual(len(unity_files), 3)
+        self.assertIn({'big.c'}, unity_files.values())
+        self.build()
+
+        # Pretend that the unity file with the most sources was by far the slowest
+        slowest = max(unity_files, key=lambda o: len(unity_files[o]))
+        with open(os.path.join(self.builddir, '.ninja_log'), 'w', encoding='utf-8') as f:
+            f.write('# ninja log v5\n')
+            for output in unity_files:
+                f.write(f'0\t{3000 if output == slowest else 10}\t1\t{output}\t0\n')
+        self.init(testdir, extra_args=['--reconfigure'])
+        new_unity_files = get_unity_files()
+        self.assertEqual(len(new_unity_files), 3)
+        for sources in new_unity_files.values():
+            self.assertEqual(len(sources & unity_files[slowest]), 1)
+        self.build()
+
+    def test_ninja_pools(self):
+        '''
+        Custom targets and generators can be put in pools, and the depth of
+        the link pools can be derived from the memory of the machine.
+        '''
+        if self.backend is not Backend.ninja:
+            raise SkipTest(f'{self.backend.name!r} backend does not have pools')
+        testdir = os.path.join(self.unit_test_dir, '124 pools')
+        # Both executables link two objects
+        link_memory = ninjabackend.LINK_BASE_MEMORY + 2 * ninjabackend.LINK_OBJECT_MEMORY
+        lto_link_memory = link_memory * ninjabackend.LTO_LINK_MEMORY_FACTOR
+        # Limited by the memory, which the pools share, then by the CPUs
+        for memory, cpus in [(8 * 1024 ** 3, 64), (64 * 1024 ** 3, 4)]:
+            self.new_builddir()
+            with mock.patch.object(ninjabackend, 'get_physical_memory', return_value=memory), \
+                    mock.patch('os.cpu_count', return_value=cpus):
+                self.init(testdir, extra_args=['-Dbackend_max_links=auto', '-Dbackend_pools=codegen=3'],
+                          inprocess=True)
+            with open(os.path.join(self.builddir, 'build.ninja'), encoding='utf-8') as f:
+                contents = f.read()
+            pools = dict(re.findall(r'^pool (\S+)\n  depth = (\d+)$', contents, re.MULTILINE))
+            total = link_memory + lto_link_memory
+            self.assertEqual(pools, {
+                'link_pool': str(min(memory * link_memory // total // link_memory, cpus)),
+                'lto_link_pool': str(min(memory * lto_link_memory // total // lto_link_memory, cpus)),
+                'codegen': '3',
+                'heavy': '1',
+            })
+        self.assertEqual(pools['link_pool'], '4')
+
+        # Without knowing the memory, one target per CPU is linked at a time
+        self.new_builddir()
+        with mock.patch.object(ninjabackend, 'get_physical_memory', return_value=None), \
+                mock.patch('os.cpu_count', return_value=3):
+            self.init(testdir, extra_args=['-Dbackend_max_links=auto', '-Dbackend_pools=codegen=3'],
+                      inprocess=True)
+        with open(os.path.join(self.builddir, 'build.ninja'), encoding='utf-8') as f:
+            contents = f.read()
+        pools = dict(re.findall(r'^pool (\S+)\n  depth = (\d+)$', contents, re.MULTILINE))
+        self.assertEqual(pools, {'link_pool': '3', 'lto_link_pool': '3', 'codegen': '3', 'heavy': '1'})
+        self.assertRegex(contents, r'build codegen.h: .*\n pool = codegen\n')
+        self.assertEqual(len(re.findall(r'^build \S+/lib.c: .*\n pool = heavy$', contents, re.MULTILINE)), 2)
+        self.assertRegex(contents, r'build prog-lto\S*: c_LINKER .*\n LINK_ARGS = .*\n pool = lto_link_pool\n')
+        self.build()
+
+        self.setconf('-Dbackend_max_links=2')
+        self.build()
+        with open(os.path.join(self.builddir, 'build.ninja'), encoding='utf-8') as f:
+            contents = f.read()
+        pools = dict(re.findall(r'^pool (\S+)\n  depth = (\d+)$', contents, re.MULTILINE))
+        self.assertEqual(pools, {'link_pool': '2', 'codegen': '3', 'heavy': '1'})
+
+    def test_generator_batch_size(self):
+        '''
+        A generator with batch_size processes several inputs per command,
+        with a single depfile for all the outputs of the batch.
+        '''
+        if self.backend is not Backend.ninja:
+            raise SkipTest(f'{self.backend.name!r} backend does not batch generators')
+        testdir = os.path.join(self.unit_test_dir, '125 generator batch')
+        self.init(testdir)
+        with open(os.path.join(self.builddir, 'build.ninja'), encoding='utf-8') as f:
+            contents = f.read()
+        edges = re.findall(r'^build (.*?): CUSTOM_COMMAND_DEP ', contents, re.MULTILINE)
+        self.assertEqual(edges, ['prog.p/one.c prog.p/two.c', 'prog.p/three.c'])
+        self.build()
+        self.run_tests()
+        deps = subprocess.check_output(self.build_command + ['-t', 'deps', 'prog.p/two.c'],
+                                       cwd=self.builddir, encoding='utf-8')
+        self.assertIn('value.txt', deps)
+        self.assertBuildIsNoop()
+
+    def test_auto_pch(self):
+        '''
+        With backend_auto_pch, the external headers that most sources of a
+        target included in the previous build get precompiled.
+        '''
+        if self.backend is not Backend.ninja:
+            raise SkipTest(f'{self.backend.name!r} backend does not select precompiled headers')
+        testdir = os.path.join(self.unit_test_dir, '126 auto pch')
+        env = get_fake_env(testdir, self.builddir, self.prefix)
+        cpp = detect_cpp_compiler(env, MachineChoice.HOST)
+        if cpp.get_id() not in {'gcc', 'clang'}:
+            raise SkipTest('Automatic precompiled headers require GCC or Clang')
+        self.init(testdir, extra_args=['-Dbackend_auto_pch=true'])
+        header = os.path.join(self.builddir, 'prog.p', 'meson_auto_pch-cpp.h')
+        # Nothing is known before the first build
+        self.assertPathDoesNotExist(header)
+        self.build()
+
+        out = self.init(testdir, extra_args=['--reconfigure'])
+        self.assertIn('Precompiling 2 C++ headers for target prog', out)
+        with open(header, encoding='utf-8') as f:
+            includes = re.findall(r'^#include <(.*)>$', f.read(), re.MULTILINE)
+        # common.h is part of the project, and prog.cpp includes string
+        # after config.h, which is too
+        self.assertEqual(sorted(includes), ['map', 'vector'])
+        with open(os.path.join(self.builddir, 'build.ninja'), encoding='utf-8') as f:
+            contents = f.read()
+        self.assertIn('build prog.p/meson_auto_pch-cpp.h.gch: cpp_PCH prog.p/meson_auto_pch-cpp.h', contents)
+        self.build()
+        self.run_tests()
+
+        # The headers are still selected when the previous build used them
+        out = self.init(testdir, extra_args=['--reconfigure'])
+        self.assertIn('Precompiling 2 C++ headers for target prog', out)
+        self.assertBuildIsNoop()
+
+    def test_narrow_header_deps(self):
+        '''
+        With backend_narrow_header_deps, sources only wait for the generated
+        headers that they included in the previous build.
+        '''
+        if self.backend is not Backend.ninja:
+            raise SkipTest(f'{self.backend.name!r} backend does not narrow header dependencies')
+        testdir = os.path.join(self.unit_test_dir, '127 narrow header deps')
+
+        def get_order_deps() -> T.Dict[str, str]:
+            with open(os.path.join(self.builddir, 'build.ninja'), encoding='utf-8') as f:
+                contents = f.read()
+            edges = re.findall(r'^build (prog\.p/\w+\.c\.o): c_COMPILER [^|\n]*(?:\|\| (.*))?$', contents, re.MULTILINE)
+            return dict(edges)
+
+        self.init(testdir, extra_args=['-Dbackend_narrow_header_deps=true'])
+        # Nothing is known before the first build
+        self.assertEqual(get_order_deps(), {
+            'prog.p/prog.c.o': 'one.h two.h',
+            'prog.p/one.c.o': 'one.h two.h',
+            'prog.p/plain.c.o': 'one.h two.h',
+        })
+        self.build()
+
+        self.init(testdir, extra_args=['--reconfigure'])
+        self.assertEqual(get_order_deps(), {
+            'prog.p/prog.c.o': 'two.h',
+            'prog.p/one.c.o': 'one.h',
+            'prog.p/plain.c.o': '',
+        })
+        self.assertBuildIsNoop()
+        self.run_tests()
+
+        # Headers that do not exist yet are waited for
+        os.unlink(os.path.join(self.builddir, 'two.h'))
+        self.init(testdir, extra_args=['--reconfigure'])
+        self.assertEqual(get_order_deps()['prog.p/one.c.o'], 'one.h two.h')
+        self.build()
+        self.run_tests()
+
     def test_do_conf_file_preserve_newlines(self):
 
         def conf_file(in_data, confdata):
@@ -1291,6 +1581,30 @@ class AllPlatformTests(BasePlatformTests):
         self.utime(os.path.join(testdir, 'libfile.c'))
         self.assertBuildRelinkedOnlyTarget('mylib')
 
+    def test_noop_changes_keep_build_ninja(self):
+        '''
+        Test that regenerating an unchanged build.ninja does not replace it,
+        and that this does not cause another regeneration.
+        '''
+        if self.backend is not Backend.ninja:
+            raise SkipTest(f'{self.backend.name!r} backend does not write build.ninja')
+        testdir = os.path.join(self.common_test_dir, '6 linkshared')
+        self.init(testdir)
+        self.build()
+        # Ninja only has a record of build.ninja once it regenerated it
+        self.utime(os.path.join(testdir, 'meson.build'))
+        self.assertReconfiguredBuildIsNoop()
+        build_ninja = os.path.join(self.builddir, 'build.ninja')
+        mtime = os.stat(build_ninja).st_mtime_ns
+        self.utime(os.path.join(testdir, 'meson.build'))
+        self.assertReconfiguredBuildIsNoop()
+        self.assertEqual(os.stat(build_ninja).st_mtime_ns, mtime)
+        self.assertBuildIsNoop()
+        # Likewise when reconfiguring without Ninja
+        self.init(testdir, extra_args=['--reconfigure'])
+        self.assertEqual(os.stat(build_ninja).st_mtime_ns, mtime)
+        self.assertBuildIsNoop()
+
     def test_source_changes_cause_rebuild(self):
         '''
         Test that changes to sources and headers cause rebuilds, but not
@@ -3853,6 +4167,31 @@ class AllPlatformTests(BasePlatformTests):
             self._run([*self.meson_command, 'compile', '-C', self.builddir, '--vs-args=-t:{}:Clean'.format(re.sub(r'[\%\$\@\;\.\(\)\']', '_', get_exe_name('trivialprog')))])
             self.assertPathDoesNotExist(os.path.join(self.builddir, get_exe_name('trivialprog')))
 
+    def test_meson_compile_analyze(self):
+        if self.backend is not Backend.ninja:
+            raise SkipTest(f'{self.backend.name!r} backend does not support `--analyze`')
+        testdir = os.path.join(self.common_test_dir, '5 linkstatic')
+        self.init(testdir)
+        out = self._run([*self.meson_command, 'compile', '-C', self.builddir, '--analyze'])
+        self.assertIn('Critical path', out)
+        with open(os.path.join(self.builddir, 'meson-logs', 'build-analysis.json'), encoding='utf-8') as f:
+            data = json.load(f)
+        # The program is linked last, after the library it links with
+        critical = data['critical_path']['steps']
+        self.assertEqual(critical[-1]['kind'], 'link')
+        self.assertEqual(critical[-1]['target'], 'prog@exe')
+        self.assertEqual(critical[0]['kind'], 'compile')
+        self.assertLessEqual(data['critical_path']['time'], data['wall_time'])
+        self.assertEqual({t['id'] for t in data['targets']}, {'prog@exe', 'mylib@sta'})
+        self.assertEqual(sorted(s['source'] for s in data['sources']),
+                         ['libfile.c', 'libfile2.c', 'libfile3.c', 'libfile4.c', 'main.c'])
+        self.assertEqual(len(data['parallelism']), 20)
+
+        # Nothing to do, the previous build is analyzed again
+        out = self._run([*self.meson_command, 'compile', '-C', self.builddir, '--analyze'])
+        with open(os.path.join(self.builddir, 'meson-logs', 'build-analysis.json'), encoding='utf-8') as f:
+            self.assertEqual(json.load(f), data)
+
     def test_spurious_reconfigure_built_dep_file(self):
         testdir = os.path.join(self.unit_test_dir, '73 dep files')
 
@@ -4890,6 +5229,25 @@ class AllPlatformTests(BasePlatformTests):
         self.assertEqual(cm.exception.returncode, 1)
         self.assertIn('exit status 39', cm.exception.stdout)
 
+    @skip_if_not_language('rust')
+    def test_rust_pipelining(self) -> None:
+        if self.backend is not Backend.ninja:
+            raise unittest.SkipTest('Rust is only supported with ninja currently')
+        testdir = os.path.join(self.rust_test_dir, '3 staticlib')
+        self.init(testdir, extra_args=['-Dbackend_rust_pipelining=true'])
+        with open(os.path.join(self.builddir, 'build.ninja'), encoding='utf-8') as f:
+            contents = f.read()
+        self.assertRegex(contents, r'build libother\.rlib\.p/libother\.rmeta: rust_METADATA ')
+        self.assertRegex(contents, r'build libother\.rlib: rust_PIPELINED ')
+        # rlibs only wait for the metadata of the rlibs they use
+        self.assertRegex(contents, r'build libstuff\.rlib\.p/libstuff\.rmeta: rust_METADATA [^\n]* \| libother\.rlib\.p/libother\.rmeta')
+        self.assertIn('--extern other=libother.rlib.p/libother.rmeta', contents)
+        # Executables need the code
+        self.assertRegex(contents, r'build prog: rust_COMPILER [^\n]* \| libstuff\.rlib')
+        self.assertIn('--extern stuff=libstuff.rlib', contents)
+        self.build()
+        self.run_tests()
+
     @skip_if_not_language('rust')
     def test_bindgen_drops_invalid(self) -> None:
         if self.backend is not Backend.ninja:
@@ -5,6 +5,7 @@ from configparser import ConfigParser
 from pathlib import Path
 from unittest import mock
 import contextlib
+import functools
 import io
 import json
 import operator
@@ -12,13 +13,17 @@ import os
 import pickle
 import stat
 import subprocess
+import sys
 import tempfile
+import textwrap
+import time
 import typing as T
 import unittest
 
 import mesonbuild.mlog
 import mesonbuild.depfile
 import mesonbuild.dependencies.base
+import mesonbuild.dependencies.detect
 import mesonbuild.dependencies.factory
 import mesonbuild.envconfig
 import mesonbuild.environment
@@ -33,11 +38,13 @@ from mesonbuild.interpreterbase import typed_pos_args, InvalidArguments, typed_k
 from mesonbuild.mesonlib import (
     LibType, MachineChoice, PerMachine, Version, is_windows, is_osx,
     is_cygwin, is_openbsd, search_version, MesonException, OptionKey,
-    OptionType
+    OptionType, map_chunks_in_processes
 )
 from mesonbuild.interpreter.type_checking import in_set_validator, NoneType
+from mesonbuild.dependencies.configtool import ConfigToolDependency
 from mesonbuild.dependencies.pkgconfig import PkgConfigDependency, PkgConfigInterface, PkgConfigCLI
-from mesonbuild.programs import ExternalProgram
+from mesonbuild.dependencies.python import BasicPythonExternalProgram
+from mesonbuild.programs import ExternalProgram, PathDirIndex
 import mesonbuild.modules.pkgconfig
 
 
@@ -194,6 +201,10 @@ class InternalTests(unittest.TestCase):
         # Adding the same library again does nothing
         l += ['-lbar']
         self.assertEqual(l, ['-Lbardir', '-Lfoodir', '-lfoo', '-lbar'])
+        # Unless it was removed in the meantime
+        l.remove('-lbar')
+        l += ['-lbar']
+        self.assertEqual(l, ['-Lbardir', '-Lfoodir', '-lfoo', '-lbar'])
 
         ## Test that 'direct' append and extend works
         l = cc.compiler_args(['-Lfoodir', '-lfoo'])
@@ -556,6 +567,31 @@ class InternalTests(unittest.TestCase):
             found = cc._find_library_real('bar', env, [tmpdir], '', LibType.PREFER_SHARED, lib_prefix_warning=True)
             self.assertEqual(os.path.basename(found[0]), 'libbar.so.7.10')
 
+    def test_find_library_dir_index(self):
+        '''
+        find_library() matches naming patterns against a listing of each
+        search directory instead of probing every candidate file
+        '''
+        env = get_fake_env()
+        cc = detect_c_compiler(env, MachineChoice.HOST)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            d1 = Path(tmpdir) / 'd1'
+            d2 = Path(tmpdir) / 'd2'
+            d1.mkdir()
+            d2.mkdir()
+            # Directories are never libraries
+            (d1 / 'libfoo.a').mkdir()
+            (d2 / 'libfoo.a').write_text('', encoding='utf-8')
+            (d2 / 'libbar.a').mkdir()
+            dirs = [str(d1), str(d2)]
+            with mock.patch.object(Path, 'is_file', autospec=True, side_effect=Path.is_file) as is_file:
+                found = cc._find_library_real('foo', env, dirs, '', LibType.STATIC, lib_prefix_warning=True)
+                self.assertEqual(found, [(d2 / 'libfoo.a').as_posix()])
+                self.assertIsNone(cc._find_library_real('bar', env, dirs, '', LibType.STATIC, lib_prefix_warning=True))
+                self.assertIsNone(cc._find_library_real('baz', env, dirs, '', LibType.STATIC, lib_prefix_warning=True))
+                # Only the match is checked on disk
+                self.assertEqual(is_file.call_count, 1)
+
     def test_find_library_patterns(self):
         '''
         Unit test for the library search patterns used by find_library()
@@ -1008,6 +1044,164 @@ class InternalTests(unittest.TestCase):
                 actual = [m() for m in f(env, MachineChoice.HOST, {'required': False})]
                 self.assertListEqual([m.type_name for m in actual], ['cmake', 'pkgconfig'])
 
+    @unittest.skipIf(is_windows(), 'the index is not used on Windows')
+    def test_path_dir_index(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            d1 = Path(tmpdir) / 'd1'
+            d2 = Path(tmpdir) / 'd2'
+            d1.mkdir()
+            d2.mkdir()
+            for f in (d1 / 'notexe', d2 / 'notexe', d2 / 'prog'):
+                f.touch()
+            (d2 / 'prog').chmod(0o755)
+            path = os.pathsep.join([str(d1), str(d2)])
+
+            index = PathDirIndex()
+            self.assertEqual(index.which('prog', path), str(d2 / 'prog'))
+            self.assertIsNone(index.which('notexe', path))
+            self.assertIsNone(index.which('missing', path))
+
+            # A program added later is seen on the next run, and the index
+            # survives being stored in coredata
+            (d1 / 'prog').touch()
+            (d1 / 'prog').chmod(0o755)
+            self.assertEqual(index.which('prog', path), str(d2 / 'prog'))
+            index = pickle.loads(pickle.dumps(index))
+            self.assertEqual(index.which('prog', path), str(d1 / 'prog'))
+
+    def test_library_dir_cache(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            (Path(tmpdir) / 'libfoo.so').touch()
+            self.assertEqual(GnuCCompiler._get_trials_from_pattern('lib{}.so', tmpdir, 'foo'),
+                             [Path(tmpdir, 'libfoo.so')])
+            self.assertEqual(GnuCCompiler._get_trials_from_pattern('lib{}.a', tmpdir, 'foo'), [])
+
+            # A library added later is seen once the directory changed
+            (Path(tmpdir) / 'libfoo.a').touch()
+            os.utime(tmpdir, ns=(0, 0))
+            self.assertEqual(GnuCCompiler._get_trials_from_pattern('lib{}.a', tmpdir, 'foo'),
+                             [Path(tmpdir, 'libfoo.a')])
+
+    def test_speculative_dependency_lookup(self):
+        b = mesonbuild.dependencies.base
+
+        class SlowMissingDependency(b.ExternalDependency):
+            def __init__(self, environment, kwargs):
+                with mesonbuild.mlog.nested('slow'):
+                    mesonbuild.mlog.log('trying slow method')
+                    time.sleep(0.2)
+                    raise b.DependencyException('not found')
+
+            @staticmethod
+            def log_tried():
+                return 'slow'
+
+        class FastDependency(b.ExternalDependency):
+            def __init__(self, environment, kwargs):
+                super().__init__(b.DependencyTypeName('fast'), environment, kwargs)
+                mesonbuild.mlog.log('trying fast method')
+                self.is_found = True
+
+            @staticmethod
+            def log_tried():
+                return 'fast'
+
+        class WarningDependency(b.ExternalDependency):
+            def __init__(self, environment, kwargs):
+                mesonbuild.mlog.warning('never tried')
+                raise b.DependencyException('not found')
+
+        env = get_fake_env()
+        env.coredata.optstore.set_value('dependency_lookup', 'speculative')
+        kwargs = {'required': True}
+        candidates = [functools.partial(SlowMissingDependency, env, kwargs),
+                      functools.partial(FastDependency, env, kwargs),
+                      functools.partial(WarningDependency, env, kwargs)]
+        warnings = mesonbuild.mlog.get_warning_count()
+        with mock.patch('sys.stdout', io.StringIO()) as out:
+            dep = mesonbuild.dependencies.detect.find_external_dependency('foo', env, kwargs, candidates)
+        self.assertIsInstance(dep, FastDependency)
+        # A method that a sequential lookup would not have tried does not warn
+        self.assertEqual(mesonbuild.mlog.get_warning_count(), warnings)
+        self.assertNotIn('never tried', out.getvalue())
+        # The nesting of the slow method is replayed with its output only
+        self.assertEqual(mesonbuild.mlog.get_log_depth(), 0)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], 'slow| trying slow method')
+        self.assertEqual(lines[1], 'trying fast method')
+        self.assertIn('found: YES', lines[2])
+
+    @unittest.skipIf(is_windows(), 'requires a script with a shebang')
+    def test_config_tool_cache(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            calls = Path(tmpdir) / 'calls'
+            tool = Path(tmpdir) / 'foo-config'
+            tool.write_text(textwrap.dedent(f'''\
+                #!{sys.executable}
+                import sys
+                with open({str(calls)!r}, 'a') as f:
+                    f.write(' '.join(sys.argv[1:]) + '\\n')
+                print('-DFOO' if sys.argv[1] == '--cflags' else '1.0')
+                '''), encoding='utf-8')
+            tool.chmod(0o755)
+
+            class FooConfigToolDependency(ConfigToolDependency):
+                tools = [str(tool)]
+                tool_name = 'foo-config'
+
+                def __init__(self, environment, kwargs):
+                    super().__init__('foo', environment, kwargs)
+                    self.compile_args = self.get_config_value(['--cflags'], 'compile_args')
+
+            env = get_fake_env()
+            kwargs = {'required': True, 'silent': True}
+            for _ in range(2):
+                dep = FooConfigToolDependency(env, kwargs)
+                self.assertEqual(dep.get_compile_args(), ['-DFOO'])
+                self.assertEqual(dep.get_version(), '1.0')
+            self.assertEqual(calls.read_text(encoding='utf-8').splitlines(), ['--version', '--cflags'])
+
+            # A modified tool must be run again
+            with tool.open('a', encoding='utf-8') as f:
+                f.write('# changed\n')
+            FooConfigToolDependency(env, kwargs)
+            self.assertEqual(calls.read_text(encoding='utf-8').splitlines(), ['--version', '--cflags'] * 2)
+
+            # So must a tool whose environment changed
+            with mock.patch.dict(os.environ, {'FOO_CONFIG_PREFIX': '/opt/foo'}):
+                FooConfigToolDependency(env, kwargs)
+            self.assertEqual(calls.read_text(encoding='utf-8').splitlines(), ['--version', '--cflags'] * 3)
+
+            # Results are not kept in coredata when the cache is disabled
+            env = get_fake_env()
+            env.coredata.optstore.set_value('config_tool_cache', False)
+            for _ in range(2):
+                FooConfigToolDependency(env, kwargs)
+            self.assertEqual(calls.read_text(encoding='utf-8').splitlines(), ['--version', '--cflags'] * 4)
+            self.assertEqual(env.coredata.config_tool_cache, {})
+
+    def test_python_introspection_cache(self):
+        env = get_fake_env()
+        introspect = BasicPythonExternalProgram._introspect
+        with mock.patch.object(BasicPythonExternalProgram, '_introspect', autospec=True,
+                               side_effect=introspect) as mocked:
+            python = BasicPythonExternalProgram('python3', [sys.executable])
+            self.assertTrue(python.sanity(env))
+            info = python.info
+            python = BasicPythonExternalProgram('python3', [sys.executable])
+            self.assertTrue(python.sanity(env))
+            self.assertEqual(python.info, info)
+            self.assertEqual(mocked.call_count, 1)
+
+            # The environment of the interpreter is part of the key
+            with mock.patch.dict(os.environ, {'_PYTHON_SYSCONFIGDATA_NAME': 'foo'}):
+                python.sanity(env)
+            self.assertEqual(mocked.call_count, 2)
+
+            # Without an environment there is nowhere to store the result
+            python.sanity()
+            self.assertEqual(mocked.call_count, 3)
+
     def test_validate_json(self) -> None:
         """Validate the json schema for the test cases."""
         try:
@@ -1714,3 +1908,165 @@ class InternalTests(unittest.TestCase):
         for raw, expected in cases:
             with self.subTest(raw):
                 self.assertEqual(OptionKey.from_string(raw), expected)
+
+    def test_depscan_cache(self) -> None:
+        from mesonbuild.backend.ninjabackend import TargetDependencyScannerInfo
+        from mesonbuild.scripts import depscan
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            sources = []
+            for i in range(4):
+                fname = os.path.join(tmpdir, f'mod{i}.f90')
+                with open(fname, 'w', encoding='utf-8') as f:
+                    f.write(f'module mod{i}\n' + (f'use mod{i - 1}\n' if i else '') + f'end module mod{i}\n')
+                sources.append((fname, 'fortran'))
+            pickle_file = os.path.join(tmpdir, 'target.dat')
+            with open(pickle_file, 'wb') as f:
+                pickle.dump(TargetDependencyScannerInfo(tmpdir, {s: s + '.o' for s, _ in sources}, sources), f)
+            outfile = os.path.join(tmpdir, 'depscan.dd')
+
+            def scan() -> T.Tuple[str, T.List[str]]:
+                with mock.patch.object(depscan, 'scan_fortran_file', wraps=depscan.scan_fortran_file) as m:
+                    depscan.run([outfile, pickle_file])
+                with open(outfile, encoding='utf-8') as f:
+                    return f.read(), [c.args[0] for c in m.call_args_list]
+
+            dyndep, scanned = scan()
+            self.assertEqual(scanned, [s for s, _ in sources])
+            self.assertIn('mod0.mod', dyndep)
+
+            # Nothing changed, nothing is read again
+            self.assertEqual(scan(), (dyndep, []))
+
+            # Only the file that changed is read again
+            with open(sources[3][0], 'w', encoding='utf-8') as f:
+                f.write('module mod3\nuse mod0\nuse mod1\nend module mod3\n')
+            new_dyndep, scanned = scan()
+            self.assertEqual(scanned, [sources[3][0]])
+            self.assertNotEqual(new_dyndep, dyndep)
+
+            # Scanning in several processes gives the same result
+            os.unlink(outfile + '.cache')
+            with mock.patch.object(depscan, 'PARALLEL_SCAN_THRESHOLD', 1):
+                depscan.run([outfile, pickle_file])
+            with open(outfile, encoding='utf-8') as f:
+                self.assertEqual(f.read(), new_dyndep)
+
+    def test_map_chunks_in_processes(self) -> None:
+        items = list(range(10))
+        self.assertEqual(map_chunks_in_processes(list, items, 3, 1), items)
+        # Sandboxes may not allow worker processes
+        with mock.patch('concurrent.futures.ProcessPoolExecutor', side_effect=PermissionError('denied')) as pool:
+            self.assertEqual(map_chunks_in_processes(list, items, 3, 1), items)
+        pool.assert_called_once()
+        # Frozen executables and start methods that import Meson again do
+        # not even try
+        with mock.patch.object(sys, 'frozen', True, create=True), \
+                mock.patch('concurrent.futures.ProcessPoolExecutor') as pool:
+            self.assertEqual(map_chunks_in_processes(list, items, 3, 1), items)
+        pool.assert_not_called()
+        with mock.patch('multiprocessing.get_start_method', return_value='spawn'), \
+                mock.patch('concurrent.futures.ProcessPoolExecutor') as pool:
+            self.assertEqual(map_chunks_in_processes(list, items, 3, 1), items)
+        pool.assert_not_called()
+
+    def test_fortran_scan_cache(self) -> None:
+        from mesonbuild.backend import ninjabackend
+        from mesonbuild.backend.ninjabackend import FortranStatements, FortranScanCache
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            sources = []
+            for i in range(4):
+                fname = os.path.join(tmpdir, f'mod{i}.f90')
+                with open(fname, 'w', encoding='utf-8') as f:
+                    f.write(f'module mod{i}\n' + (f'use mod{i - 1}\n' if i else '') + f'end module mod{i}\n')
+                sources.append(fname)
+            with open(sources[3], 'a', encoding='utf-8') as f:
+                f.write("submodule (mod3) sub3\ninclude 'inc.f90'\nuse, intrinsic :: iso_c_binding\n")
+            cache_file = os.path.join(tmpdir, 'fortran_scan.dat')
+
+            def scan(parallel: bool = False) -> T.Tuple[T.List[FortranStatements], T.List[str]]:
+                cache = FortranScanCache(cache_file)
+                with mock.patch.object(ninjabackend, 'read_fortran_statements', wraps=ninjabackend.read_fortran_statements) as m:
+                    if parallel:
+                        with mock.patch.object(cache, 'parallel_threshold', 1), \
+                                mock.patch('os.cpu_count', return_value=2):
+                            cache.prescan(sources)
+                    else:
+                        cache.prescan(sources)
+                    results = [cache.get(s) for s in sources]
+                cache.save()
+                return results, [c.args[0] for c in m.call_args_list]
+
+            results, scanned = scan()
+            self.assertEqual(scanned, sources)
+            self.assertEqual(results[0], FortranStatements(['mod0'], [], []))
+            self.assertEqual(results[3], FortranStatements(
+                ['mod3'], ['mod3_sub3'],
+                [('use', 'mod2'), ('submodule', 'mod3', 'sub3'), ('include', 'inc.f90')]))
+
+            # Nothing changed, nothing is read again
+            self.assertEqual(scan(), (results, []))
+
+            # Only the file that changed is read again
+            with open(sources[1], 'w', encoding='utf-8') as f:
+                f.write('module mod1\nuse mod0\nuse mod2\nend module mod1\n')
+            new_results, scanned = scan()
+            self.assertEqual(scanned, [sources[1]])
+            self.assertEqual(new_results[1].statements, [('use', 'mod0'), ('use', 'mod2')])
+
+            # Scanning in several processes gives the same result
+            os.unlink(cache_file)
+            self.assertEqual(scan(parallel=True)[0], new_results)
+
+    def test_scan_top_level_includes(self) -> None:
+        from mesonbuild.backend.ninjabackend import scan_top_level_includes
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fname = os.path.join(tmpdir, 'src.cpp')
+
+            def scan(contents: str) -> T.Optional[T.List[str]]:
+                with open(fname, 'w', encoding='utf-8') as f:
+                    f.write(textwrap.dedent(contents))
+                return scan_top_level_includes(fname)
+
+            self.assertEqual(scan('''\
+                #include <vector>
+                # include "config.h"
+                #ifdef _WIN32
+                #  include <windows.h>
+                #else
+                #  include <unistd.h>
+                #endif
+                #define FOO 1
+                #include <string>
+                '''), ['vector', 'config.h', 'string'])
+            # A macro defined ahead of the headers could change what they declare
+            self.assertIsNone(scan('''\
+                #define _GNU_SOURCE
+                #include <stdio.h>
+                '''))
+            os.unlink(fname)
+            self.assertIsNone(scan_top_level_includes(fname))
+
+    def test_ninja_log_last_build(self) -> None:
+        from mesonbuild.backend.ninjaanalysis import read_last_build
+
+        def outputs(*lines: str) -> T.List[T.List[str]]:
+            with open(os.path.join(tmpdir, '.ninja_log'), 'w', encoding='utf-8') as f:
+                f.write('# ninja log v6\n')
+                f.writelines(line.replace(' ', '\t') + '\n' for line in lines)
+            return [s.outputs for s in read_last_build(tmpdir)]
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            # The second build starts when the times go back
+            self.assertEqual(outputs('0 100 1 a.o 1', '0 200 1 b.o 2', '100 300 1 prog 3',
+                                     '0 50 2 a.o 1', '50 80 2 prog 3'),
+                             [['a.o'], ['prog']])
+            # Or when an output is built again, even if it finished later
+            self.assertEqual(outputs('0 100 1 a.o 1', '100 150 1 prog 3',
+                                     '0 200 2 a.o 1', '200 250 2 prog 3'),
+                             [['a.o'], ['prog']])
+            # Statements with several outputs are a single step
+            self.assertEqual(outputs('0 100 1 a.h 4', '0 100 1 a.c 4', '100 150 1 a.o 1'),
+                             [['a.h', 'a.c'], ['a.o']])
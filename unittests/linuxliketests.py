@@ -1609,6 +1609,42 @@ class LinuxlikeTests(BasePlatformTests):
             expected = 'ld.lld'
         self._check_ld('ld.lld', 'lld', 'd', expected)
 
+    def test_fast_link(self):
+        if is_sunos() or is_osx():
+            raise SkipTest('Not applicable on Solaris or OSX.')
+        testdir = os.path.join(self.common_test_dir, '1 trivial')
+        env = get_fake_env()
+        cc = detect_c_compiler(env, MachineChoice.HOST)
+        if cc.use_linker_args('bfd', '') == []:
+            raise SkipTest(f'Compiler {cc.id} does not support using alternative linkers')
+        if not any(shutil.which(l) for l in ['mold', 'ld.lld', 'ld.gold']):
+            raise SkipTest('No fast linker found.')
+        out = self.init(testdir, extra_args=['-Dfast_link=true'])
+        self.assertRegex(out, r'C linker\s*: ld\.(mold|lld|gold)\n')
+        self.assertRegex(out, r'Split debug info\s*: C\n')
+        compdb = self.get_compdb()
+        self.assertIn('-gsplit-dwarf', compdb[0]['command'])
+        with open(os.path.join(self.builddir, 'build.ninja'), encoding='utf-8') as f:
+            self.assertIn('--gdb-index', f.read())
+        self.build()
+        self.assertPathExists(os.path.join(self.builddir, 'trivialprog.p', 'trivial.c.dwo'))
+
+        # An explicitly chosen linker is kept, and debug info is not split
+        # as it cannot index it
+        self.new_builddir()
+        with mock.patch.dict(os.environ, {'CC_LD': 'bfd'}):
+            out = self.init(testdir, extra_args=['-Dfast_link=true'])
+        self.assertRegex(out, r'C linker\s*: ld\.bfd\n')
+        self.assertRegex(out, r'Split debug info\s*: NO\n')
+        self.assertNotIn('-gsplit-dwarf', self.get_compdb()[0]['command'])
+        with open(os.path.join(self.builddir, 'build.ninja'), encoding='utf-8') as f:
+            self.assertNotIn('--gdb-index', f.read())
+
+        self.new_builddir()
+        out = self.init(testdir, extra_args=['-Dfast_link=true', '-Ddebug=false'])
+        self.assertNotIn('Split debug info', out)
+        self.assertNotIn('-gsplit-dwarf', self.get_compdb()[0]['command'])
+
     def compute_sha256(self, filename):
         with open(filename, 'rb') as f:
             return hashlib.sha256(f.read()).hexdigest()